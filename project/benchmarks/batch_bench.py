@@ -0,0 +1,75 @@
+"""バッチシミュレーションのバックエンド別スループットを測るベンチマーク。
+
+    python -m project.benchmarks.batch_bench --runs 20000 --minutes 1440
+
+同じ入力に対して、Numba CPUカーネルの1スレッド実行とマルチコア実行、
+CUDAが使える場合はGPUカーネルについて1秒あたりのラン数を表示する。
+初回呼び出しのコンパイル時間は計測から除く。
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Callable
+
+import numpy as np
+from numba import cuda, get_num_threads
+
+from project.engine.gpu_runner import simulate_cpu_batch, simulate_gpu_batch
+
+
+def _make_inputs(runs: int, minutes: int, seed: int = 0) -> tuple:
+    rng = np.random.default_rng(seed)
+    n = runs * minutes
+    close = 150 + np.cumsum(rng.normal(0, 0.02, n))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) + rng.uniform(0, 0.03, n)
+    low = np.minimum(open_, close) - rng.uniform(0, 0.03, n)
+    entry_side = np.zeros(n, dtype=np.int8)
+    entry_side[np.arange(runs) * minutes] = rng.choice(np.array([-1, 1], dtype=np.int8), runs)
+    return (
+        open_.astype(np.float32),
+        high.astype(np.float32),
+        low.astype(np.float32),
+        close.astype(np.float32),
+        entry_side,
+        rng.integers(50, 300, runs).astype(np.int32),
+        rng.integers(50, 600, runs).astype(np.int32),
+        0.01,
+        0,
+        2,
+        2,
+        minutes,
+    )
+
+
+def _measure(run: Callable[[], dict], runs: int, repeat: int) -> float:
+    run()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        run()
+    return runs * repeat / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20_000)
+    parser.add_argument("--minutes", type=int, default=1440)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    inputs = _make_inputs(args.runs, args.minutes)
+    backends = {
+        "cpu serial": lambda: simulate_cpu_batch(*inputs, parallel=False),
+        f"cpu x{get_num_threads()}": lambda: simulate_cpu_batch(*inputs, parallel=True),
+    }
+    if cuda.is_available():
+        backends["cuda"] = lambda: simulate_gpu_batch(*inputs)
+
+    print(f"runs: {args.runs}, minutes: {args.minutes}")
+    for label, run in backends.items():
+        print(f"{label:11}: {_measure(run, args.runs, args.repeat):,.0f} runs/sec")
+
+
+if __name__ == "__main__":
+    main()
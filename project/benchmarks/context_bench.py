@@ -0,0 +1,107 @@
+"""EAコンテキストの生成コストを比較するベンチマーク。
+
+    python -m project.benchmarks.context_bench --bars 200000
+
+毎バー ``StateView``/``ReadOnlyCtx`` を作り直す方式と、``LiveCtx`` の
+カーソルを進める方式について、EAが典型的に参照する属性を読んだときの
+1秒あたりバー数と、1バーあたりに新しく確保されるメモリブロック数を表示する。
+ブロック数は各バーのコンテキストを保持したまま ``sys.getallocatedblocks``
+の増分を数えたもので、解放されずに残るオブジェクトの数に相当する。
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, List
+
+import numpy as np
+
+from project.engine.context import LiveCtx, ReadOnlyCtx, StateView
+from project.engine.flags import FlagSet
+from project.engine.state import RunState
+
+
+def _touch(ctx: Any) -> float:
+    """user_ea と同程度の属性参照を行う。"""
+    value = ctx.rsi_m15[-1] + ctx.rsi_h1[-1] + ctx.state.balance + ctx.bid
+    if ctx.flags.get("reset"):
+        value += 1.0
+    return value
+
+
+def _dataclass_contexts(state: RunState, cfg: Any, rsi: np.ndarray, flags: FlagSet, bid: List[float]) -> Callable[[int], Any]:
+    def make(j: int) -> ReadOnlyCtx:
+        view = StateView(
+            position_side=state.position_side,
+            open_price=state.open_price,
+            sl=state.sl,
+            tp=state.tp,
+            loss_streak=state.loss_streak,
+            buy_locked=state.buy_locked,
+            sell_locked=state.sell_locked,
+            lot=state.lot,
+            balance=state.balance,
+            risk_pct=state.risk_pct,
+            cfg=cfg,
+        )
+        return ReadOnlyCtx(
+            bid=bid[j],
+            ask=bid[j],
+            point=cfg.point,
+            rsi_m15=rsi[: j + 1],
+            rsi_h1=rsi[: j + 1],
+            flags=flags.row(j),
+            state=view,
+            cfg=cfg,
+        )
+
+    return make
+
+
+def _live_contexts(state: RunState, cfg: Any, rsi: np.ndarray, flags: FlagSet, bid: List[float]) -> Callable[[int], Any]:
+    ctx = LiveCtx(state, cfg, rsi, rsi, flags)
+
+    def make(j: int) -> LiveCtx:
+        ctx._advance(j, bid[j], bid[j])
+        return ctx
+
+    return make
+
+
+def _measure(make: Callable[[int], Any], bars: int) -> tuple[float, float]:
+    start = time.perf_counter()
+    for j in range(bars):
+        _touch(make(j))
+    elapsed = time.perf_counter() - start
+
+    sample = min(bars, 20_000)
+    kept: List[Any] = [None] * sample
+    before = sys.getallocatedblocks()
+    for j in range(sample):
+        kept[j] = make(j)
+    blocks = sys.getallocatedblocks() - before
+    return bars / elapsed, max(blocks, 0) / sample
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bars", type=int, default=200_000)
+    args = parser.parse_args()
+
+    cfg = SimpleNamespace(point=0.01)
+    rng = np.random.default_rng(0)
+    rsi = rng.uniform(0, 100, args.bars)
+    flags = FlagSet({"overbought": rsi >= 70, "oversold": rsi <= 30, "reset": rsi >= 50})
+    bid = (150 + np.cumsum(rng.normal(0, 0.02, args.bars))).tolist()
+    state = RunState(balance=1000.0, risk_pct=0.01)
+
+    print(f"bars: {args.bars}")
+    for label, factory in (("dataclass ctx", _dataclass_contexts), ("live ctx", _live_contexts)):
+        rate, blocks = _measure(factory(state, cfg, rsi, flags, bid), args.bars)
+        print(f"{label:14}: {rate:,.0f} bars/sec\t{blocks:.1f} blocks/bar")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""``rsi_period`` 探索時のRSI計算コストを比較するベンチマーク。
+
+    python -m project.benchmarks.rsi_bench --bars 1000000 --periods 30
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from project.engine.indicators import resampled_rsi, resampled_rsi_matrix
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bars", type=int, default=1_000_000)
+    parser.add_argument("--periods", type=int, default=30)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    index = pd.date_range("2020-01-01", periods=args.bars, freq="min", name="time")
+    close = pd.Series(150 + np.cumsum(rng.normal(0, 0.02, args.bars)), index=index)
+    periods = list(range(5, 5 + args.periods))
+    resampled_rsi_matrix(close.iloc[:1000], "m15", periods[:1])  # JITコンパイルを除外する
+
+    start = time.perf_counter()
+    resampled_rsi(close, "m15", periods[0])
+    one = time.perf_counter() - start
+    start = time.perf_counter()
+    for period in periods:
+        resampled_rsi(close, "m15", period)
+    loop = time.perf_counter() - start
+    start = time.perf_counter()
+    resampled_rsi_matrix(close, "m15", periods)
+    matrix = time.perf_counter() - start
+    print(f"bars: {args.bars}\tperiods: {len(periods)}")
+    print(f"single period : {one:.3f}s")
+    print(f"per period    : {loop:.3f}s")
+    print(f"rsi matrix    : {matrix:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,7 @@ from .errors import (
     SimulationError,
 )
 from .logger import get_logger
-from .optimizer import grid_search
+from .optimizer import grid_search, grid_search_parallel
 
 __all__ = [
     "Config",
@@ -20,4 +20,5 @@ __all__ = [
     "SimulationError",
     "get_logger",
     "grid_search",
+    "grid_search_parallel",
 ]
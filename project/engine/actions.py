@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Sequence, Union
 
 from .errors import ActionSchemaError
 
@@ -14,6 +14,9 @@ SUPPORTED_TYPES = {
     "NOP",
 }
 
+_SIDES = frozenset({"BUY", "SELL"})
+_NUMBER = (int, float)
+
 
 def _ensure_keys(action: Dict[str, Any], required: List[str]) -> None:
     for key in required:
@@ -21,49 +24,299 @@ def _ensure_keys(action: Dict[str, Any], required: List[str]) -> None:
             raise ActionSchemaError(f"missing key: {key}")
 
 
-def validate_action(action: Dict[str, Any]) -> None:
-    """アクションのスキーマを検証する。"""
-    if "type" not in action or action["type"] not in SUPPORTED_TYPES:
-        raise ActionSchemaError("invalid action type")
+def _check_side(side: Any) -> None:
+    if side not in _SIDES:
+        raise ActionSchemaError("invalid side")
+
+
+def _check_lot(lot: Any) -> None:
+    if not isinstance(lot, _NUMBER) or lot <= 0:
+        raise ActionSchemaError("invalid lot")
+
+
+def _check_ticket(ticket: Any) -> None:
+    if not isinstance(ticket, int):
+        raise ActionSchemaError("ticket must be int")
+
+
+def _check_price(key: str, value: Any) -> None:
+    if value is not None and not isinstance(value, _NUMBER):
+        raise ActionSchemaError(f"{key} must be float")
+
+
+def _check_start_ratio(start_ratio: Any) -> None:
+    if start_ratio is not None and not (0 <= start_ratio <= 1):
+        raise ActionSchemaError("start_ratio out of range")
+
+
+class Action:
+    """型付きアクションの基底クラス。
+
+    各サブクラスは ``__slots__`` で属性を固定し、生成時に1度だけ検証される。
+    生成後は変更できないため、エンジンは毎バー検証し直す必要がない。
+    """
+
+    __slots__ = ()
+    type = ""
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"action is read-only: {name}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """従来の辞書形式へ変換する。``None`` の項目は含めない。"""
+        out: Dict[str, Any] = {"type": self.type}
+        for key in self.__slots__:
+            value = getattr(self, key)
+            if value is not None:
+                out[key] = value
+        return out
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Action):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{k}={getattr(self, k)!r}" for k in self.__slots__)
+        return f"{self.__class__.__name__}({fields})"
+
+
+class OpenAction(Action):
+    """成行で建玉する。"""
+
+    __slots__ = ("side", "lot", "sl", "tp")
+    type = "OPEN"
 
-    act_type = action["type"]
-    if act_type == "OPEN":
-        _ensure_keys(action, ["side", "lot"])
-        if action["side"] not in {"BUY", "SELL"}:
-            raise ActionSchemaError("invalid side")
-        if not isinstance(action["lot"], (int, float)) or action["lot"] <= 0:
-            raise ActionSchemaError("invalid lot")
-        for key in ["sl", "tp"]:
-            if key in action and not isinstance(action[key], (int, float)):
-                raise ActionSchemaError(f"{key} must be float")
-    elif act_type in {"CLOSE", "MODIFY", "SET_TRAILING", "CANCEL_PENDING"}:
-        _ensure_keys(action, ["ticket"])
-        if not isinstance(action["ticket"], int):
-            raise ActionSchemaError("ticket must be int")
-        if act_type == "MODIFY":
-            if not any(k in action for k in ("sl", "tp")):
-                raise ActionSchemaError("sl or tp required")
-            for key in ["sl", "tp"]:
-                if key in action and not isinstance(action[key], (int, float)):
-                    raise ActionSchemaError(f"{key} must be float")
-        if act_type == "SET_TRAILING":
-            if "start_ratio" in action and not (0 <= action["start_ratio"] <= 1):
-                raise ActionSchemaError("start_ratio out of range")
-    elif act_type == "PENDING_OPEN":
-        _ensure_keys(action, ["side", "lot", "price"])
-        if action["side"] not in {"BUY", "SELL"}:
-            raise ActionSchemaError("invalid side")
-        if not isinstance(action["lot"], (int, float)) or action["lot"] <= 0:
-            raise ActionSchemaError("invalid lot")
-        if not isinstance(action["price"], (int, float)):
+    def __init__(self, side: str, lot: float, sl: float | None = None, tp: float | None = None) -> None:
+        _check_side(side)
+        _check_lot(lot)
+        _check_price("sl", sl)
+        _check_price("tp", tp)
+        init = object.__setattr__
+        init(self, "side", side)
+        init(self, "lot", lot)
+        init(self, "sl", sl)
+        init(self, "tp", tp)
+
+
+class CloseAction(Action):
+    """チケットを決済する。"""
+
+    __slots__ = ("ticket",)
+    type = "CLOSE"
+
+    def __init__(self, ticket: int) -> None:
+        _check_ticket(ticket)
+        object.__setattr__(self, "ticket", ticket)
+
+
+class ModifyAction(Action):
+    """チケットのSL/TPを変更する。"""
+
+    __slots__ = ("ticket", "sl", "tp")
+    type = "MODIFY"
+
+    def __init__(self, ticket: int, sl: float | None = None, tp: float | None = None) -> None:
+        _check_ticket(ticket)
+        if sl is None and tp is None:
+            raise ActionSchemaError("sl or tp required")
+        _check_price("sl", sl)
+        _check_price("tp", tp)
+        init = object.__setattr__
+        init(self, "ticket", ticket)
+        init(self, "sl", sl)
+        init(self, "tp", tp)
+
+
+class SetTrailingAction(Action):
+    """チケットのトレーリングストップを設定する。"""
+
+    __slots__ = ("ticket", "start_ratio")
+    type = "SET_TRAILING"
+
+    def __init__(self, ticket: int, start_ratio: float | None = None) -> None:
+        _check_ticket(ticket)
+        _check_start_ratio(start_ratio)
+        object.__setattr__(self, "ticket", ticket)
+        object.__setattr__(self, "start_ratio", start_ratio)
+
+
+class PendingOpenAction(Action):
+    """指定価格の予約注文を出す。"""
+
+    __slots__ = ("side", "lot", "price", "sl", "tp")
+    type = "PENDING_OPEN"
+
+    def __init__(
+        self, side: str, lot: float, price: float, sl: float | None = None, tp: float | None = None
+    ) -> None:
+        _check_side(side)
+        _check_lot(lot)
+        if not isinstance(price, _NUMBER):
             raise ActionSchemaError("price must be float")
-    elif act_type == "NOP":
-        pass
-    else:
-        raise ActionSchemaError("unknown action type")
+        _check_price("sl", sl)
+        _check_price("tp", tp)
+        init = object.__setattr__
+        init(self, "side", side)
+        init(self, "lot", lot)
+        init(self, "price", price)
+        init(self, "sl", sl)
+        init(self, "tp", tp)
+
+
+class CancelPendingAction(Action):
+    """予約注文を取り消す。"""
+
+    __slots__ = ("ticket",)
+    type = "CANCEL_PENDING"
+
+    def __init__(self, ticket: int) -> None:
+        _check_ticket(ticket)
+        object.__setattr__(self, "ticket", ticket)
 
 
-def validate_actions(actions: List[Dict[str, Any]]) -> None:
+class NopAction(Action):
+    """何もしない。共有インスタンス ``NOP`` を使うこと。"""
+
+    __slots__ = ()
+    type = "NOP"
+
+
+NOP = NopAction()
+
+ACTION_CLASSES: Dict[str, type] = {
+    cls.type: cls
+    for cls in (
+        OpenAction,
+        CloseAction,
+        ModifyAction,
+        SetTrailingAction,
+        PendingOpenAction,
+        CancelPendingAction,
+        NopAction,
+    )
+}
+
+ActionLike = Union[Action, Dict[str, Any]]
+
+
+def _check_optional_prices(action: Dict[str, Any]) -> None:
+    for key in ["sl", "tp"]:
+        if key in action and not isinstance(action[key], _NUMBER):
+            raise ActionSchemaError(f"{key} must be float")
+
+
+def _validate_open(action: Dict[str, Any]) -> None:
+    _ensure_keys(action, ["side", "lot"])
+    _check_side(action["side"])
+    _check_lot(action["lot"])
+    _check_optional_prices(action)
+
+
+def _validate_ticket(action: Dict[str, Any]) -> None:
+    _ensure_keys(action, ["ticket"])
+    _check_ticket(action["ticket"])
+
+
+def _validate_modify(action: Dict[str, Any]) -> None:
+    _validate_ticket(action)
+    if not any(k in action for k in ("sl", "tp")):
+        raise ActionSchemaError("sl or tp required")
+    _check_optional_prices(action)
+
+
+def _validate_set_trailing(action: Dict[str, Any]) -> None:
+    _validate_ticket(action)
+    if "start_ratio" in action and not (0 <= action["start_ratio"] <= 1):
+        raise ActionSchemaError("start_ratio out of range")
+
+
+def _validate_pending_open(action: Dict[str, Any]) -> None:
+    _ensure_keys(action, ["side", "lot", "price"])
+    _check_side(action["side"])
+    _check_lot(action["lot"])
+    if not isinstance(action["price"], _NUMBER):
+        raise ActionSchemaError("price must be float")
+
+
+def _validate_nop(action: Dict[str, Any]) -> None:
+    pass
+
+
+# 辞書アクションの検証関数。種類ごとに事前に振り分けておく。
+_VALIDATORS: Dict[str, Callable[[Dict[str, Any]], None]] = {
+    "OPEN": _validate_open,
+    "CLOSE": _validate_ticket,
+    "MODIFY": _validate_modify,
+    "SET_TRAILING": _validate_set_trailing,
+    "PENDING_OPEN": _validate_pending_open,
+    "CANCEL_PENDING": _validate_ticket,
+    "NOP": _validate_nop,
+}
+
+
+def validate_action(action: ActionLike) -> None:
+    """アクションのスキーマを検証する。型付きアクションは生成時に検証済みのため何もしない。"""
+    if isinstance(action, Action):
+        return
+    if not isinstance(action, dict):
+        raise ActionSchemaError("action must be a dict or Action")
+    validator = _VALIDATORS.get(action.get("type"))
+    if validator is None:
+        raise ActionSchemaError("invalid action type")
+    validator(action)
+
+
+def validate_actions(actions: Sequence[ActionLike]) -> None:
     """アクションリスト全体を検証する。"""
     for action in actions:
         validate_action(action)
+
+
+def action_from_dict(action: Dict[str, Any], validate: bool = True) -> Action:
+    """辞書アクションを型付きアクションへ変換する。
+
+    ``validate=False`` の場合は検証を省き、値をそのまま格納する。
+    """
+    if validate:
+        validate_action(action)
+    cls = ACTION_CLASSES.get(action.get("type"))
+    if cls is None:
+        raise ActionSchemaError("invalid action type")
+    if cls is NopAction:
+        return NOP
+    obj = cls.__new__(cls)
+    for key in cls.__slots__:
+        object.__setattr__(obj, key, action.get(key))
+    return obj
+
+
+def coerce_actions(actions: Sequence[ActionLike], trusted: bool = False) -> Sequence[Action]:
+    """EAの戻り値を型付きアクションの列にする。
+
+    すべて型付きならそのまま返す。辞書が含まれる場合は変換し、
+    ``trusted`` が真なら辞書の検証も省く。
+    """
+    for action in actions:
+        if not isinstance(action, Action):
+            break
+    else:
+        return actions
+    out: List[Action] = []
+    for action in actions:
+        if isinstance(action, Action):
+            out.append(action)
+        elif not isinstance(action, dict):
+            raise ActionSchemaError("action must be a dict or Action")
+        elif action.get("type") == "NOP":
+            out.append(NOP)
+        else:
+            out.append(action_from_dict(action, not trusted))
+    return out
+
+
+def is_trusted(ea: Any) -> bool:
+    """EAが ``TRUSTED = True`` を宣言していれば True。"""
+    return bool(getattr(ea, "TRUSTED", False))
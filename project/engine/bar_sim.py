@@ -1,18 +1,19 @@
 from __future__ import annotations
 
-from typing import Tuple
+from typing import Sequence, Tuple
 
 from .config import Config
 from .execution import value_per_point
 from .hit_rules import resolve_hit
 from .state import RunState
+from .trailing import resolve_hit_trailing, trailing_activation
 
 
 def simulate_bar(
     state: RunState,
     side: str,
-    bid_ticks: Tuple[float, float, float, float],
-    ask_ticks: Tuple[float, float, float, float],
+    bid_ticks: Sequence[float],
+    ask_ticks: Sequence[float],
     cfg: Config,
     rr: float,
     trailing_enabled: bool,
@@ -21,7 +22,14 @@ def simulate_bar(
     sl_points_eff: float,
     lot: float,
 ) -> Tuple[RunState, bool, str, float]:
-    """1バー内のシンプルなシミュレーションを行う。"""
+    """1バー内のシンプルなシミュレーションを行う。
+
+    ``bid_ticks``/``ask_ticks`` はティック行列の1行 (4本の価格) を受け取る。
+    ``trailing_enabled`` が真なら、約定価格から TP までの距離の
+    ``trailing_start_ratio`` 倍だけ有利に進んだ時点で、SLを最有利価格から
+    ``trailing_width_points`` の位置へティック区間ごとに追従させる。
+    その場合の損益は決済価格から求める。
+    """
     if state.position_side is None:
         open_price = bid_ticks[0] if side == "BUY" else ask_ticks[0]
         sl = open_price - sl_points_eff * cfg.point if side == "BUY" else open_price + sl_points_eff * cfg.point
@@ -31,9 +39,13 @@ def simulate_bar(
         state.sl = sl
         state.tp = tp
         state.lot = lot
+        state.best_price = open_price
         return state, False, "", 0.0
 
     # 既にポジションが存在する場合
+    if trailing_enabled:
+        activation = trailing_activation(trailing_start_ratio, rr, sl_points_eff, cfg.point)
+        return _simulate_trailing(state, bid_ticks, ask_ticks, cfg, activation, trailing_width_points)
     high = max(bid_ticks) if state.position_side == "BUY" else max(ask_ticks)
     low = min(bid_ticks) if state.position_side == "BUY" else min(ask_ticks)
     going_up = bid_ticks[0] < bid_ticks[-1] if state.position_side == "BUY" else ask_ticks[0] < ask_ticks[-1]
@@ -49,5 +61,31 @@ def simulate_bar(
         state.sl = None
         state.tp = None
         state.lot = None
+        state.best_price = None
         closed = True
     return state, closed, result, profit
+
+
+def _simulate_trailing(
+    state: RunState,
+    bid_ticks: Sequence[float],
+    ask_ticks: Sequence[float],
+    cfg: Config,
+    activation: float,
+    trailing_width_points: int,
+) -> Tuple[RunState, bool, str, float]:
+    """トレーリング有効時の建玉を1バー進める。"""
+    side = state.position_side
+    ticks = bid_ticks if side == "BUY" else ask_ticks
+    entry = state.open_price
+    best = entry if state.best_price is None else state.best_price
+    result, state.sl, state.best_price = resolve_hit_trailing(
+        side, ticks, state.sl, state.tp, best, entry, activation, trailing_width_points * cfg.point
+    )
+    if not result:
+        return state, False, "", 0.0
+    exit_price = state.sl if result == "SL" else state.tp
+    sign = 1 if side == "BUY" else -1
+    profit = (exit_price - entry) / cfg.point * sign * value_per_point(cfg) * (state.lot or 0)
+    state.position_side = state.open_price = state.sl = state.tp = state.lot = state.best_price = None
+    return state, True, result, profit
@@ -0,0 +1,83 @@
+"""区間全体の配列からエントリーシグナルを一括で返すEA向けのバッチAPI。"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from .config import Config
+from .errors import ActionSchemaError
+from .flags import FlagSet
+
+BUY = 1
+SELL = -1
+
+
+@dataclass(frozen=True)
+class BatchInputs:
+    """``emit_actions_batch`` に渡す配列。いずれもシミュレーション区間のバー数と同じ長さ。
+
+    ``bid``/``ask`` は各バー最初のティックで、``emit_actions`` の ``ctx.bid``/``ctx.ask``
+    と同じ値。``offset`` は区間先頭の通し番号。
+    """
+
+    index: pd.DatetimeIndex
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    bid: np.ndarray
+    ask: np.ndarray
+    rsi_m15: np.ndarray
+    rsi_h1: np.ndarray
+    flags: FlagSet
+    cfg: Config
+    offset: int = 0
+
+
+@dataclass(frozen=True)
+class BatchSignals:
+    """バーごとのエントリーシグナル。
+
+    - ``side``: ``1`` (BUY) / ``-1`` (SELL) / ``0`` (何もしない)
+    - ``lot``: NaN または省略時はエンジンが資金管理設定に従って発注時に計算する
+    - ``sl``/``tp``: 価格。NaN または省略時は設定値から決める
+
+    ``sl``/``tp`` は ``emit_actions`` の OPEN アクションと同じ扱いで、
+    CPUテスターは ``stoploss_points``/``rr`` からSL/TPを置く。
+    """
+
+    side: np.ndarray
+    lot: np.ndarray | None = None
+    sl: np.ndarray | None = None
+    tp: np.ndarray | None = None
+
+    def lot_at(self, j: int) -> float:
+        """``j`` 本目の指定ロット。エンジンに任せる場合は NaN。"""
+        return float(self.lot[j]) if self.lot is not None else float("nan")
+
+
+def supports_batch(ea: Any) -> bool:
+    """EAがバッチAPIを提供し、状態依存ロジックを宣言していなければ True。"""
+    return callable(getattr(ea, "emit_actions_batch", None)) and not getattr(ea, "STATEFUL", False)
+
+
+def validate_signals(signals: BatchSignals, n: int) -> None:
+    """シグナル配列の形状と値を検証する。"""
+    if not isinstance(signals, BatchSignals):
+        raise ActionSchemaError("emit_actions_batch must return BatchSignals or None")
+    side = np.asarray(signals.side)
+    if side.shape != (n,):
+        raise ActionSchemaError(f"side shape {side.shape} does not match ({n},)")
+    if not np.isin(side, (BUY, 0, SELL)).all():
+        raise ActionSchemaError("invalid side")
+    for key in ("lot", "sl", "tp"):
+        values = getattr(signals, key)
+        if values is not None and np.shape(values) != (n,):
+            raise ActionSchemaError(f"{key} shape {np.shape(values)} does not match ({n},)")
+    if signals.lot is not None:
+        lot = np.asarray(signals.lot, dtype=np.float64)[side != 0]
+        if np.any(lot[~np.isnan(lot)] <= 0):
+            raise ActionSchemaError("invalid lot")
@@ -0,0 +1,234 @@
+"""``data_path`` ディレクトリ内の複数CSVを期間で引けるようにするカタログ。"""
+from __future__ import annotations
+
+import argparse
+import bisect
+import json
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .data_cache import CACHE_DIRNAME, NS_PER_MINUTE, PRICE_COLUMNS, OHLCArrays, load_ohlc
+from .errors import ConfigError
+from .logger import get_logger
+
+CATALOG_FILENAME = "catalog.json"
+
+
+@dataclass
+class CatalogEntry:
+    """1ファイル分のメタデータ。時刻はエポック分。"""
+
+    file: str
+    symbol: str
+    first: int
+    last: int
+    rows: int
+    size: int
+    mtime_ns: int
+
+
+def symbol_from_filename(path: str | Path) -> str:
+    """``USDJPY_2015.csv`` のようなファイル名から通貨ペア名を取り出す。"""
+    return Path(path).stem.split("_")[0].split("-")[0].upper()
+
+
+def to_epoch_minute(value: str | pd.Timestamp, end: bool = False) -> int:
+    """``"2015-03"`` などの日時文字列をエポック分へ変換する。
+
+    ``end`` が True の場合は指定された期間の最後の分を返すため、
+    ``"2019-11"`` は11月末までを含む。
+    """
+    if isinstance(value, str):
+        try:
+            period = pd.Period(value)
+        except ValueError:
+            ts = pd.Timestamp(value)
+        else:
+            ts = period.end_time if end else period.start_time
+    else:
+        ts = pd.Timestamp(value)
+    return int(ts.value // NS_PER_MINUTE)
+
+
+def period_bounds(arrays: OHLCArrays, start: str | None = None, end: str | None = None) -> Tuple[int, int]:
+    """``start``〜``end`` に含まれる行範囲 ``[begin, stop)`` を返す。"""
+    begin = int(np.searchsorted(arrays.time, to_epoch_minute(start), side="left")) if start else 0
+    stop = int(np.searchsorted(arrays.time, to_epoch_minute(end, end=True), side="right")) if end else len(arrays)
+    return begin, max(begin, stop)
+
+
+def slice_period(arrays: OHLCArrays, start: str | None = None, end: str | None = None) -> OHLCArrays:
+    """``start``〜``end`` に含まれる行のビューを返す。"""
+    return arrays.slice(*period_bounds(arrays, start, end))
+
+
+class DataCatalog:
+    """ディレクトリ内のCSVをシンボルと期間で索引する。
+
+    索引は ``<root>/.ohlc_cache/catalog.json`` に保存され、サイズや更新時刻が
+    変わったファイルだけが再走査される。
+    """
+
+    def __init__(self, root: str | Path, cache_root: str | Path | None = None) -> None:
+        self.root = Path(root)
+        self.cache_root = Path(cache_root) if cache_root else None
+        self.index_path = (self.cache_root or self.root / CACHE_DIRNAME) / CATALOG_FILENAME
+        self.entries: Dict[str, List[CatalogEntry]] = {}
+
+    def _load_index(self) -> Dict[str, CatalogEntry]:
+        try:
+            raw = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        return {item["file"]: CatalogEntry(**item) for item in raw.get("files", [])}
+
+    def scan(self) -> "DataCatalog":
+        """CSVを走査して索引を更新・保存する。"""
+        known = self._load_index()
+        logger = get_logger(__name__)
+        entries: List[CatalogEntry] = []
+        for path in sorted(self.root.rglob("*.csv")):
+            if CACHE_DIRNAME in path.parts:
+                continue
+            rel = path.relative_to(self.root).as_posix()
+            st = path.stat()
+            cached = known.get(rel)
+            if cached and cached.size == st.st_size and cached.mtime_ns == st.st_mtime_ns:
+                entries.append(cached)
+                continue
+            arrays = load_ohlc(path, self.cache_root)
+            if len(arrays) == 0:
+                continue
+            logger.info("catalog indexed: %s", rel)
+            entries.append(
+                CatalogEntry(
+                    file=rel,
+                    symbol=symbol_from_filename(path),
+                    first=int(arrays.time[0]),
+                    last=int(arrays.time[-1]),
+                    rows=len(arrays),
+                    size=st.st_size,
+                    mtime_ns=st.st_mtime_ns,
+                )
+            )
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self.index_path.write_text(
+            json.dumps({"files": [asdict(e) for e in entries]}, ensure_ascii=False), encoding="utf-8"
+        )
+        self._set_entries(entries)
+        return self
+
+    def _set_entries(self, entries: List[CatalogEntry]) -> None:
+        by_symbol: Dict[str, List[CatalogEntry]] = {}
+        for entry in entries:
+            by_symbol.setdefault(entry.symbol, []).append(entry)
+        self.entries = {sym: sorted(items, key=lambda e: e.first) for sym, items in by_symbol.items()}
+
+    def files_for(self, symbol: str, start: int, end: int) -> List[CatalogEntry]:
+        """``[start, end]`` (エポック分) と重なるファイルを時刻順に返す。"""
+        items = self.entries.get(symbol.upper(), [])
+        # ファイル同士が重なっていても単調になるよう末尾時刻の累積最大で探索する
+        reach = np.maximum.accumulate([e.last for e in items]).tolist() if items else []
+        i = bisect.bisect_left(reach, start)
+        result: List[CatalogEntry] = []
+        while i < len(items) and items[i].first <= end:
+            result.append(items[i])
+            i += 1
+        return result
+
+    def query_ranges(
+        self, symbol: str, start: str | None = None, end: str | None = None
+    ) -> List[Tuple[Path, OHLCArrays, int, int]]:
+        """期間に重なるファイルごとに ``(パス, 配列, begin, stop)`` を返す。
+
+        各ファイルの時刻列を二分探索して行範囲を求める。ファイル間で時刻が
+        重複する場合は先のファイルを優先する。
+        """
+        lo = to_epoch_minute(start) if start else np.iinfo(np.int64).min
+        hi = to_epoch_minute(end, end=True) if end else np.iinfo(np.int64).max
+        ranges: List[Tuple[Path, OHLCArrays, int, int]] = []
+        last_time: int | None = None
+        for entry in self.files_for(symbol, lo, hi):
+            path = self.root / entry.file
+            arrays = load_ohlc(path, self.cache_root)
+            floor = lo if last_time is None else max(lo, last_time + 1)
+            begin = int(np.searchsorted(arrays.time, floor, side="left"))
+            stop = int(np.searchsorted(arrays.time, hi, side="right"))
+            if stop > begin:
+                ranges.append((path, arrays, begin, stop))
+                last_time = int(arrays.time[stop - 1])
+        return ranges
+
+    def query(self, symbol: str, start: str | None = None, end: str | None = None) -> OHLCArrays:
+        """シンボルと期間を指定して該当する行だけを読み込む。"""
+        parts = [arrays.slice(begin, stop) for _, arrays, begin, stop in self.query_ranges(symbol, start, end)]
+        if not parts:
+            empty = np.empty(0, dtype=np.float64)
+            return OHLCArrays(time=np.empty(0, dtype=np.int64), **{c: empty for c in PRICE_COLUMNS})
+        if len(parts) == 1:
+            return parts[0]
+        return OHLCArrays(
+            time=np.concatenate([p.time for p in parts]),
+            **{c: np.concatenate([getattr(p, c) for p in parts]) for c in PRICE_COLUMNS},
+        )
+
+
+def load_arrays(
+    path: str,
+    use_cache: bool = True,
+    symbol: str | None = None,
+    start: str | None = None,
+    end: str | None = None,
+) -> OHLCArrays:
+    """OHLCデータを列指向キャッシュ経由で読み込む。
+
+    ``path`` がディレクトリの場合はカタログから ``symbol`` の期間分だけを読み込む。
+    """
+    if Path(path).is_dir():
+        if not use_cache:
+            raise ConfigError("a data directory requires the OHLC cache")
+        if not symbol:
+            raise ConfigError("symbol is required for a data directory")
+        arrays = DataCatalog(path).scan().query(symbol, start, end)
+    else:
+        arrays = slice_period(load_ohlc(path, use_cache=use_cache), start, end)
+    if len(arrays) == 0:
+        raise ConfigError(f"no data for the requested period: {path}")
+    return arrays
+
+
+def main() -> None:
+    """カタログの作成と期間指定の確認を行うCLI。"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["scan", "query"])
+    parser.add_argument("root", help="CSVを格納したディレクトリ")
+    parser.add_argument("--symbol", default=None)
+    parser.add_argument("--start", default=None)
+    parser.add_argument("--end", default=None)
+    args = parser.parse_args()
+
+    catalog = DataCatalog(args.root).scan()
+    if args.command == "scan":
+        for symbol, items in sorted(catalog.entries.items()):
+            for e in items:
+                first = pd.Timestamp(e.first * NS_PER_MINUTE)
+                last = pd.Timestamp(e.last * NS_PER_MINUTE)
+                print(f"{symbol}\t{e.file}\t{first}\t{last}\t{e.rows}")
+        return
+    if not args.symbol:
+        parser.error("--symbol is required for query")
+    arrays = catalog.query(args.symbol, args.start, args.end)
+    if len(arrays) == 0:
+        print("rows: 0")
+        return
+    first = pd.Timestamp(int(arrays.time[0]) * NS_PER_MINUTE)
+    last = pd.Timestamp(int(arrays.time[-1]) * NS_PER_MINUTE)
+    print(f"rows: {len(arrays)}\t{first}\t{last}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""長時間のバックテストを途中から再開するためのチェックポイント。
+
+判定ループはバーの区切りで状態をコピーするだけで、直列化・圧縮・書き込みは
+バックグラウンドのスレッドが行う。ファイルは zlib 圧縮した pickle で、
+一時ファイルから ``os.replace`` で置き換えるため、書き込み中に
+プロセスが落ちても直前のチェックポイントは壊れない。
+
+末尾の1時間足の手前で保存したチェックポイントは、データが末尾に
+追記されただけなら、追記後のデータの続きの計算にも使える。
+"""
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+import zlib
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from .config import Config
+from .errors import ConfigError
+from .indicators import IndicatorState
+from .orders import OrderBook
+from .state import RunState
+from .timeframes import TIMEFRAME_MINUTES
+
+CHECKPOINT_VERSION = 1
+PROBE_BARS = 4096  # 経過時間で区切る場合に時計を確認する間隔 (バー数)
+_MAGIC = b"BTCKPT"
+_LIVE = object()
+_NEVER = 1 << 62
+
+
+@dataclass
+class Checkpoint:
+    """再開に必要な状態。
+
+    - ``cursor``: 再開するバーの通し番号 (それより前のバーは処理済み)
+    - ``bars``: 書き出した実行のバー数
+    - ``chunk_start``: ``cursor`` を含むチャンク先頭の通し番号
+    - ``indicator``: チャンク先頭での指標状態 (一括実行では ``None``)
+    - ``state``: ``RunState.to_dict()``
+    - ``ea_state``: EAの ``get_state()`` の値。``emit_actions_batch`` を使う
+      区間では区間先頭の値で、再開時は区間のシグナルを作り直す
+    - ``book``: ``OrderBook`` (使わないEAでは ``None``)
+    - ``history``: ``cursor`` までの取引履歴
+    - ``fingerprint``: 先頭 ``bars`` 本のデータと設定の指紋。異なる実行からは再開できない
+    """
+
+    cursor: int
+    bars: int
+    chunk_start: int
+    indicator: IndicatorState | None
+    state: Dict[str, Any]
+    ea_state: Any
+    book: OrderBook | None
+    history: List[dict]
+    fingerprint: str
+
+    def run_state(self) -> RunState:
+        """保存された ``RunState`` を復元する。"""
+        return RunState.from_dict(self.state)
+
+
+def run_fingerprint(columns: Sequence[np.ndarray], cfg: Config, mode: str) -> str:
+    """データ列 (時刻とOHLC)・設定・実行モードから再開可否を判定する指紋を作る。"""
+    digest = hashlib.sha1(json.dumps([mode, asdict(cfg)], default=str, sort_keys=True).encode("utf-8"))
+    for column in columns:
+        column = np.ascontiguousarray(column)
+        digest.update(str(column.shape[0]).encode("ascii"))
+        digest.update(memoryview(column).cast("B"))
+    return digest.hexdigest()
+
+
+def last_hour_start(time: np.ndarray) -> int:
+    """末尾の1時間足バケットに属する最初のバーの位置。``time`` はエポック分。
+
+    上位足のRSIは形成中のバケットの値が後続のバーで変わるため、
+    データが追記された場合はこのバーから計算し直す。
+    """
+    time = np.asarray(time, dtype=np.int64)
+    if time.shape[0] == 0:
+        return 0
+    hour = time // TIMEFRAME_MINUTES["h1"]
+    return int(np.searchsorted(hour, hour[-1], side="left"))
+
+
+def save_checkpoint(path: str | Path, ckpt: Checkpoint) -> None:
+    """チェックポイントを書き出す。"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = zlib.compress(pickle.dumps(ckpt, protocol=pickle.HIGHEST_PROTOCOL), 6)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as fh:
+        fh.write(_MAGIC + CHECKPOINT_VERSION.to_bytes(2, "little") + payload)
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path: str | Path) -> Checkpoint:
+    """``save_checkpoint`` で書き出したチェックポイントを読み込む。"""
+    raw = Path(path).read_bytes()
+    if not raw.startswith(_MAGIC):
+        raise ConfigError(f"not a checkpoint file: {path}")
+    version = int.from_bytes(raw[len(_MAGIC) : len(_MAGIC) + 2], "little")
+    if version != CHECKPOINT_VERSION:
+        raise ConfigError(f"unsupported checkpoint version {version}: {path}")
+    return pickle.loads(zlib.decompress(raw[len(_MAGIC) + 2 :]))
+
+
+def get_ea_state(ea: Any) -> Any:
+    """EAが ``get_state()`` を提供していればその値を返す。"""
+    getter = getattr(ea, "get_state", None)
+    return getter() if callable(getter) else None
+
+
+def set_ea_state(ea: Any, value: Any) -> None:
+    """EAが ``set_state()`` を提供していれば ``value`` を渡して状態を戻す。"""
+    setter = getattr(ea, "set_state", None)
+    if callable(setter):
+        setter(value)
+
+
+class Checkpointer:
+    """シミュレーション中に一定間隔でチェックポイントを書き出す。
+
+    ``every_bars`` 本ごと、または ``every_seconds`` 秒ごと (両方指定すると先に来た方) に
+    ``path`` へ保存する。エンジンは ``next_check`` が返すバーでだけ ``maybe_save`` を呼ぶため、
+    判定ループの負担は整数比較1回で済む。前回の書き込みが終わる前に次の
+    スナップショットが来た場合は新しい方だけを書く。
+
+    ``tail_at`` を指定すると、そのバーの手前の状態を間隔とは別に必ず ``tail_path`` へ保存する。
+    差分実行で次回の再開位置 (``last_hour_start``) を残すために使う。
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None,
+        ea: Any,
+        every_bars: int | None = None,
+        every_seconds: float | None = None,
+        tail_at: int | None = None,
+        tail_path: str | Path | None = None,
+    ) -> None:
+        if path is not None and not every_bars and not every_seconds:
+            raise ConfigError("checkpoint interval requires every_bars or every_seconds")
+        if path is None and (every_bars or every_seconds):
+            raise ConfigError("checkpoint interval requires a path")
+        if (tail_at is None) != (tail_path is None):
+            raise ConfigError("tail_at and tail_path must be given together")
+        self.path = Path(path) if path is not None else None
+        self.ea = ea
+        self.every_bars = every_bars
+        self.every_seconds = every_seconds
+        self.tail_at = tail_at
+        self.tail_path = Path(tail_path) if tail_path is not None else None
+        self.fingerprint = ""
+        self.bars = 0
+        self.chunk_start = 0
+        self.indicator: IndicatorState | None = None
+        self.saved = 0
+        self._last_bar = 0
+        self._last_time = time.monotonic()
+        self._pending: tuple[Path, Checkpoint, List[dict], int] | None = None
+        self._busy = False
+        self._closed = False
+        self._error: BaseException | None = None
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> "Checkpointer":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def begin_chunk(self, chunk_start: int, indicator: IndicatorState | None) -> None:
+        """チャンクの先頭位置と、そのチャンクを計算する前の指標状態を記録する。"""
+        self.chunk_start = chunk_start
+        self.indicator = copy.deepcopy(indicator)
+
+    def resume_from(self, ckpt: Checkpoint) -> None:
+        """再開したチェックポイントの位置から間隔を数え直す。"""
+        self._last_bar = ckpt.cursor
+        self._last_time = time.monotonic()
+
+    def next_check(self, cursor: int) -> int:
+        """``cursor`` 以降で ``maybe_save`` を呼ぶべき最初の通し番号を返す。"""
+        target = _NEVER
+        if self.every_bars:
+            target = self._last_bar + self.every_bars
+        if self.every_seconds:
+            target = min(target, cursor + PROBE_BARS)
+        if self.tail_at is not None and self.tail_at >= cursor:
+            target = min(target, self.tail_at)
+        return max(target, cursor)
+
+    def maybe_save(
+        self, cursor: int, state: RunState, history: List[dict], book: OrderBook | None = None, ea_state: Any = _LIVE
+    ) -> None:
+        """間隔に達していれば ``cursor`` のバーの手前の状態を保存する。
+
+        ``ea_state`` を省略するとその時点のEAの状態を使う。
+        """
+        if cursor == self.tail_at:
+            # 書き込み待ちのスナップショットと置き換え合わないよう、前後で書き終わるのを待つ
+            self.flush()
+            self.save(cursor, state, history, book, ea_state, self.tail_path)
+            self.flush()
+        if self.path is None:
+            return
+        due = bool(self.every_bars) and cursor - self._last_bar >= self.every_bars
+        if not due and self.every_seconds:
+            due = time.monotonic() - self._last_time >= self.every_seconds
+        if due:
+            self.save(cursor, state, history, book, ea_state)
+
+    def save(
+        self,
+        cursor: int,
+        state: RunState,
+        history: List[dict],
+        book: OrderBook | None = None,
+        ea_state: Any = _LIVE,
+        path: Path | None = None,
+    ) -> None:
+        """状態をコピーし、書き込みをバックグラウンドスレッドに渡す。
+
+        取引履歴は追記しかされないため件数だけを控え、コピーは書き込み側で行う。
+        ``path`` を省略すると ``self.path`` に書く。
+        """
+        ckpt = Checkpoint(
+            cursor=cursor,
+            bars=self.bars,
+            chunk_start=self.chunk_start,
+            indicator=self.indicator,
+            state=state.to_dict(),
+            ea_state=get_ea_state(self.ea) if ea_state is _LIVE else ea_state,
+            book=copy.deepcopy(book),
+            history=[],
+            fingerprint=self.fingerprint,
+        )
+        if path is None:
+            path = self.path
+            self._last_bar = cursor
+            self._last_time = time.monotonic()
+        with self._cond:
+            self._pending = (path, ckpt, history, len(history))
+            self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                path, ckpt, history, n = self._pending
+                self._pending = None
+                self._busy = True
+            try:
+                ckpt.history = history[:n]
+                save_checkpoint(path, ckpt)
+                self.saved += 1
+            except BaseException as exc:  # pragma: no cover - ディスク障害など
+                self._error = exc
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    def flush(self) -> None:
+        """受け取ったスナップショットが書き終わるまで待つ。"""
+        with self._cond:
+            while self._pending is not None or self._busy:
+                self._cond.wait()
+        if self._error is not None:
+            raise self._error
+
+    def close(self) -> None:
+        """残りのスナップショットを書き出してスレッドを終了する。"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+from collections.abc import Sequence as SequenceABC
 from dataclasses import dataclass
-from typing import Sequence
+from operator import index as as_index
+from typing import Any, Iterator, Mapping, Sequence
+
+import numpy as np
 
 from .config import Config
+from .flags import FlagRow, FlagSet
 from .state import RunState
 
 
@@ -37,6 +42,119 @@ class ReadOnlyCtx:
     point: float
     rsi_m15: Sequence[float]
     rsi_h1: Sequence[float]
-    flags: dict[str, bool]
+    flags: Mapping[str, bool]
     state: StateView
     cfg: Config
+    orders: Any = None
+
+
+class RSIHistory(SequenceABC):
+    """指標配列の先頭からカーソル位置までを表すビュー。
+
+    ``ctx.rsi_m15[-1]`` のような参照は配列を切り出さずに要素を返す。
+    スライスや ``np.asarray`` を使った場合だけ NumPy のビューを作る。
+    """
+
+    __slots__ = ("_values", "_end")
+
+    def __init__(self, values: np.ndarray, end: int = 0) -> None:
+        self._values = values
+        self._end = end
+
+    def __len__(self) -> int:
+        return self._end
+
+    def __getitem__(self, i: Any) -> Any:
+        if isinstance(i, slice):
+            return self._values[: self._end][i]
+        i = as_index(i)
+        if i < 0:
+            i += self._end
+        if not 0 <= i < self._end:
+            raise IndexError("history index out of range")
+        return self._values[i]
+
+    def __iter__(self) -> Iterator[float]:
+        return iter(self._values[: self._end])
+
+    def __array__(self, dtype: Any = None) -> np.ndarray:
+        view = self._values[: self._end]
+        return view if dtype is None else view.astype(dtype)
+
+    def __repr__(self) -> str:
+        return f"RSIHistory(len={self._end})"
+
+
+def _state_field(name: str) -> property:
+    return property(lambda self: getattr(self._state, name), doc=f"``RunState.{name}`` の現在値。")
+
+
+class LiveStateView:
+    """``RunState`` を直接参照する読み取り専用ビュー。``StateView`` と同じ属性を持つ。"""
+
+    __slots__ = ("_state", "cfg")
+
+    position_side = _state_field("position_side")
+    open_price = _state_field("open_price")
+    sl = _state_field("sl")
+    tp = _state_field("tp")
+    loss_streak = _state_field("loss_streak")
+    buy_locked = _state_field("buy_locked")
+    sell_locked = _state_field("sell_locked")
+    lot = _state_field("lot")
+    balance = _state_field("balance")
+    risk_pct = _state_field("risk_pct")
+
+    def __init__(self, state: RunState, cfg: Config) -> None:
+        object.__setattr__(self, "_state", state)
+        object.__setattr__(self, "cfg", cfg)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"state view is read-only: {name}")
+
+    def point(self) -> float:
+        """ポイントサイズを返す。"""
+        return self.cfg.point
+
+
+class LiveCtx:
+    """バーごとに作り直さず、エンジンがカーソルを進めて使い回すコンテキスト。
+
+    属性は ``ReadOnlyCtx`` と同じで、EAからの代入は ``AttributeError`` になる。
+    値は次のバーで更新されるため、EAがバーをまたいで保持する場合は
+    必要な値を取り出して保存すること。
+    """
+
+    __slots__ = ("bid", "ask", "point", "rsi_m15", "rsi_h1", "flags", "state", "cfg", "orders", "_flag_words")
+
+    def __init__(
+        self,
+        state: RunState,
+        cfg: Config,
+        rsi_m15: np.ndarray,
+        rsi_h1: np.ndarray,
+        flags: FlagSet,
+        orders: Any = None,
+    ) -> None:
+        init = object.__setattr__
+        init(self, "bid", float("nan"))
+        init(self, "ask", float("nan"))
+        init(self, "point", cfg.point)
+        init(self, "rsi_m15", RSIHistory(rsi_m15))
+        init(self, "rsi_h1", RSIHistory(rsi_h1))
+        init(self, "flags", FlagRow(0, flags.index))
+        init(self, "state", LiveStateView(state, cfg))
+        init(self, "cfg", cfg)
+        init(self, "orders", orders)
+        init(self, "_flag_words", flags.words)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"ctx is read-only: {name}")
+
+    def _advance(self, j: int, bid: float, ask: float) -> None:
+        """エンジン専用: ``j`` 本目のバーへカーソルを進める。"""
+        object.__setattr__(self, "bid", bid)
+        object.__setattr__(self, "ask", ask)
+        self.rsi_m15._end = j + 1
+        self.rsi_h1._end = j + 1
+        self.flags._word = self._flag_words[j]
@@ -0,0 +1,180 @@
+"""取引台帳に手数料とスワップを配列演算で一括反映する。
+
+シミュレーション後に、建玉・決済時刻、売買方向、ロットの配列から
+ロールオーバー回数と手数料を求め、損益と残高推移を補正する。
+取引ごとのPythonループは無く、バッチスイープの数百万件でも1回のNumPy演算で済む。
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .config import Config
+from .execution import commission_for_trade, value_per_point
+
+NS_PER_HOUR = 3_600_000_000_000
+NS_PER_DAY = 24 * NS_PER_HOUR
+ROLLOVER_HOUR = 0  # ``cfg.timezone`` の時刻でロールオーバーが起きる時
+TRIPLE_SWAP_WEEKDAY = 2  # 3日分のスワップが付く取引日 (月曜=0、水曜)
+_EPOCH_WEEKDAY = 3  # 1970-01-01 は木曜
+_WEEKEND = (5, 6)
+
+
+@dataclass
+class TradeCosts:
+    """取引ごとのコストと補正後の損益。
+
+    - ``days``: スワップ日数 (3倍日は3、週末は0として数えた合計)
+    - ``commission``: 手数料 (損益から差し引く正の値)
+    - ``swap``: スワップ (損益に加える。符号は設定値どおり)
+    - ``net_pnl``: ``pnl - commission + swap``
+    - ``balance``: 各取引の決済後残高 (``run`` ごとに ``base_balance`` から累積)
+    """
+
+    days: np.ndarray
+    commission: np.ndarray
+    swap: np.ndarray
+    net_pnl: np.ndarray
+    balance: np.ndarray
+
+
+def to_local_ns(time_ns: np.ndarray, cfg: Config) -> np.ndarray:
+    """UTCのエポックns配列を ``cfg.timezone`` の壁時計時刻 (ns) に変換する。
+
+    ``cfg.dst`` が偽ならサマータイムを無視し、その地域の標準時で固定する。
+    """
+    time_ns = np.asarray(time_ns, dtype=np.int64)
+    if cfg.timezone.upper() == "UTC":
+        return time_ns
+    if cfg.dst:
+        local = pd.DatetimeIndex(time_ns).tz_localize("UTC").tz_convert(cfg.timezone).tz_localize(None)
+        return local.asi8
+    offsets = [pd.Timestamp(day, tz=cfg.timezone).utcoffset() for day in ("2001-01-15", "2001-07-15")]
+    return time_ns + pd.Timedelta(min(offsets)).value
+
+
+def _count_weekday(first: np.ndarray, last: np.ndarray, weekday: int) -> np.ndarray:
+    """日番号が ``(first, last]`` に入り、曜日が ``weekday`` の日数。"""
+    shift = _EPOCH_WEEKDAY - weekday
+    return (last + shift) // 7 - (first + shift) // 7
+
+
+def rollover_days(
+    entry_time: np.ndarray,
+    exit_time: np.ndarray,
+    cfg: Config,
+    rollover_hour: int = ROLLOVER_HOUR,
+    triple_weekday: int = TRIPLE_SWAP_WEEKDAY,
+) -> np.ndarray:
+    """建玉から決済までに跨いだロールオーバーのスワップ日数を返す。
+
+    時刻はUTCのエポックns。``cfg.timezone`` で毎日 ``rollover_hour`` 時に
+    ロールオーバーが起き、その時点で終わる取引日が土日なら付与せず、
+    ``triple_weekday`` なら3日分とする。``rollover_hour=0`` の場合、
+    0時のロールオーバーは前日の取引日の終わりとして扱う。
+    建玉時刻ちょうどのロールオーバーは含めず、決済時刻ちょうどは含める。
+    """
+    offset = rollover_hour * NS_PER_HOUR
+    first = (to_local_ns(entry_time, cfg) - offset) // NS_PER_DAY
+    last = (to_local_ns(exit_time, cfg) - offset) // NS_PER_DAY
+    if rollover_hour == 0:
+        first = first - 1
+        last = last - 1
+    days = last - first
+    for weekday in _WEEKEND:
+        days = days - _count_weekday(first, last, weekday)
+    return days + 2 * _count_weekday(first, last, triple_weekday)
+
+
+def _is_long(side: Any) -> np.ndarray:
+    side = np.asarray(side)
+    if side.dtype.kind in "UO":
+        return side == "BUY"
+    return side > 0
+
+
+def _balance_path(net: np.ndarray, base: float, run: np.ndarray | None) -> np.ndarray:
+    """``run`` ごとに累積した残高。``run`` は同じ値が連続している必要がある。"""
+    total = np.cumsum(net)
+    if run is None or net.shape[0] == 0:
+        return base + total
+    run = np.asarray(run)
+    starts = np.flatnonzero(np.r_[True, run[1:] != run[:-1]])
+    before = np.r_[0.0, total][starts]
+    return base + total - np.repeat(before, np.diff(np.r_[starts, net.shape[0]]))
+
+
+def apply_costs(
+    pnl: np.ndarray,
+    entry_time: np.ndarray,
+    exit_time: np.ndarray,
+    side: np.ndarray,
+    lot: np.ndarray,
+    cfg: Config,
+    run: np.ndarray | None = None,
+    rollover_hour: int = ROLLOVER_HOUR,
+    triple_weekday: int = TRIPLE_SWAP_WEEKDAY,
+) -> TradeCosts:
+    """取引台帳の損益に手数料とスワップを反映する。
+
+    ``side`` は ``+1/-1`` または ``"BUY"/"SELL"``。``run`` を渡すと
+    残高推移をラン (連続した同じ値) ごとに ``cfg.base_balance`` から累積する。
+    手数料は ``commission_for_trade``、スワップは ``swap_for_day`` と同じ式。
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    lot = np.asarray(lot, dtype=np.float64)
+    days = rollover_days(entry_time, exit_time, cfg, rollover_hour, triple_weekday)
+    commission = commission_for_trade(lot, cfg) * np.ones_like(pnl)
+    rate = np.where(_is_long(side), cfg.swap_long_per_lot_day, cfg.swap_short_per_lot_day)
+    swap = lot * days * rate
+    net = pnl - commission + swap
+    return TradeCosts(days, commission, swap, net, _balance_path(net, cfg.base_balance, run))
+
+
+def history_costs(history: Sequence[Mapping[str, Any]], cfg: Config, **kwargs: Any) -> TradeCosts:
+    """``cpu_tester`` の取引履歴 (``entry_time``/``side``/``lot``/``profit`` を含む) に適用する。"""
+    frame = pd.DataFrame(list(history), columns=["time", "entry_time", "side", "lot", "profit"])
+    return apply_costs(
+        frame["profit"].to_numpy(np.float64),
+        pd.DatetimeIndex(frame["entry_time"]).asi8,
+        pd.DatetimeIndex(frame["time"]).asi8,
+        frame["side"].to_numpy(str),
+        frame["lot"].to_numpy(np.float64),
+        cfg,
+        **kwargs,
+    )
+
+
+def batch_costs(
+    result: Mapping[str, np.ndarray],
+    entry_side: np.ndarray,
+    time: np.ndarray,
+    n_minutes: int,
+    lot: Any,
+    cfg: Config,
+    **kwargs: Any,
+) -> TradeCosts:
+    """バッチカーネルの出力 (1ラン1取引) に適用する。
+
+    ``entry_side`` はカーネルに渡した ``(n_runs * n_minutes,)`` の配列。
+    ``time`` は各分のUTCエポックns で、全ラン共通の ``(n_minutes,)`` か
+    ランごとの ``(n_runs * n_minutes,)``。損益は ``pnl_points`` を
+    ``value_per_point(cfg) * lot`` で金額に換算する。取引の無いランはすべて0。
+    """
+    entry = np.asarray(result["entry_index"], dtype=np.int64)
+    n_runs = entry.shape[0]
+    traded = entry >= 0
+    base = np.arange(n_runs, dtype=np.int64) * n_minutes
+    entry_pos = np.where(traded, entry, 0) + base
+    exit_pos = np.where(traded, result["exit_index"], 0) + base
+    time = np.asarray(time, dtype=np.int64)
+    if time.shape[0] == n_minutes:
+        entry_pos -= base
+        exit_pos -= base
+    lot = np.where(traded, np.broadcast_to(np.asarray(lot, dtype=np.float64), (n_runs,)), 0.0)
+    pnl = np.where(traded, np.asarray(result["pnl_points"], dtype=np.float64), 0.0) * value_per_point(cfg) * lot
+    side = np.asarray(entry_side)[np.where(traded, entry, 0) + base]
+    return apply_costs(pnl, time[entry_pos], time[exit_pos], side, lot, cfg, run=np.arange(n_runs), **kwargs)
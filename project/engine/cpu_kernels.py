@@ -0,0 +1,276 @@
+"""CPU kernels mirroring :mod:`gpu_kernels` using Numba ``njit``.
+
+The per-run logic is a line-for-line port of ``k_simulate_runs_ohlc4`` so
+that the CPU and CUDA backends produce the same outputs for the same
+inputs. Runs are independent and distributed over cores with ``prange``.
+"""
+from numba import njit, prange
+
+
+@njit(cache=True, inline="always")
+def seg_hit_order(side, p0, p1):
+    """Return priority order for TP/SL when price moves p0->p1.
+
+    See :func:`gpu_kernels.seg_hit_order`.
+    """
+    if p1 > p0:
+        if side > 0:
+            return 1, -1
+        else:
+            return -1, 1
+    elif p1 < p0:
+        if side > 0:
+            return -1, 1
+        else:
+            return 1, -1
+    else:
+        return 0, 0
+
+
+@njit(cache=True, inline="always")
+def resolve_hit_in_segment(side, sl, tp, p0, p1):
+    """Determine SL/TP hit while price moves p0->p1.
+
+    See :func:`gpu_kernels.resolve_hit_in_segment`.
+    """
+    hit_tp = (p0 <= tp <= p1) or (p1 <= tp <= p0)
+    hit_sl = (p0 <= sl <= p1) or (p1 <= sl <= p0)
+    if hit_tp and hit_sl:
+        return -1
+    first, second = seg_hit_order(side, p0, p1)
+    if first == 1 and hit_tp:
+        return 1
+    if first == -1 and hit_sl:
+        return -1
+    if second == 1 and hit_tp:
+        return 1
+    if second == -1 and hit_sl:
+        return -1
+    return 0
+
+
+@njit(cache=True, inline="always")
+def resolve_hit_in_bar(side, sl, tp, bid0, bid1, bid2, bid3, ask0, ask1, ask2, ask3):
+    """Determine SL/TP hit within a bar of 4 ticks.
+
+    See :func:`gpu_kernels.resolve_hit_in_bar`.
+    """
+    if side > 0:
+        t0, t1, t2, t3 = bid0, bid1, bid2, bid3
+    else:
+        t0, t1, t2, t3 = ask0, ask1, ask2, ask3
+
+    for i in range(3):
+        if i == 0:
+            p0 = t0; p1 = t1
+        elif i == 1:
+            p0 = t1; p1 = t2
+        else:
+            p0 = t2; p1 = t3
+        res = resolve_hit_in_segment(side, sl, tp, p0, p1)
+        if res != 0:
+            return res
+    return 0
+
+
+@njit(cache=True, inline="always")
+def resolve_gap(side, price, sl, tp):
+    """Return the result when a bar opens at or beyond SL/TP.
+
+    See :func:`gpu_kernels.resolve_gap`.
+    """
+    if side > 0:
+        if price <= sl:
+            return -1
+        if price >= tp:
+            return 1
+    else:
+        if price >= sl:
+            return -1
+        if price <= tp:
+            return 1
+    return 0
+
+
+@njit(cache=True, inline="always")
+def trail_stop(side, sl, best, price, entry, activation, width):
+    """Advance the trailing stop after price reached ``price``.
+
+    See :func:`gpu_kernels.trail_stop`.
+    """
+    if side > 0:
+        if price > best:
+            best = price
+        if best - entry >= activation and best - width > sl:
+            sl = best - width
+    else:
+        if price < best:
+            best = price
+        if entry - best >= activation and best + width < sl:
+            sl = best + width
+    return sl, best
+
+
+@njit(cache=True, inline="always")
+def resolve_hit_trailing(side, sl, tp, best, entry, activation, width,
+                         bid0, bid1, bid2, bid3, ask0, ask1, ask2, ask3):
+    """Determine SL/TP hit within a bar while trailing the stop.
+
+    See :func:`gpu_kernels.resolve_hit_trailing`.
+    """
+    if side > 0:
+        t0, t1, t2, t3 = bid0, bid1, bid2, bid3
+    else:
+        t0, t1, t2, t3 = ask0, ask1, ask2, ask3
+
+    res = resolve_gap(side, t0, sl, tp)
+    if res != 0:
+        return res, sl, best
+    sl, best = trail_stop(side, sl, best, t0, entry, activation, width)
+    for i in range(3):
+        if i == 0:
+            p0 = t0; p1 = t1
+        elif i == 1:
+            p0 = t1; p1 = t2
+        else:
+            p0 = t2; p1 = t3
+        res = resolve_hit_in_segment(side, sl, tp, p0, p1)
+        if res != 0:
+            return res, sl, best
+        sl, best = trail_stop(side, sl, best, p1, entry, activation, width)
+    return 0, sl, best
+
+
+@njit(cache=True, inline="always")
+def simulate_trade(open_m1, high_m1, low_m1, close_m1, base, entry_t, end_t, side,
+                   sl_p, tp_p, trail_w, trail_act, point, ohlc_order, spread, spread_policy,
+                   idx, exit_reason, entry_price, exit_price, pnl_points,
+                   entry_index, exit_index):
+    """Simulate one trade entered at minute ``entry_t`` of the run at ``base``.
+
+    See :func:`gpu_kernels.simulate_trade`.
+    """
+    op = open_m1[base + entry_t]
+    if side > 0:
+        entry = op + spread
+        sl = entry - sl_p
+        tp = entry + tp_p
+        if spread_policy >= 1:
+            sl -= spread
+        if spread_policy == 2:
+            tp -= spread
+    else:
+        entry = op
+        sl = entry + sl_p
+        tp = entry - tp_p
+        if spread_policy >= 1:
+            sl += spread
+        if spread_policy == 2:
+            tp += spread
+    entry_price[idx] = entry
+    entry_index[idx] = entry_t
+    best = entry
+
+    for t in range(entry_t + 1, end_t):
+        i = base + t
+        if ohlc_order == 0:
+            b0 = open_m1[i]; b1 = high_m1[i]; b2 = low_m1[i]; b3 = close_m1[i]
+        else:
+            b0 = open_m1[i]; b1 = low_m1[i]; b2 = high_m1[i]; b3 = close_m1[i]
+        a0 = b0 + spread; a1 = b1 + spread; a2 = b2 + spread; a3 = b3 + spread
+        if trail_w > 0:
+            res, sl, best = resolve_hit_trailing(side, sl, tp, best, entry, trail_act, trail_w,
+                                                 b0, b1, b2, b3, a0, a1, a2, a3)
+        else:
+            res = resolve_hit_in_bar(side, sl, tp, b0, b1, b2, b3, a0, a1, a2, a3)
+        if res != 0:
+            exit_reason[idx] = res
+            exit_index[idx] = t
+            if res == -1:
+                exit_price[idx] = sl
+            else:
+                exit_price[idx] = tp
+            pnl_points[idx] = (exit_price[idx] - entry) / point * side
+            return
+
+    last = close_m1[base + end_t - 1]
+    if side > 0:
+        exit_price[idx] = last
+    else:
+        exit_price[idx] = last + spread
+    exit_reason[idx] = 0
+    exit_index[idx] = end_t - 1
+    pnl_points[idx] = (exit_price[idx] - entry) / point * side
+
+
+def _simulate_runs_ohlc4(open_m1, high_m1, low_m1, close_m1,
+                         entry_side, sl_points, tp_points,
+                         trail_start_ratio, trail_width_points,
+                         point, ohlc_order, spread_points, spread_policy,
+                         max_minutes, n_minutes, n_runs,
+                         exit_reason, entry_price, exit_price, pnl_points,
+                         entry_index, exit_index):
+    """Simulate multiple runs with OHLC4 ticks.
+
+    Each iteration of the outer ``prange`` loop handles one run, exactly as
+    one CUDA thread does in ``k_simulate_runs_ohlc4``, including the
+    per-run trailing stop.
+    """
+    spread = spread_points * point
+    for idx in prange(n_runs):
+        base = idx * n_minutes
+        entry_index[idx] = -1
+        exit_index[idx] = -1
+        for t in range(max_minutes):
+            side = entry_side[base + t]
+            if side != 0:
+                tp_p = tp_points[idx] * point
+                simulate_trade(open_m1, high_m1, low_m1, close_m1, base, t, max_minutes, side,
+                               sl_points[idx] * point, tp_p, trail_width_points[idx] * point,
+                               trail_start_ratio[idx] * tp_p, point, ohlc_order, spread, spread_policy,
+                               idx, exit_reason, entry_price, exit_price, pnl_points,
+                               entry_index, exit_index)
+                break
+
+
+def _simulate_shared_ohlc4(open_m1, high_m1, low_m1, close_m1,
+                           run_start, run_length,
+                           signal_index, signal_side, signal_begin, signal_end,
+                           sl_points, tp_points,
+                           trail_start_ratio, trail_width_points,
+                           point, ohlc_order, spread_points, spread_policy, n_runs,
+                           exit_reason, entry_price, exit_price, pnl_points,
+                           entry_index, exit_index):
+    """Simulate multiple runs over one shared OHLC4 series.
+
+    CPU port of ``k_simulate_shared_ohlc4``; one ``prange`` iteration per run.
+    """
+    spread = spread_points * point
+    for idx in prange(n_runs):
+        base = run_start[idx]
+        length = run_length[idx]
+        entry_index[idx] = -1
+        exit_index[idx] = -1
+        for k in range(signal_begin[idx], signal_end[idx]):
+            t = signal_index[k] - base
+            side = signal_side[k]
+            if t >= 0 and t < length and side != 0:
+                tp_p = tp_points[idx] * point
+                simulate_trade(open_m1, high_m1, low_m1, close_m1, base, t, length, side,
+                               sl_points[idx] * point, tp_p, trail_width_points[idx] * point,
+                               trail_start_ratio[idx] * tp_p, point, ohlc_order, spread, spread_policy,
+                               idx, exit_reason, entry_price, exit_price, pnl_points,
+                               entry_index, exit_index)
+                break
+
+
+# Multi-core kernel; runs are spread over Numba's thread pool.
+k_simulate_runs_ohlc4 = njit(cache=True, parallel=True)(_simulate_runs_ohlc4)
+
+# Single-threaded kernel (``prange`` behaves as ``range``). A thread pool
+# inherited through ``fork`` is not usable in the child, so worker processes
+# of the parallel optimizer use this variant.
+k_simulate_runs_ohlc4_serial = njit(cache=True)(_simulate_runs_ohlc4)
+
+k_simulate_shared_ohlc4 = njit(cache=True, parallel=True)(_simulate_shared_ohlc4)
+k_simulate_shared_ohlc4_serial = njit(cache=True)(_simulate_shared_ohlc4)
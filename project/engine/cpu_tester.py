@@ -3,20 +3,548 @@ from __future__ import annotations
 import argparse
 import json
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, List, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 
-from .actions import validate_actions
+from .actions import coerce_actions, is_trusted
+from .batch import BatchInputs, supports_batch, validate_signals
+from .checkpoint import (
+    Checkpoint,
+    Checkpointer,
+    get_ea_state,
+    last_hour_start,
+    load_checkpoint,
+    run_fingerprint,
+    set_ea_state,
+)
 from .config import Config
-from .context import ReadOnlyCtx, StateView
-from .errors import SimulationError
-from .indicators import compute_rsi_and_flags
+from .context import LiveCtx
+from .costs import history_costs
+from .data_cache import NS_PER_MINUTE, OHLCArrays, iter_year_chunks, load_ohlc, read_ohlc_csv
+from .errors import ConfigError, SimulationError
+from .execution import compute_lot_with_mode, value_per_point
+from .flags import FlagSet, build_flag_set
+from .indicator_cache import IndicatorCache
+from .indicators import IndicatorState, compute_rsi_and_flags, compute_rsi_and_flags_chunk
 from .logger import get_logger
-from .state import init_states
-from .ticks import iter_minute_segments
+from .orders import OrderBook, OrderBookView, initial_stops, uses_order_book
+from .passage import PassageIndex
+from .results_store import ResultsWriter, compact
+from .state import RunState, init_states
+from .tick_store import TickStore, resolve_on_ticks
+from .trailing import trailing_activation, trailing_bounds
+from .ticks import build_ask_matrix, frame_tick_matrix, iter_tick_rows
 from .loader import load_user_ea
 from .bar_sim import simulate_bar
+from .catalog import DataCatalog, load_arrays, period_bounds
+from .quality import MASK_NAMES, load_or_scan_quality, mask_flags, scan_quality, select_good_bars
+
+RESULTS_DIR = Path("outputs") / "results"
+CHECKPOINT_DIR = Path("outputs") / "checkpoints"
+COMPACT_MANIFESTS = 64  # 1ラン分の小さなパーティションがこの数たまったらまとめ直す
+
+
+def _load_quality(
+    path: str,
+    use_cache: bool = True,
+    symbol: str | None = None,
+    start: str | None = None,
+    end: str | None = None,
+    cfg: Config | None = None,
+) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """``load_arrays`` と同じ行に対応する品質マスクとレポートを返す。
+
+    キャッシュを使う場合はファイルごとに保存済みのマスクを再利用する。
+    ``cfg`` を渡すと取引時間の曜日を ``cfg.timezone`` で判定する。
+    """
+    if Path(path).is_dir():
+        parts = []
+        reports = {}
+        for file, _, begin, stop in DataCatalog(path).scan().query_ranges(symbol or "", start, end):
+            report, masks = load_or_scan_quality(file, cfg=cfg)
+            reports[str(file)] = report.to_dict()
+            parts.append({name: masks[name][begin:stop] for name in MASK_NAMES})
+        masks = {name: np.concatenate([p[name] for p in parts]) for name in MASK_NAMES}
+        return masks, reports
+    if use_cache:
+        report, masks = load_or_scan_quality(path, cfg=cfg)
+        begin, stop = period_bounds(load_ohlc(path), start, end)
+        return {name: masks[name][begin:stop] for name in MASK_NAMES}, {str(path): report.to_dict()}
+    arrays = read_ohlc_csv(path)
+    report, masks = scan_quality(arrays, cfg=cfg)
+    begin, stop = period_bounds(arrays, start, end)
+    return {name: masks[name][begin:stop] for name in MASK_NAMES}, {str(path): report.to_dict()}
+
+
+def _apply_bar(
+    state: RunState,
+    side: str,
+    lot: float,
+    ts: int,
+    ticks: Sequence[float],
+    ask_ticks: Sequence[float],
+    cfg: Config,
+    history: List[dict],
+) -> RunState:
+    """``simulate_bar`` を1本のバーに適用し、決済されれば履歴に追加する。
+
+    ノーポジションなら建玉し、建玉中ならそのバーでのSL/TP到達を判定する。
+    """
+    held_side, held_lot, open_time = state.position_side, state.lot, state.open_time
+    state, closed, result, profit = simulate_bar(
+        state,
+        side,
+        ticks,
+        ask_ticks,
+        cfg,
+        cfg.rr,
+        cfg.enable_trailing_stop,
+        cfg.trailing_start_ratio,
+        cfg.trailing_width_points,
+        cfg.stoploss_points,
+        lot,
+    )
+    if closed:
+        state.update_after_trade(profit, cfg)
+        state.open_time = None
+        history.append(_trade_row(ts, result, open_time, held_side, held_lot, profit))
+    elif held_side is None:
+        state.open_time = ts
+    return state
+
+
+def _trade_row(ts: int, result: str, open_time: int, side: str, lot: float, profit: float) -> dict:
+    """取引履歴の1行。``costs.history_costs`` が使う建玉時刻・方向・ロット・損益を含む。"""
+    return {
+        "time": pd.Timestamp(ts),
+        "result": result,
+        "entry_time": pd.Timestamp(open_time),
+        "side": side,
+        "lot": lot,
+        "profit": profit,
+    }
+
+
+def _next_exit(passage: PassageIndex, state: RunState, start: int, cfg: Config) -> int:
+    """``start`` 本目以降で建玉を判定する必要がある最初のバーを返す。
+
+    トレーリング有効時は発動価格や最有利価格の更新に届くバーも対象にする。
+    それ以外のバーではSLが動かないため、判定を飛ばしても結果は変わらない。
+    """
+    sl, tp = state.sl, state.tp
+    if cfg.enable_trailing_stop:
+        activation = trailing_activation(cfg.trailing_start_ratio, cfg.rr, cfg.stoploss_points, cfg.point)
+        sl, tp = trailing_bounds(state.position_side, sl, tp, state.best_price, state.open_price, activation)
+    return passage.first_hit(state.position_side, start, sl, tp)
+
+
+def _resolve_until(
+    state: RunState,
+    exit_at: int,
+    stop: int,
+    passage: PassageIndex,
+    times: np.ndarray,
+    bid: np.ndarray,
+    ask: np.ndarray,
+    cfg: Config,
+    history: List[dict],
+) -> Tuple[RunState, int]:
+    """``stop`` 本目の手前まで建玉を判定し、``(状態, 次の判定バー)`` を返す。"""
+    while state.position_side is not None and exit_at < stop:
+        k = exit_at
+        state = _apply_bar(state, state.position_side, state.lot, int(times[k]), bid[k].tolist(), ask[k].tolist(), cfg, history)
+        if state.position_side is not None:
+            exit_at = _next_exit(passage, state, k + 1, cfg)
+    return state, exit_at
+
+
+def _simulate_segment(
+    data: pd.DataFrame,
+    rsi_m15: np.ndarray,
+    rsi_h1: np.ndarray,
+    flags: FlagSet,
+    cfg: Config,
+    ea: Any,
+    state: RunState,
+    history: List[dict],
+    offset: int = 0,
+    book: OrderBook | None = None,
+    start: int = 0,
+    checkpoint: Checkpointer | None = None,
+) -> RunState:
+    """連続した1分足区間をシミュレーションする。
+
+    ``offset`` は区間先頭の通し番号で、EAには通しの分インデックスを渡す。
+    EAが ``emit_actions_batch`` を提供していれば区間のシグナルを一括で受け取り、
+    シグナルのあるバーだけを処理する。``None`` が返された場合や
+    ``STATEFUL = True`` が宣言されている場合は毎分 ``emit_actions`` を呼ぶ。
+
+    建玉は約定の翌バーから毎バー判定される。決済バーは ``PassageIndex`` で
+    建玉時に求めるため、SL/TPに届かないバーは調べない。トレーリング中は
+    SLが動き得るバーごとに求め直す。OPEN はバー開始時点で
+    ノーポジションの場合だけ約定する。
+
+    ``book`` を渡すと ``OrderBook`` による複数建玉・予約注文のシミュレーションになる。
+
+    ``start`` 本目より前は処理済みとして扱い、チェックポイントからの再開に使う。
+    ``checkpoint`` を渡すと、その間隔に達したバーの手前で状態を保存する。
+    一括シグナルの場合、EA状態は区間先頭の値を保存する。
+    """
+    bid = frame_tick_matrix(data, cfg.ohlc_order)
+    ask = build_ask_matrix(bid, cfg)
+    times = data.index.asi8
+    n = len(data)
+    check_at = checkpoint.next_check(offset + start) - offset if checkpoint is not None else n
+    if book is not None:
+        return _simulate_orders(
+            times, bid, ask, rsi_m15, rsi_h1, flags, cfg, ea, state, history, offset, book, start, checkpoint, check_at
+        )
+    passage = PassageIndex(bid, ask)
+    exit_at = n
+    if state.position_side is not None:
+        exit_at = _next_exit(passage, state, start, cfg)
+
+    if supports_batch(ea):
+        inputs = BatchInputs(
+            index=data.index,
+            open=data["open"].to_numpy(),
+            high=data["high"].to_numpy(),
+            low=data["low"].to_numpy(),
+            close=data["close"].to_numpy(),
+            bid=bid[:, 0],
+            ask=ask[:, 0],
+            rsi_m15=rsi_m15,
+            rsi_h1=rsi_h1,
+            flags=flags,
+            cfg=cfg,
+            offset=offset,
+        )
+        segment_ea_state = get_ea_state(ea) if checkpoint is not None else None
+        signals = ea.emit_actions_batch(inputs)
+        if signals is not None:
+            validate_signals(signals, n)
+            for j in np.flatnonzero(signals.side[start:]).tolist():
+                j += start
+                while check_at <= j:
+                    state, exit_at = _resolve_until(state, exit_at, check_at, passage, times, bid, ask, cfg, history)
+                    checkpoint.maybe_save(offset + check_at, state, history, ea_state=segment_ea_state)
+                    check_at = checkpoint.next_check(offset + check_at + 1) - offset
+                if state.position_side is not None:
+                    state, exit_at = _resolve_until(state, exit_at, j, passage, times, bid, ask, cfg, history)
+                    if state.position_side is not None:
+                        state, exit_at = _resolve_until(state, exit_at, j + 1, passage, times, bid, ask, cfg, history)
+                        continue
+                side = "BUY" if signals.side[j] > 0 else "SELL"
+                lot = signals.lot_at(j)
+                if lot != lot:
+                    lot = compute_lot_with_mode(
+                        state.balance, state.risk_pct, cfg.stoploss_points, cfg, loss_streak=state.loss_streak
+                    )
+                state = _apply_bar(state, side, lot, int(times[j]), bid[j].tolist(), ask[j].tolist(), cfg, history)
+                exit_at = _next_exit(passage, state, j + 1, cfg)
+            while check_at < n:
+                state, exit_at = _resolve_until(state, exit_at, check_at, passage, times, bid, ask, cfg, history)
+                checkpoint.maybe_save(offset + check_at, state, history, ea_state=segment_ea_state)
+                check_at = checkpoint.next_check(offset + check_at + 1) - offset
+            state, _ = _resolve_until(state, exit_at, n, passage, times, bid, ask, cfg, history)
+            return state
+
+    trusted = is_trusted(ea)
+    ctx = LiveCtx(state, cfg, rsi_m15, rsi_h1, flags)
+    for j, (ts, ticks, ask_ticks) in enumerate(iter_tick_rows(times, bid, ask, start), start):
+        if j == check_at:
+            checkpoint.maybe_save(offset + j, state, history)
+            check_at = checkpoint.next_check(offset + j + 1) - offset
+        ctx._advance(j, ticks[0], ask_ticks[0])
+        actions = coerce_actions(ea.emit_actions(offset + j, ctx), trusted)
+        if state.position_side is not None:
+            if j == exit_at:
+                state = _apply_bar(state, state.position_side, state.lot, ts, ticks, ask_ticks, cfg, history)
+                if state.position_side is not None:
+                    exit_at = _next_exit(passage, state, j + 1, cfg)
+            continue
+        for act in actions:
+            if act.type == "OPEN":
+                state = _apply_bar(state, act.side, act.lot, ts, ticks, ask_ticks, cfg, history)
+                exit_at = _next_exit(passage, state, j + 1, cfg)
+                break
+    return state
+
+
+def _simulate_orders(
+    times: np.ndarray,
+    bid: np.ndarray,
+    ask: np.ndarray,
+    rsi_m15: np.ndarray,
+    rsi_h1: np.ndarray,
+    flags: FlagSet,
+    cfg: Config,
+    ea: Any,
+    state: RunState,
+    history: List[dict],
+    offset: int,
+    book: OrderBook,
+    start: int = 0,
+    checkpoint: Checkpointer | None = None,
+    check_at: int = -1,
+) -> RunState:
+    """``OrderBook`` を使って区間をシミュレーションする。
+
+    毎分EAのアクションをバー始値で適用したあと、バー内のSL/TP到達と予約注文の約定を処理する。
+    """
+    trusted = is_trusted(ea)
+    ctx = LiveCtx(state, cfg, rsi_m15, rsi_h1, flags, OrderBookView(book))
+    for j, (ts, ticks, ask_ticks) in enumerate(iter_tick_rows(times, bid, ask, start), start):
+        if j == check_at:
+            checkpoint.maybe_save(offset + j, state, history, book)
+            check_at = checkpoint.next_check(offset + j + 1) - offset
+        ctx._advance(j, ticks[0], ask_ticks[0])
+        actions = coerce_actions(ea.emit_actions(offset + j, ctx), trusted)
+        book.time = ts
+        closed = book.apply(actions, ticks[0], ask_ticks[0])
+        closed += book.step(ticks, ask_ticks)
+        if closed:
+            book.settle(closed, state, ts, history)
+    return state
+
+
+def _columns(arrays: OHLCArrays) -> List[np.ndarray]:
+    return [arrays.time, arrays.open, arrays.high, arrays.low, arrays.close]
+
+
+def check_resume(resume: Checkpoint, columns: Sequence[np.ndarray], cfg: Config, mode: str) -> None:
+    """``resume`` を ``columns`` (エポック分の時刻とOHLC) のデータで再開できるか確認する。
+
+    データはチェックポイントを書いた時点のものと先頭から一致し、末尾に追記されただけで
+    あればよい。追記された場合、再開位置は元のデータの ``last_hour_start`` 以前である必要がある。
+    満たさなければ ``ConfigError``。
+    """
+    n = len(columns[0])
+    prefix = [c[: resume.bars] for c in columns] if resume.bars < n else columns
+    if resume.bars > n or run_fingerprint(prefix, cfg, mode) != resume.fingerprint:
+        raise ConfigError("checkpoint was written for different data, settings or mode")
+    if resume.bars < n and resume.cursor > last_hour_start(columns[0][: resume.bars]):
+        raise ConfigError("checkpoint is past the last complete hour and cannot continue on appended data")
+
+
+def _begin_run(
+    columns: Sequence[np.ndarray],
+    cfg: Config,
+    ea: Any,
+    mode: str,
+    checkpoint: Checkpointer | None,
+    resume: Checkpoint | None,
+) -> Tuple[RunState, List[dict], OrderBook | None]:
+    """新規実行、または ``resume`` から再開する場合の ``(状態, 取引履歴, OrderBook)`` を返す。
+
+    ``columns`` はエポック分の時刻とOHLCで、チェックポイントを使う場合だけ指紋を計算する。
+    """
+    if checkpoint is not None:
+        checkpoint.fingerprint = run_fingerprint(columns, cfg, mode)
+        checkpoint.bars = len(columns[0])
+    if resume is None:
+        return init_states(cfg), [], OrderBook(cfg) if uses_order_book(ea) else None
+    check_resume(resume, columns, cfg, mode)
+    set_ea_state(ea, resume.ea_state)
+    if checkpoint is not None:
+        checkpoint.resume_from(resume)
+    return resume.run_state(), list(resume.history), resume.book
+
+
+def run_backtest(
+    data: pd.DataFrame,
+    cfg: Config,
+    ea: Any,
+    extra_flags: Dict[str, np.ndarray] | None = None,
+    cache: IndicatorCache | None = None,
+    checkpoint: Checkpointer | None = None,
+    resume: Checkpoint | None = None,
+) -> List[dict]:
+    """全期間を一括で読み込んだデータでバックテストを行う。
+
+    ``extra_flags`` を渡すとバーごとのフラグ列として EA に公開される。
+    ``cache`` を渡すと同じデータ・期間のRSIは再計算されない。
+    ``checkpoint`` を渡すと一定間隔で状態を保存し、``resume`` に読み込んだ
+    チェックポイントを渡すとその位置から再開する。
+    """
+    columns = [data.index.asi8 // NS_PER_MINUTE, *(data[c].to_numpy() for c in ("open", "high", "low", "close"))]
+    state, history, book = _begin_run(columns, cfg, ea, "full", checkpoint, resume)
+    rsi_m15, rsi_h1, flags = compute_rsi_and_flags(data, cfg, cache)
+    flag_set = build_flag_set(data, rsi_m15, rsi_h1, flags, cfg, extra_flags)
+    start = resume.cursor if resume is not None else 0
+    _simulate_segment(data, rsi_m15, rsi_h1, flag_set, cfg, ea, state, history, 0, book, start, checkpoint)
+    return history
+
+
+def run_backtest_streaming(
+    arrays: OHLCArrays,
+    cfg: Config,
+    ea: Any,
+    extra_flags: Dict[str, np.ndarray] | None = None,
+    checkpoint: Checkpointer | None = None,
+    resume: Checkpoint | None = None,
+) -> List[dict]:
+    """``cfg.chunk_years`` 年ごとにデータを読み込みながらバックテストを行う。
+
+    指標のウォームアップ状態、``RunState`` およびEAモジュールの状態は
+    チャンク間で引き継がれるため、取引履歴は ``run_backtest`` と一致する。
+    EAに渡すRSI履歴は現在のチャンク内に限られる。
+    再開時は保存されたチャンク先頭の指標状態からそのチャンクを計算し直す。
+    """
+    state, history, book = _begin_run(_columns(arrays), cfg, ea, "stream", checkpoint, resume)
+    ind_state: IndicatorState | None = resume.indicator if resume is not None else None
+    offset = 0
+    for chunk in iter_year_chunks(arrays, cfg.chunk_years):
+        if resume is not None and offset < resume.chunk_start:
+            offset += len(chunk)
+            continue
+        start = resume.cursor - offset if resume is not None and offset == resume.chunk_start else 0
+        data = chunk.to_frame()
+        if checkpoint is not None:
+            checkpoint.begin_chunk(offset, ind_state)
+        rsi_m15, rsi_h1, flags, ind_state = compute_rsi_and_flags_chunk(data, cfg, ind_state)
+        extra = {k: v[offset : offset + len(data)] for k, v in (extra_flags or {}).items()}
+        flag_set = build_flag_set(data, rsi_m15, rsi_h1, flags, cfg, extra)
+        state = _simulate_segment(
+            data, rsi_m15, rsi_h1, flag_set, cfg, ea, state, history, offset, book, start, checkpoint
+        )
+        offset += len(data)
+    return history
+
+
+def run_backtest_incremental(
+    arrays: OHLCArrays,
+    cfg: Config,
+    ea: Any,
+    tail_path: str | Path,
+    extra_flags: Dict[str, np.ndarray] | None = None,
+    stream: bool = False,
+) -> List[dict]:
+    """前回の実行以降に末尾へ追記されたバーだけをシミュレーションする。
+
+    ``tail_path`` には前回の実行が ``last_hour_start`` の手前で保存した状態がある。
+    データが前回から末尾に伸びただけならその位置から再開し、無い場合や
+    それ以前のデータが変わった場合は先頭から実行する。どちらの場合も今回のデータの
+    ``last_hour_start`` の状態を ``tail_path`` に保存し直す。返す取引履歴は
+    先頭から通しで実行した場合と一致する。``stream`` なら再開位置を含むチャンクだけの
+    指標を計算し直す。
+    """
+    tail_path = Path(tail_path)
+    tail = load_checkpoint(tail_path) if tail_path.exists() else None
+    if tail is not None:
+        try:
+            check_resume(tail, _columns(arrays), cfg, "stream" if stream else "full")
+        except ConfigError:
+            tail = None
+    with Checkpointer(None, ea, tail_at=last_hour_start(arrays.time), tail_path=tail_path) as checkpoint:
+        if stream:
+            return run_backtest_streaming(arrays, cfg, ea, extra_flags, checkpoint, tail)
+        return run_backtest(arrays.to_frame(), cfg, ea, extra_flags, None, checkpoint, tail)
+
+
+def _open_on_tick(state: RunState, ts: int, side: str, bid: float, ask: float, lot: float, cfg: Config) -> None:
+    """実ティックで建玉する。SL/TPの置き方はバッチカーネルと同じ規則に従う。"""
+    entry = ask if side == "BUY" else bid
+    sl, tp = initial_stops(side, entry, ask - bid, cfg)
+    state.position_side = side
+    state.open_price = entry
+    state.sl = sl
+    state.tp = tp
+    state.lot = lot
+    state.open_time = ts
+
+
+def run_backtest_ticks(store: TickStore, cfg: Config, ea: Any) -> List[dict]:
+    """実ティックでSL/TPを判定するバックテストを行う。
+
+    1回目の走査でBidから1分足を作って指標を計算し、2回目の走査で
+    ティックをチャンクごとに展開しながら分単位でEAを呼び出す。
+    建玉中は約定したティック以降を順に調べ、最初にSL/TPへ届いた
+    ティックで決済する。ティック全体をメモリに載せることはない。
+    ``ORDER_BOOK`` を宣言したEAとトレーリングストップには対応しない。
+    """
+    if uses_order_book(ea):
+        raise SimulationError("order book EAs are not supported with real ticks")
+    if cfg.enable_trailing_stop:
+        raise SimulationError("trailing stops are not supported with real ticks")
+    bars = store.m1_bars().to_frame()
+    rsi_m15, rsi_h1, flags = compute_rsi_and_flags(bars, cfg)
+    flag_set = build_flag_set(bars, rsi_m15, rsi_h1, flags, cfg)
+    state = init_states(cfg)
+    history: List[dict] = []
+    vpp = value_per_point(cfg)
+    trusted = is_trusted(ea)
+    ctx = LiveCtx(state, cfg, rsi_m15, rsi_h1, flag_set)
+    j = -1
+    current_minute: int | None = None
+    for chunk in store.iter_chunks():
+        minutes = chunk.time // NS_PER_MINUTE
+        starts = np.flatnonzero(np.r_[True, minutes[1:] != minutes[:-1]]).tolist()
+        ends = starts[1:] + [len(chunk)]
+        for s, e in zip(starts, ends):
+            if int(minutes[s]) != current_minute:
+                current_minute = int(minutes[s])
+                j += 1
+                bid0 = float(chunk.bid[s])
+                ask0 = float(chunk.ask[s])
+                ctx._advance(j, bid0, ask0)
+                for act in coerce_actions(ea.emit_actions(j, ctx), trusted):
+                    if act.type == "OPEN" and state.position_side is None:
+                        _open_on_tick(state, int(chunk.time[s]), act.side, bid0, ask0, act.lot, cfg)
+            if state.position_side is None:
+                continue
+            result, k = resolve_on_ticks(state.position_side, state.sl, state.tp, chunk.bid[s:e], chunk.ask[s:e])
+            if not result:
+                continue
+            exit_price = state.sl if result == "SL" else state.tp
+            sign = 1 if state.position_side == "BUY" else -1
+            points = (exit_price - state.open_price) / cfg.point * sign
+            profit = points * vpp * (state.lot or 0)
+            row = _trade_row(int(chunk.time[s + k]), result, state.open_time, state.position_side, state.lot, profit)
+            state.position_side = state.open_price = state.sl = state.tp = state.lot = state.open_time = None
+            state.update_after_trade(profit, cfg)
+            history.append(row)
+    return history
+
+
+def _write_outputs(run_id: str, history: List[dict], output_format: str = "csv", cfg: Config | None = None) -> None:
+    """取引履歴とマニフェストを ``outputs/`` に書き出す。
+
+    ``columnar`` の場合は ``outputs/results`` の列指向ストアへ追記する。1回の実行は
+    1ラン分の小さなパーティションになるため、``COMPACT_MANIFESTS`` 回分たまるごとに
+    ``results_store.compact`` でまとめ直す。
+    ``cfg`` を渡すと取引に手数料・スワップ・純損益・残高の列を、
+    マニフェスト (列指向では runs テーブル) に純損益を加える。
+    """
+    costs = history_costs(history, cfg) if cfg is not None and history else None
+    columns: Dict[str, np.ndarray] = {}
+    summary: Dict[str, Any] = {"trades": len(history)}
+    if costs is not None:
+        columns = {
+            "commission": costs.commission,
+            "swap": costs.swap,
+            "net_profit": costs.net_pnl,
+            "balance": costs.balance,
+        }
+    if cfg is not None:
+        # 取引の無いランでも runs テーブルの列をそろえる
+        summary["net_profit"] = float(costs.net_pnl.sum()) if costs is not None else 0.0
+    if output_format == "columnar":
+        with ResultsWriter(RESULTS_DIR) as writer:
+            writer.append_trades(run_id, history, columns=columns)
+            writer.append_run(run_id, summary)
+        compact(RESULTS_DIR, min_manifests=COMPACT_MANIFESTS)
+        return
+    out_dir = Path("outputs")
+    out_dir.mkdir(exist_ok=True)
+    frame = pd.DataFrame(history)
+    for name, values in columns.items():
+        frame[name] = values
+    manifest: Dict[str, Any] = {"run_id": run_id, **summary}
+    frame.to_csv(out_dir / f"TH_{run_id}.csv", index=False)
+    (out_dir / f"Manifest_{run_id}.json").write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
 
 
 def main() -> None:
@@ -25,7 +553,36 @@ def main() -> None:
     parser.add_argument("--config", required=True)
     parser.add_argument("--run-id", required=True)
     parser.add_argument("--log-level", default="INFO")
-    parser.add_argument("--data", required=True, help="OHLCデータのCSVファイルパス")
+    parser.add_argument("--data", default=None, help="OHLCデータのCSVファイルパス (省略時は data_path)")
+    parser.add_argument("--no-cache", action="store_true", help="列指向キャッシュを使わずCSVを直接読む")
+    parser.add_argument("--stream", action="store_true", help="chunk_years 年ごとに分割して逐次実行する")
+    parser.add_argument("--ticks", default=None, help="実ティックストアでSL/TPを判定する (tick_store で作成)")
+    parser.add_argument(
+        "--output-format",
+        choices=["csv", "columnar"],
+        default="csv",
+        help="結果の出力形式 (columnar: outputs/results に列指向で追記)",
+    )
+    parser.add_argument("--indicator-cache", default=None, help="計算済みRSIを保存・再利用するディレクトリ")
+    parser.add_argument("--symbol", default=None, help="データディレクトリから読むシンボル (省略時は設定の symbol)")
+    parser.add_argument("--start", default=None, help="開始日時 (例: 2015-03)")
+    parser.add_argument("--end", default=None, help="終了日時 (例: 2019-11、その期間の末尾を含む)")
+    parser.add_argument(
+        "--bad-bars",
+        choices=["keep", "flag", "skip"],
+        default="keep",
+        help="品質チェックで検出したバーの扱い (flag: EAフラグに追加, skip: 除外)",
+    )
+    parser.add_argument("--checkpoint-bars", type=int, default=None, help="このバー数ごとにチェックポイントを保存する")
+    parser.add_argument("--checkpoint-seconds", type=float, default=None, help="この秒数ごとにチェックポイントを保存する")
+    parser.add_argument(
+        "--resume", action="store_true", help="outputs/checkpoints の同じ run-id のチェックポイントから再開する"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="前回の同じ run-id の実行から末尾に追記されたバーだけを計算し、結果を更新する",
+    )
     args = parser.parse_args()
 
     cfg = Config.from_yaml(args.config)
@@ -33,63 +590,77 @@ def main() -> None:
 
     try:
         ea = load_user_ea()
-        data = pd.read_csv(args.data)
-        data["time"] = pd.to_datetime(data["time"])
-        data.set_index("time", inplace=True)
-        data.sort_index(inplace=True)
-        rsi_m15, rsi_h1, flags = compute_rsi_and_flags(data, cfg)
-        state = init_states(cfg)
-        history: List[dict] = []
-        for i, (ts, *ticks) in enumerate(iter_minute_segments(data, cfg.ohlc_order)):
-            view = StateView(
-                position_side=state.position_side,
-                open_price=state.open_price,
-                sl=state.sl,
-                tp=state.tp,
-                loss_streak=state.loss_streak,
-                buy_locked=state.buy_locked,
-                sell_locked=state.sell_locked,
-                lot=state.lot,
-                balance=state.balance,
-                risk_pct=state.risk_pct,
-                cfg=cfg,
-            )
-            ctx = ReadOnlyCtx(
-                bid=ticks[0],
-                ask=ticks[0] + cfg.fixed_spread_point * cfg.point,
-                point=cfg.point,
-                rsi_m15=rsi_m15[: i + 1],
-                rsi_h1=rsi_h1[: i + 1],
-                flags={k: flags.iloc[i][k] for k in flags.columns},
-                state=view,
-                cfg=cfg,
-            )
-            actions = ea.emit_actions(i, ctx)
-            validate_actions(actions)
-            for act in actions:
-                if act["type"] == "OPEN":
-                    state, closed, result, profit = simulate_bar(
-                        state,
-                        act["side"],
-                        ticks,
-                        tuple(t + cfg.fixed_spread_point * cfg.point for t in ticks),
-                        cfg,
-                        cfg.rr,
-                        cfg.enable_trailing_stop,
-                        cfg.trailing_start_ratio,
-                        cfg.trailing_width_points,
-                        cfg.stoploss_points,
-                        act["lot"],
-                    )
-                    if closed:
-                        state.update_after_trade(profit, cfg)
-                        history.append({"time": ts, "result": result})
+        source = {
+            "use_cache": not args.no_cache,
+            "symbol": args.symbol or cfg.symbol,
+            "start": args.start,
+            "end": args.end,
+        }
+        checkpointing = bool(args.checkpoint_bars or args.checkpoint_seconds)
+        if args.incremental:
+            if checkpointing or args.resume:
+                raise ConfigError("--incremental cannot be combined with checkpoint options")
+            if args.output_format != "csv":
+                raise ConfigError("--incremental rewrites the trade ledger and requires csv output")
+        if args.ticks:
+            if checkpointing or args.resume or args.incremental:
+                raise ConfigError("checkpoints are not supported with real ticks")
+            history = run_backtest_ticks(TickStore(args.ticks), cfg, ea)
+            _write_outputs(args.run_id, history, args.output_format, cfg)
+            logger.info("simulation finished: %s trades", len(history))
+            return
+        data_path = args.data or cfg.data_path
+        arrays = load_arrays(data_path, **source)
+        extra_flags = None
         out_dir = Path("outputs")
         out_dir.mkdir(exist_ok=True)
-        hist_path = out_dir / f"TH_{args.run_id}.csv"
-        pd.DataFrame(history).to_csv(hist_path, index=False)
-        manifest = {"run_id": args.run_id, "trades": len(history)}
-        (out_dir / f"Manifest_{args.run_id}.json").write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
+        if args.bad_bars != "keep":
+            masks, reports = _load_quality(data_path, **source, cfg=cfg)
+            summary = {
+                "files": reports,
+                "selected": {
+                    "rows": len(arrays),
+                    "bad": int(np.count_nonzero(masks["bad"])),
+                    "off_session": int(len(arrays) - np.count_nonzero(masks["session"])),
+                    "gap_after": int(np.count_nonzero(masks["gap_after"])),
+                },
+            }
+            (out_dir / f"Quality_{args.run_id}.json").write_text(json.dumps(summary, ensure_ascii=False), encoding="utf-8")
+            logger.info("data quality: %s", summary["selected"])
+            if args.bad_bars == "skip":
+                arrays = select_good_bars(arrays, masks)
+            else:
+                extra_flags = mask_flags(masks)
+        if args.incremental:
+            tail_path = CHECKPOINT_DIR / f"{args.run_id}.tail"
+            history = run_backtest_incremental(arrays, cfg, ea, tail_path, extra_flags, args.stream)
+            _write_outputs(args.run_id, history, args.output_format, cfg)
+            logger.info("incremental run finished: %s trades", len(history))
+            return
+        ckpt_path = CHECKPOINT_DIR / f"{args.run_id}.ckpt"
+        resume = None
+        if args.resume:
+            if ckpt_path.exists():
+                resume = load_checkpoint(ckpt_path)
+                logger.info("resuming from bar %s with %s trades", resume.cursor, len(resume.history))
+            else:
+                logger.info("no checkpoint found, starting from the beginning: %s", ckpt_path)
+        checkpoint = Checkpointer(ckpt_path, ea, args.checkpoint_bars, args.checkpoint_seconds) if checkpointing else None
+        try:
+            if args.stream:
+                history = run_backtest_streaming(arrays, cfg, ea, extra_flags, checkpoint, resume)
+            else:
+                cache = IndicatorCache(disk_dir=args.indicator_cache) if args.indicator_cache else None
+                history = run_backtest(arrays.to_frame(), cfg, ea, extra_flags, cache, checkpoint, resume)
+                if cache is not None:
+                    logger.info("indicator cache: %s", cache.stats)
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+                logger.info("checkpoints written: %s", checkpoint.saved)
+        _write_outputs(args.run_id, history, args.output_format, cfg)
+        if checkpointing or resume is not None:
+            ckpt_path.unlink(missing_ok=True)
         logger.info("simulation finished: %s trades", len(history))
     except Exception as exc:  # pragma: no cover - エラー時出力
         logger.error("simulation error: %s", exc)
@@ -0,0 +1,254 @@
+"""OHLC CSV を列指向のバイナリへ変換し、メモリマップで再利用するキャッシュ。"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .logger import get_logger
+
+CACHE_DIRNAME = ".ohlc_cache"
+CACHE_VERSION = 2
+PRICE_COLUMNS = ("open", "high", "low", "close")
+NS_PER_MINUTE = 60_000_000_000
+
+
+@dataclass(frozen=True)
+class OHLCArrays:
+    """エポック分の時刻と OHLC 価格を列ごとに保持する。"""
+
+    time: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.time.shape[0])
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "OHLCArrays":
+        """``to_frame`` と同じ形式 (時刻インデックスとOHLC列) の DataFrame から作る。"""
+        return cls(
+            time=frame.index.asi8 // NS_PER_MINUTE,
+            **{col: frame[col].to_numpy() for col in PRICE_COLUMNS},
+        )
+
+    def slice(self, start: int, stop: int) -> "OHLCArrays":
+        """行範囲 ``[start, stop)`` のビューを返す。メモリマップはコピーされない。"""
+        return OHLCArrays(
+            time=self.time[start:stop],
+            **{col: getattr(self, col)[start:stop] for col in PRICE_COLUMNS},
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        """``time`` をインデックスとした DataFrame に変換する。"""
+        index = pd.DatetimeIndex(self.time.astype("int64") * NS_PER_MINUTE, name="time")
+        return pd.DataFrame(
+            {col: getattr(self, col) for col in PRICE_COLUMNS},
+            index=index,
+        )
+
+
+def _file_sha256(path: Path) -> str:
+    """ファイル内容の SHA-256 を返す。"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_stat(path: Path) -> Dict[str, Any]:
+    st = path.stat()
+    return {"path": str(path.resolve()), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def cache_dir_for(csv_path: str | Path, cache_root: str | Path | None = None) -> Path:
+    """CSV に対応するキャッシュディレクトリを返す。
+
+    既定ではCSVと同じディレクトリの ``.ohlc_cache`` 以下に、絶対パスの
+    ハッシュを名前とするエントリを作成する。
+    """
+    path = Path(csv_path)
+    root = Path(cache_root) if cache_root else path.parent / CACHE_DIRNAME
+    key = hashlib.sha1(str(path.resolve()).encode("utf-8")).hexdigest()[:16]
+    return root / f"{path.stem}-{key}"
+
+
+def _parse_csv(csv_path: str | Path) -> Tuple[OHLCArrays, int]:
+    """CSV を時刻順に並べ、元の並びで時刻が逆行していた行数と共に返す。"""
+    data = pd.read_csv(csv_path)
+    times = pd.to_datetime(data["time"]).to_numpy("datetime64[ns]").astype("int64")
+    out_of_order = int(np.count_nonzero(np.diff(times) < 0))
+    order = np.argsort(times, kind="stable")
+    arrays = OHLCArrays(
+        time=times[order] // NS_PER_MINUTE,
+        **{col: data[col].to_numpy("float64")[order] for col in PRICE_COLUMNS},
+    )
+    return arrays, out_of_order
+
+
+def read_ohlc_csv(csv_path: str | Path) -> OHLCArrays:
+    """CSV を読み込み時刻順に並べた OHLCArrays を返す。"""
+    return _parse_csv(csv_path)[0]
+
+
+def _read_meta(entry: Path) -> Dict[str, Any] | None:
+    try:
+        return json.loads((entry / "meta.json").read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def read_cache_meta(entry: str | Path) -> Dict[str, Any] | None:
+    """キャッシュエントリのメタデータを返す。存在しなければ None。"""
+    return _read_meta(Path(entry))
+
+
+def _is_fresh(meta: Dict[str, Any] | None, source: Dict[str, Any]) -> bool:
+    if not meta or meta.get("version") != CACHE_VERSION:
+        return False
+    return all(meta["source"].get(k) == source[k] for k in ("path", "size", "mtime_ns"))
+
+
+def build_cache(csv_path: str | Path, cache_root: str | Path | None = None) -> Path:
+    """CSV から列指向キャッシュを作成し、エントリのパスを返す。
+
+    一時ディレクトリへ書き出してから置き換えるため、並行実行中の
+    プロセスが書きかけのファイルを開くことはない。
+    """
+    path = Path(csv_path)
+    entry = cache_dir_for(path, cache_root)
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    source = _source_stat(path)
+    arrays, out_of_order = _parse_csv(path)
+
+    tmp = Path(tempfile.mkdtemp(prefix=f".{entry.name}.", dir=entry.parent))
+    try:
+        np.save(tmp / "time.npy", arrays.time.astype("int64"))
+        for col in PRICE_COLUMNS:
+            np.save(tmp / f"{col}.npy", getattr(arrays, col).astype("float64"))
+        meta = {
+            "version": CACHE_VERSION,
+            "source": {**source, "sha256": _file_sha256(path)},
+            "rows": len(arrays),
+            "out_of_order": out_of_order,
+        }
+        (tmp / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        if entry.exists():
+            shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp, entry)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return entry
+
+
+def open_cache(entry: str | Path) -> OHLCArrays:
+    """キャッシュエントリを読み取り専用のメモリマップとして開く。"""
+    entry = Path(entry)
+    cols = {name: np.load(entry / f"{name}.npy", mmap_mode="r") for name in ("time", *PRICE_COLUMNS)}
+    return OHLCArrays(**cols)
+
+
+def load_ohlc(
+    csv_path: str | Path,
+    cache_root: str | Path | None = None,
+    use_cache: bool = True,
+) -> OHLCArrays:
+    """CSV をキャッシュ経由で読み込む。
+
+    パス・サイズ・更新時刻がメタデータと一致すればメモリマップを返し、
+    一致しなければキャッシュを作り直す。
+    """
+    path = Path(csv_path)
+    if not use_cache:
+        return read_ohlc_csv(path)
+    entry = cache_dir_for(path, cache_root)
+    if not _is_fresh(_read_meta(entry), _source_stat(path)):
+        get_logger(__name__).info("building OHLC cache: %s", entry)
+        build_cache(path, cache_root)
+    return open_cache(entry)
+
+
+def iter_year_chunks(arrays: OHLCArrays, years: int) -> Iterator[OHLCArrays]:
+    """``years`` 年ごとの暦年境界で区切ったビューを順に返す。"""
+    if years <= 0:
+        raise ValueError("years must be > 0")
+    if len(arrays) == 0:
+        return
+    first = pd.Timestamp(int(arrays.time[0]) * NS_PER_MINUTE).year
+    last = pd.Timestamp(int(arrays.time[-1]) * NS_PER_MINUTE).year
+    bounds = [
+        pd.Timestamp(year=y, month=1, day=1).value // NS_PER_MINUTE
+        for y in range(first + years, last + 1, years)
+    ]
+    cuts = [0, *np.searchsorted(arrays.time, bounds, side="left").tolist(), len(arrays)]
+    for start, stop in zip(cuts[:-1], cuts[1:]):
+        if stop > start:
+            yield arrays.slice(start, stop)
+
+
+def verify_cache(csv_path: str | Path, cache_root: str | Path | None = None) -> bool:
+    """キャッシュがCSVの内容と一致するかをハッシュと行数で検証する。"""
+    path = Path(csv_path)
+    entry = cache_dir_for(path, cache_root)
+    meta = _read_meta(entry)
+    if not _is_fresh(meta, _source_stat(path)):
+        return False
+    assert meta is not None
+    if meta["source"].get("sha256") != _file_sha256(path):
+        return False
+    try:
+        arrays = open_cache(entry)
+    except (FileNotFoundError, ValueError):
+        return False
+    return all(getattr(arrays, c).shape == (meta["rows"],) for c in ("time", *PRICE_COLUMNS))
+
+
+def invalidate_cache(csv_path: str | Path, cache_root: str | Path | None = None) -> bool:
+    """キャッシュエントリを削除する。削除した場合は True を返す。"""
+    entry = cache_dir_for(csv_path, cache_root)
+    if not entry.exists():
+        return False
+    shutil.rmtree(entry)
+    return True
+
+
+def main() -> None:
+    """キャッシュの作成・検証・削除を行うCLI。"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["build", "verify", "invalidate"])
+    parser.add_argument("csv", nargs="+", help="対象のOHLC CSVファイル")
+    parser.add_argument("--cache-dir", default=None)
+    args = parser.parse_args()
+    logger = get_logger(__name__)
+
+    failed = False
+    for csv_path in args.csv:
+        if args.command == "build":
+            entry = build_cache(csv_path, args.cache_dir)
+            logger.info("cache built: %s -> %s", csv_path, entry)
+        elif args.command == "verify":
+            ok = verify_cache(csv_path, args.cache_dir)
+            logger.info("cache %s: %s", "valid" if ok else "invalid", csv_path)
+            failed = failed or not ok
+        else:
+            removed = invalidate_cache(csv_path, args.cache_dir)
+            logger.info("cache %s: %s", "removed" if removed else "not found", csv_path)
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
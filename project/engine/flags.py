@@ -0,0 +1,159 @@
+"""バーごとのフラグをビット列にまとめ、EAから辞書のように参照するための仕組み。"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Mapping
+
+import numpy as np
+import pandas as pd
+
+from .config import Config
+
+MAX_FLAGS = 64
+
+
+@dataclass(frozen=True)
+class FlagInputs:
+    """登録フラグの計算に渡す配列。いずれもシミュレーション区間のバー数と同じ長さ。"""
+
+    index: pd.DatetimeIndex
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    rsi_m15: np.ndarray
+    rsi_h1: np.ndarray
+    cfg: Config
+
+
+FlagFunc = Callable[[FlagInputs], np.ndarray]
+
+_registry: Dict[str, FlagFunc] = {}
+
+
+def register_flag(name: str, func: FlagFunc | None = None) -> Callable[[FlagFunc], FlagFunc] | FlagFunc:
+    """バー数分の bool 配列を返す関数をフラグ ``name`` として登録する。
+
+    関数はシミュレーション開始前に区間全体に対して1度だけ呼ばれるため、
+    NumPy のベクトル演算で書くこと。デコレータとしても使える。
+
+        @register_flag("h1_oversold")
+        def _h1_oversold(x: FlagInputs) -> np.ndarray:
+            return x.rsi_h1 <= x.cfg.oversold
+    """
+
+    def decorator(f: FlagFunc) -> FlagFunc:
+        _registry[name] = f
+        return f
+
+    return decorator(func) if func is not None else decorator
+
+
+def unregister_flag(name: str) -> None:
+    """登録済みのフラグを削除する。"""
+    _registry.pop(name, None)
+
+
+def registered_flags() -> Dict[str, FlagFunc]:
+    """登録済みのフラグ定義。"""
+    return dict(_registry)
+
+
+def evaluate_registered(inputs: FlagInputs) -> Dict[str, np.ndarray]:
+    """登録済みのフラグを一括で計算する。"""
+    n = inputs.close.shape[0]
+    out: Dict[str, np.ndarray] = {}
+    for name, func in _registry.items():
+        values = np.asarray(func(inputs), dtype=bool)
+        if values.shape != (n,):
+            raise ValueError(f"flag '{name}' returned shape {values.shape}, expected ({n},)")
+        out[name] = values
+    return out
+
+
+class FlagRow(Mapping[str, bool]):
+    """1本分のフラグ。ビット列と名前の対応だけを持つ読み取り専用の辞書。"""
+
+    __slots__ = ("_word", "_index")
+
+    def __init__(self, word: int, index: Dict[str, int]) -> None:
+        self._word = word
+        self._index = index
+
+    def __getitem__(self, name: str) -> bool:
+        return bool(self._word >> self._index[name] & 1)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __repr__(self) -> str:
+        return f"FlagRow({dict(self)})"
+
+
+class FlagSet:
+    """フラグ列をバーごとの ``uint64`` ビット列として保持する。
+
+    ``row(j)`` は定数時間で ``FlagRow`` を返し、DataFrame の行参照や
+    辞書の組み立てを毎分行う必要がなくなる。フラグは最大64個まで。
+    """
+
+    def __init__(self, columns: Mapping[str, np.ndarray]) -> None:
+        names: List[str] = list(columns)
+        if len(names) > MAX_FLAGS:
+            raise ValueError(f"too many flags: {len(names)} > {MAX_FLAGS}")
+        lengths = {np.shape(columns[name])[0] for name in names}
+        if len(lengths) > 1:
+            raise ValueError(f"flag columns have different lengths: {sorted(lengths)}")
+        n = lengths.pop() if lengths else 0
+        bits = np.zeros(n, dtype=np.uint64)
+        for i, name in enumerate(names):
+            bits |= np.asarray(columns[name], dtype=bool).astype(np.uint64) << np.uint64(i)
+        self.names = tuple(names)
+        self.index = {name: i for i, name in enumerate(names)}
+        self.bits = bits
+        self.words: List[int] = bits.tolist()
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "FlagSet":
+        """``compute_rsi_and_flags`` が返すフラグ DataFrame から作る。"""
+        return cls({name: frame[name].to_numpy(dtype=bool) for name in frame.columns})
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def row(self, j: int) -> FlagRow:
+        """``j`` 本目のフラグ。"""
+        return FlagRow(self.words[j], self.index)
+
+    def column(self, name: str) -> np.ndarray:
+        """フラグ1つ分の bool 配列。"""
+        return (self.bits >> np.uint64(self.index[name]) & np.uint64(1)).astype(bool)
+
+
+def build_flag_set(
+    data: pd.DataFrame,
+    rsi_m15: np.ndarray,
+    rsi_h1: np.ndarray,
+    flags: pd.DataFrame,
+    cfg: Config,
+    extra: Mapping[str, np.ndarray] | None = None,
+) -> FlagSet:
+    """組み込みフラグ・追加フラグ・登録フラグをまとめた ``FlagSet`` を作る。"""
+    columns: Dict[str, np.ndarray] = {name: flags[name].to_numpy(dtype=bool) for name in flags.columns}
+    columns.update(extra or {})
+    if _registry:
+        inputs = FlagInputs(
+            index=data.index,
+            open=data["open"].to_numpy(),
+            high=data["high"].to_numpy(),
+            low=data["low"].to_numpy(),
+            close=data["close"].to_numpy(),
+            rsi_m15=rsi_m15,
+            rsi_h1=rsi_h1,
+            cfg=cfg,
+        )
+        columns.update(evaluate_registered(inputs))
+    return FlagSet(columns)
@@ -32,6 +32,31 @@ def seg_hit_order(side: int, p0: float, p1: float):
         return 0, 0
 
 
+@cuda.jit(device=True)
+def resolve_hit_in_segment(side: int, sl: float, tp: float, p0: float, p1: float) -> int:
+    """Determine SL/TP hit while price moves p0->p1.
+
+    Returns
+    -------
+    int
+        1 for TP, -1 for SL, 0 if none hit. SL wins when both are crossed.
+    """
+    hit_tp = (p0 <= tp <= p1) or (p1 <= tp <= p0)
+    hit_sl = (p0 <= sl <= p1) or (p1 <= sl <= p0)
+    if hit_tp and hit_sl:
+        return -1
+    first, second = seg_hit_order(side, p0, p1)
+    if first == 1 and hit_tp:
+        return 1
+    if first == -1 and hit_sl:
+        return -1
+    if second == 1 and hit_tp:
+        return 1
+    if second == -1 and hit_sl:
+        return -1
+    return 0
+
+
 @cuda.jit(device=True)
 def resolve_hit_in_bar(side: int, sl: float, tp: float,
                        bid0: float, bid1: float, bid2: float, bid3: float,
@@ -64,31 +89,197 @@ def resolve_hit_in_bar(side: int, sl: float, tp: float,
             p0 = t1; p1 = t2
         else:
             p0 = t2; p1 = t3
-        hit_tp = (p0 <= tp <= p1) or (p1 <= tp <= p0)
-        hit_sl = (p0 <= sl <= p1) or (p1 <= sl <= p0)
-        if hit_tp and hit_sl:
+        res = resolve_hit_in_segment(side, sl, tp, p0, p1)
+        if res != 0:
+            return res
+    return 0
+
+
+@cuda.jit(device=True)
+def resolve_gap(side: int, price: float, sl: float, tp: float) -> int:
+    """Return the result when a bar opens at or beyond SL/TP.
+
+    A gap from the previous close past a level never lies inside the bar's
+    own tick path, so it is checked against the open price; the trade is
+    filled at the level, as the CPU engine's ``resolve_hit`` does.
+
+    Returns
+    -------
+    int
+        1 for TP, -1 for SL, 0 if the open is between them.
+    """
+    if side > 0:
+        if price <= sl:
             return -1
-        first, second = seg_hit_order(side, p0, p1)
-        if first == 1 and hit_tp:
+        if price >= tp:
             return 1
-        if first == -1 and hit_sl:
+    else:
+        if price >= sl:
             return -1
-        if second == 1 and hit_tp:
+        if price <= tp:
             return 1
-        if second == -1 and hit_sl:
-            return -1
     return 0
 
 
+@cuda.jit(device=True)
+def trail_stop(side: int, sl: float, best: float, price: float,
+               entry: float, activation: float, width: float):
+    """Advance the trailing stop after price reached ``price``.
+
+    Parameters
+    ----------
+    side : int
+        +1 for BUY, -1 for SELL.
+    sl, best : float
+        Current stop and most favourable price so far.
+    price : float
+        Latest tick price (bid for BUY, ask for SELL).
+    entry, activation, width : float
+        Entry price, favourable move required before trailing starts and
+        distance kept between ``best`` and the stop.
+
+    Returns
+    -------
+    float, float
+        Updated (sl, best). The stop only ever moves in the trade's favour.
+    """
+    if side > 0:
+        if price > best:
+            best = price
+        if best - entry >= activation and best - width > sl:
+            sl = best - width
+    else:
+        if price < best:
+            best = price
+        if entry - best >= activation and best + width < sl:
+            sl = best + width
+    return sl, best
+
+
+@cuda.jit(device=True)
+def resolve_hit_trailing(side: int, sl: float, tp: float, best: float,
+                         entry: float, activation: float, width: float,
+                         bid0: float, bid1: float, bid2: float, bid3: float,
+                         ask0: float, ask1: float, ask2: float, ask3: float):
+    """Determine SL/TP hit within a bar while trailing the stop.
+
+    Each tick segment is checked against the stop in force at its start;
+    the stop then trails to the segment's end price. Segments are monotone,
+    so a stop moved within a segment cannot be hit in that segment. An open
+    already beyond SL/TP is resolved first with :func:`resolve_gap`.
+
+    Returns
+    -------
+    int, float, float
+        (result, sl, best) with result 1 for TP, -1 for SL, 0 if none hit.
+    """
+    if side > 0:
+        t0, t1, t2, t3 = bid0, bid1, bid2, bid3
+    else:
+        t0, t1, t2, t3 = ask0, ask1, ask2, ask3
+
+    res = resolve_gap(side, t0, sl, tp)
+    if res != 0:
+        return res, sl, best
+    sl, best = trail_stop(side, sl, best, t0, entry, activation, width)
+    for i in range(3):
+        if i == 0:
+            p0 = t0; p1 = t1
+        elif i == 1:
+            p0 = t1; p1 = t2
+        else:
+            p0 = t2; p1 = t3
+        res = resolve_hit_in_segment(side, sl, tp, p0, p1)
+        if res != 0:
+            return res, sl, best
+        sl, best = trail_stop(side, sl, best, p1, entry, activation, width)
+    return 0, sl, best
+
+
+@cuda.jit(device=True)
+def simulate_trade(open_m1, high_m1, low_m1, close_m1, base, entry_t, end_t, side,
+                   sl_p, tp_p, trail_w, trail_act, point, ohlc_order, spread, spread_policy,
+                   idx, exit_reason, entry_price, exit_price, pnl_points,
+                   entry_index, exit_index):
+    """Simulate one trade entered at minute ``entry_t`` of the run at ``base``.
+
+    The trade opens at the open of bar ``base + entry_t`` (plus the spread
+    for BUY) and is checked against SL/TP from the next bar through bar
+    ``base + end_t - 1``, where an open trade is closed at the close. This
+    matches the CPU engine, which fills on the entry bar and checks exits
+    from the following bar.
+    Results are written to slot ``idx`` of the output arrays, with
+    ``entry_index``/``exit_index`` relative to ``base``.
+    """
+    op = open_m1[base + entry_t]
+    if side > 0:
+        entry = op + spread
+        sl = entry - sl_p
+        tp = entry + tp_p
+        if spread_policy >= 1:
+            sl -= spread
+        if spread_policy == 2:
+            tp -= spread
+    else:
+        entry = op
+        sl = entry + sl_p
+        tp = entry - tp_p
+        if spread_policy >= 1:
+            sl += spread
+        if spread_policy == 2:
+            tp += spread
+    entry_price[idx] = entry
+    entry_index[idx] = entry_t
+    best = entry
+
+    for t in range(entry_t + 1, end_t):
+        i = base + t
+        if ohlc_order == 0:
+            b0 = open_m1[i]; b1 = high_m1[i]; b2 = low_m1[i]; b3 = close_m1[i]
+        else:
+            b0 = open_m1[i]; b1 = low_m1[i]; b2 = high_m1[i]; b3 = close_m1[i]
+        a0 = b0 + spread; a1 = b1 + spread; a2 = b2 + spread; a3 = b3 + spread
+        if trail_w > 0:
+            res, sl, best = resolve_hit_trailing(side, sl, tp, best, entry, trail_act, trail_w,
+                                                 b0, b1, b2, b3, a0, a1, a2, a3)
+        else:
+            res = resolve_hit_in_bar(side, sl, tp, b0, b1, b2, b3, a0, a1, a2, a3)
+        if res != 0:
+            exit_reason[idx] = res
+            exit_index[idx] = t
+            if res == -1:
+                exit_price[idx] = sl
+            else:
+                exit_price[idx] = tp
+            pnl_points[idx] = (exit_price[idx] - entry) / point * side
+            return
+
+    last = close_m1[base + end_t - 1]
+    if side > 0:
+        exit_price[idx] = last
+    else:
+        exit_price[idx] = last + spread
+    exit_reason[idx] = 0
+    exit_index[idx] = end_t - 1
+    pnl_points[idx] = (exit_price[idx] - entry) / point * side
+
+
 @cuda.jit
 def k_simulate_runs_ohlc4(open_m1, high_m1, low_m1, close_m1,
                           entry_side, sl_points, tp_points,
+                          trail_start_ratio, trail_width_points,
                           point, ohlc_order, spread_points, spread_policy,
                           max_minutes, n_minutes, n_runs,
-                          exit_reason, entry_price, exit_price, pnl_points):
+                          exit_reason, entry_price, exit_price, pnl_points,
+                          entry_index, exit_index):
     """Simulate multiple runs with OHLC4 ticks.
 
-    Each thread handles one run.
+    Each thread handles one run. Runs with ``trail_width_points > 0`` trail
+    their stop along the OHLC4 path once price moved
+    ``trail_start_ratio * tp_points`` in their favour, so a sweep over
+    trailing widths is a single launch with one run per width.
+    ``entry_index``/``exit_index`` receive the minutes of entry and exit
+    within the run, or -1 for runs that never traded.
     """
     idx = cuda.grid(1)
     if idx >= n_runs:
@@ -96,61 +287,58 @@ def k_simulate_runs_ohlc4(open_m1, high_m1, low_m1, close_m1,
 
     base = idx * n_minutes
     spread = spread_points * point
-    sl_p = sl_points[idx] * point
-    tp_p = tp_points[idx] * point
+    entry_index[idx] = -1
+    exit_index[idx] = -1
+    for t in range(max_minutes):
+        side = entry_side[base + t]
+        if side != 0:
+            tp_p = tp_points[idx] * point
+            simulate_trade(open_m1, high_m1, low_m1, close_m1, base, t, max_minutes, side,
+                           sl_points[idx] * point, tp_p, trail_width_points[idx] * point,
+                           trail_start_ratio[idx] * tp_p, point, ohlc_order, spread, spread_policy,
+                           idx, exit_reason, entry_price, exit_price, pnl_points,
+                           entry_index, exit_index)
+            return
 
-    side = 0
-    sl = 0.0
-    tp = 0.0
-    entry = 0.0
-    reason = 0
 
-    for t in range(max_minutes):
-        i = base + t
-        if side == 0:
-            es = entry_side[i]
-            if es != 0:
-                side = es
-                op = open_m1[i]
-                if side > 0:
-                    entry = op + spread
-                    sl = entry - sl_p
-                    tp = entry + tp_p
-                    if spread_policy >= 1:
-                        sl -= spread
-                    if spread_policy == 2:
-                        tp -= spread
-                else:
-                    entry = op
-                    sl = entry + sl_p
-                    tp = entry - tp_p
-                    if spread_policy >= 1:
-                        sl += spread
-                    if spread_policy == 2:
-                        tp += spread
-                entry_price[idx] = entry
-        if side != 0 and reason == 0:
-            if ohlc_order == 0:
-                b0 = open_m1[i]; b1 = high_m1[i]; b2 = low_m1[i]; b3 = close_m1[i]
-            else:
-                b0 = open_m1[i]; b1 = low_m1[i]; b2 = high_m1[i]; b3 = close_m1[i]
-            a0 = b0 + spread; a1 = b1 + spread; a2 = b2 + spread; a3 = b3 + spread
-            res = resolve_hit_in_bar(side, sl, tp, b0, b1, b2, b3, a0, a1, a2, a3)
-            if res != 0:
-                reason = res
-                exit_reason[idx] = reason
-                if reason == -1:
-                    exit_price[idx] = sl
-                else:
-                    exit_price[idx] = tp
-                pnl_points[idx] = (exit_price[idx] - entry) / point * side
-                break
-    if side != 0 and reason == 0:
-        i = base + max_minutes - 1
-        last = close_m1[i]
-        if side > 0:
-            exit_price[idx] = last
-        else:
-            exit_price[idx] = last + spread
-        exit_reason[idx] = 0
-        pnl_points[idx] = (exit_price[idx] - entry) / point * side
+@cuda.jit
+def k_simulate_shared_ohlc4(open_m1, high_m1, low_m1, close_m1,
+                            run_start, run_length,
+                            signal_index, signal_side, signal_begin, signal_end,
+                            sl_points, tp_points,
+                            trail_start_ratio, trail_width_points,
+                            point, ohlc_order, spread_points, spread_policy, n_runs,
+                            exit_reason, entry_price, exit_price, pnl_points,
+                            entry_index, exit_index):
+    """Simulate multiple runs over one shared OHLC4 series.
+
+    Every run reads bars ``run_start[idx]`` .. ``run_start[idx] +
+    run_length[idx] - 1`` of the same ``(n_bars,)`` price arrays, so memory
+    grows with the data length plus per-run inputs rather than with their
+    product. A run's candidate entries are
+    ``signal_index[signal_begin[idx]:signal_end[idx]]`` (ascending absolute
+    bar positions) with sides from ``signal_side``; it enters at the first
+    one inside its window. Runs may share the same signal slice.
+    ``entry_index``/``exit_index`` are relative to ``run_start``, -1 for
+    runs that never traded.
+    """
+    idx = cuda.grid(1)
+    if idx >= n_runs:
+        return
+
+    base = run_start[idx]
+    length = run_length[idx]
+    spread = spread_points * point
+    entry_index[idx] = -1
+    exit_index[idx] = -1
+    for k in range(signal_begin[idx], signal_end[idx]):
+        t = signal_index[k] - base
+        side = signal_side[k]
+        if t >= 0 and t < length and side != 0:
+            tp_p = tp_points[idx] * point
+            simulate_trade(open_m1, high_m1, low_m1, close_m1, base, t, length, side,
+                           sl_points[idx] * point, tp_p, trail_width_points[idx] * point,
+                           trail_start_ratio[idx] * tp_p, point, ohlc_order, spread, spread_policy,
+                           idx, exit_reason, entry_price, exit_price, pnl_points,
+                           entry_index, exit_index)
+            return
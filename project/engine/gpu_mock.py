@@ -9,6 +9,9 @@ from typing import Any
 
 from .config import Config
 from .logger import get_logger
+from .results_store import ResultsWriter
+
+SUMMARY_FIELDS = ["run_id", "index", "total_trades", "win_rate", "profit_factor", "net_profit_pts"]
 
 
 def _hash_int(text: str) -> int:
@@ -42,48 +45,57 @@ def _generate_metrics(seed: str) -> dict[str, Any]:
     return metrics
 
 
+def write_run_files(
+    out_root: Path, run_id: str, index: int, metrics: dict[str, Any], params: dict[str, Any], cfg: Config
+) -> Path:
+    """``out_root/<index>/`` に Manifest.json と Summary.csv を書き出し、そのディレクトリを返す。"""
+    run_dir = out_root / f"{index}"
+    run_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {
+        "run_id": run_id,
+        "index": index,
+        "metrics": metrics,
+        "params": params,
+        "cfg": {"symbol": cfg.symbol, "point": cfg.point},
+    }
+    (run_dir / "Manifest.json").write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    with open(run_dir / "Summary.csv", "w", newline="", encoding="utf-8") as fh:
+        writer = csv.DictWriter(fh, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerow({"run_id": run_id, "index": index, **{k: metrics[k] for k in SUMMARY_FIELDS[2:]}})
+    return run_dir
+
+
 def main() -> None:
     """GPUデバッグ用のダミー出力を生成する。"""
     parser = argparse.ArgumentParser()
     parser.add_argument("--config", required=True)
     parser.add_argument("--runs", type=int, default=None)
     parser.add_argument("--run-id", required=True)
+    parser.add_argument(
+        "--output-format",
+        choices=["files", "columnar"],
+        default="files",
+        help="files: Run_<id>/<index>/ に出力, columnar: outputs/GPU/results に列指向で追記",
+    )
     args = parser.parse_args()
 
     cfg = Config.from_yaml(args.config)
     runs = args.runs or cfg.gpu_debug_runs
     logger = get_logger(__name__, args.run_id)
 
-    out_root = Path("outputs/GPU") / f"Run_{args.run_id}"
-    out_root.mkdir(parents=True, exist_ok=True)
+    if args.output_format == "columnar":
+        with ResultsWriter(Path("outputs/GPU") / "results") as writer:
+            for i in range(runs):
+                params = {"index": i}
+                writer.append_run(args.run_id, _generate_metrics(json.dumps(params) + cfg.gpu_debug_seed), params)
+        logger.info("gpu mock completed: %d runs", runs)
+        return
 
+    out_root = Path("outputs/GPU") / f"Run_{args.run_id}"
     for i in range(runs):
-        params_json = json.dumps({"index": i})
-        seed = params_json + cfg.gpu_debug_seed
-        metrics = _generate_metrics(seed)
-        run_dir = out_root / f"{i}"
-        run_dir.mkdir(parents=True, exist_ok=True)
-        manifest = {
-            "run_id": args.run_id,
-            "index": i,
-            "metrics": metrics,
-            "params": json.loads(params_json),
-            "cfg": {"symbol": cfg.symbol, "point": cfg.point},
-        }
-        (run_dir / "Manifest.json").write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
-        with open(run_dir / "Summary.csv", "w", newline="", encoding="utf-8") as fh:
-            writer = csv.DictWriter(fh, fieldnames=["run_id", "index", "total_trades", "win_rate", "profit_factor", "net_profit_pts"])
-            writer.writeheader()
-            writer.writerow(
-                {
-                    "run_id": args.run_id,
-                    "index": i,
-                    "total_trades": metrics["total_trades"],
-                    "win_rate": metrics["win_rate"],
-                    "profit_factor": metrics["profit_factor"],
-                    "net_profit_pts": metrics["net_profit_pts"],
-                }
-            )
+        params = {"index": i}
+        write_run_files(out_root, args.run_id, i, _generate_metrics(json.dumps(params) + cfg.gpu_debug_seed), params, cfg)
         logger.info("run %d generated", i)
 
     logger.info("gpu mock completed")
@@ -14,6 +14,9 @@ def main() -> None:
     parser.add_argument("--run-id", required=True)
     parser.add_argument("--gpu-debug", action="store_true")
     parser.add_argument("--runs", type=int, default=None)
+    parser.add_argument("--output-format", choices=["files", "columnar"], default="files")
+    parser.add_argument("--params", default=None, help="gpu_tester に渡すパラメータグリッド")
+    parser.add_argument("--backend", choices=["auto", "cuda", "cpu"], default="auto")
     args = parser.parse_args()
 
     cfg = Config.from_yaml(args.config)
@@ -32,6 +35,8 @@ def main() -> None:
         ]
         if args.runs:
             cmd.extend(["--runs", str(args.runs)])
+        if args.output_format != "files":
+            cmd.extend(["--output-format", args.output_format])
         logger.info("launching gpu_mock")
         subprocess.run(cmd, check=True)
     else:
@@ -44,6 +49,12 @@ def main() -> None:
             "--run-id",
             args.run_id,
         ]
+        if args.params:
+            cmd.extend(["--params", args.params])
+        if args.backend != "auto":
+            cmd.extend(["--backend", args.backend])
+        if args.output_format != "files":
+            cmd.extend(["--output-format", args.output_format])
         logger.info("launching gpu_tester")
         subprocess.run(cmd, check=True)
 
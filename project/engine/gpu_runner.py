@@ -1,28 +1,54 @@
 """Host-side utilities for running GPU kernels."""
 from __future__ import annotations
 
+import multiprocessing
+import os
+
 import numpy as np
-from numba import cuda
+from numba import config, cuda
 
-from .gpu_kernels import k_simulate_runs_ohlc4
+from .cpu_kernels import k_simulate_runs_ohlc4 as k_simulate_runs_ohlc4_cpu
+from .cpu_kernels import k_simulate_runs_ohlc4_serial
+from .cpu_kernels import k_simulate_shared_ohlc4 as k_simulate_shared_ohlc4_cpu
+from .cpu_kernels import k_simulate_shared_ohlc4_serial
+from .gpu_kernels import k_simulate_runs_ohlc4, k_simulate_shared_ohlc4
 
+BACKENDS = ("auto", "cuda", "cpu")
 
-def simulate_gpu_batch(open_m1: np.ndarray, high_m1: np.ndarray,
-                        low_m1: np.ndarray, close_m1: np.ndarray,
-                        entry_side: np.ndarray, sl_points: np.ndarray,
-                        tp_points: np.ndarray, point: float,
-                        ohlc_order: int, spread_points: int,
-                        spread_policy: int, n_minutes: int) -> dict[str, np.ndarray]:
-    """Execute the GPU simulation for a batch of runs.
 
-    Parameters are numpy arrays with dtypes:
-    - open/high/low/close: float32 of shape (n_runs * n_minutes)
-    - entry_side: int8 of same shape
-    - sl_points, tp_points: int32 of shape (n_runs,)
+def prefer_fork_safe_threading() -> None:
+    """Make Numba prefer threading layers that survive ``fork``.
+
+    TBB's worker pool hangs processes forked after it started, and the
+    parallel optimizer forks its workers. This changes the process-wide
+    ``numba.config.THREADING_LAYER_PRIORITY``, so it is called from CLI
+    entry points only; it has no effect once a parallel kernel has run, and
+    it leaves an explicit ``NUMBA_THREADING_LAYER`` or
+    ``NUMBA_THREADING_LAYER_PRIORITY`` untouched.
     """
-    if not cuda.is_available():
-        raise RuntimeError("CUDA not available")
+    if "NUMBA_THREADING_LAYER" not in os.environ and "NUMBA_THREADING_LAYER_PRIORITY" not in os.environ:
+        config.THREADING_LAYER_PRIORITY = ["omp", "workqueue", "tbb"]
+
 
+def _trailing_inputs(n_runs: int, trail_start_ratio: np.ndarray | None,
+                     trail_width_points: np.ndarray | None) -> tuple[np.ndarray, np.ndarray]:
+    """Return per-run trailing arrays, defaulting to trailing disabled."""
+    if trail_start_ratio is None:
+        trail_start_ratio = np.zeros(n_runs, dtype=np.float32)
+    if trail_width_points is None:
+        trail_width_points = np.zeros(n_runs, dtype=np.int32)
+    if trail_start_ratio.dtype != np.float32 or trail_width_points.dtype != np.int32:
+        raise ValueError("trail_start_ratio must be float32 and trail_width_points int32")
+    if trail_start_ratio.shape != (n_runs,) or trail_width_points.shape != (n_runs,):
+        raise ValueError("trailing arrays length mismatch")
+    return trail_start_ratio, trail_width_points
+
+
+def _check_batch_inputs(open_m1: np.ndarray, high_m1: np.ndarray,
+                        low_m1: np.ndarray, close_m1: np.ndarray,
+                        entry_side: np.ndarray, sl_points: np.ndarray,
+                        tp_points: np.ndarray, n_minutes: int) -> None:
+    """Validate dtypes and shapes shared by every backend."""
     for arr, dt in [(open_m1, np.float32), (high_m1, np.float32),
                     (low_m1, np.float32), (close_m1, np.float32)]:
         if arr.dtype != dt or arr.ndim != 1:
@@ -39,6 +65,37 @@ def simulate_gpu_batch(open_m1: np.ndarray, high_m1: np.ndarray,
     if open_m1.shape[0] != expected or entry_side.shape[0] != expected:
         raise ValueError("price arrays length mismatch")
 
+
+def simulate_gpu_batch(open_m1: np.ndarray, high_m1: np.ndarray,
+                        low_m1: np.ndarray, close_m1: np.ndarray,
+                        entry_side: np.ndarray, sl_points: np.ndarray,
+                        tp_points: np.ndarray, point: float,
+                        ohlc_order: int, spread_points: int,
+                        spread_policy: int, n_minutes: int,
+                        trail_start_ratio: np.ndarray | None = None,
+                        trail_width_points: np.ndarray | None = None) -> dict[str, np.ndarray]:
+    """Execute the GPU simulation for a batch of runs.
+
+    Parameters are numpy arrays with dtypes:
+    - open/high/low/close: float32 of shape (n_runs * n_minutes)
+    - entry_side: int8 of same shape
+    - sl_points, tp_points: int32 of shape (n_runs,)
+    - trail_start_ratio: float32 of shape (n_runs,), optional
+    - trail_width_points: int32 of shape (n_runs,), optional; runs with a
+      positive width trail their stop, the others keep a fixed SL
+
+    Besides prices and PnL, ``entry_index``/``exit_index`` (int32) give the
+    minute of entry and exit within each run, -1 if the run never traded;
+    see :func:`costs.batch_costs`.
+    """
+    if not cuda.is_available():
+        raise RuntimeError("CUDA not available")
+
+    _check_batch_inputs(open_m1, high_m1, low_m1, close_m1,
+                        entry_side, sl_points, tp_points, n_minutes)
+    n_runs = sl_points.shape[0]
+    trail_start_ratio, trail_width_points = _trailing_inputs(n_runs, trail_start_ratio, trail_width_points)
+
     d_open = cuda.to_device(open_m1)
     d_high = cuda.to_device(high_m1)
     d_low = cuda.to_device(low_m1)
@@ -46,25 +103,422 @@ def simulate_gpu_batch(open_m1: np.ndarray, high_m1: np.ndarray,
     d_side = cuda.to_device(entry_side)
     d_sl = cuda.to_device(sl_points)
     d_tp = cuda.to_device(tp_points)
+    d_trail_start = cuda.to_device(trail_start_ratio)
+    d_trail_width = cuda.to_device(trail_width_points)
 
     d_exit_reason = cuda.device_array(n_runs, dtype=np.int8)
     d_entry_price = cuda.device_array(n_runs, dtype=np.float32)
     d_exit_price = cuda.device_array(n_runs, dtype=np.float32)
     d_pnl = cuda.device_array(n_runs, dtype=np.float32)
+    d_entry_index = cuda.device_array(n_runs, dtype=np.int32)
+    d_exit_index = cuda.device_array(n_runs, dtype=np.int32)
 
     block = 128
     grid = (n_runs + block - 1) // block
 
     k_simulate_runs_ohlc4[grid, block](d_open, d_high, d_low, d_close,
                                        d_side, d_sl, d_tp,
+                                       d_trail_start, d_trail_width,
                                        np.float32(point), np.int8(ohlc_order),
                                        np.int32(spread_points), np.int8(spread_policy),
                                        np.int32(n_minutes), np.int32(n_minutes), np.int32(n_runs),
-                                       d_exit_reason, d_entry_price, d_exit_price, d_pnl)
+                                       d_exit_reason, d_entry_price, d_exit_price, d_pnl,
+                                       d_entry_index, d_exit_index)
+
+    return {
+        "exit_reason": d_exit_reason.copy_to_host(),
+        "entry_price": d_entry_price.copy_to_host(),
+        "exit_price": d_exit_price.copy_to_host(),
+        "pnl_points": d_pnl.copy_to_host(),
+        "entry_index": d_entry_index.copy_to_host(),
+        "exit_index": d_exit_index.copy_to_host(),
+    }
+
+
+def simulate_cpu_batch(open_m1: np.ndarray, high_m1: np.ndarray,
+                       low_m1: np.ndarray, close_m1: np.ndarray,
+                       entry_side: np.ndarray, sl_points: np.ndarray,
+                       tp_points: np.ndarray, point: float,
+                       ohlc_order: int, spread_points: int,
+                       spread_policy: int, n_minutes: int,
+                       trail_start_ratio: np.ndarray | None = None,
+                       trail_width_points: np.ndarray | None = None,
+                       parallel: bool | None = None) -> dict[str, np.ndarray]:
+    """Execute the batch simulation on CPU cores.
+
+    Inputs, dtype checks and outputs are identical to
+    :func:`simulate_gpu_batch`; scalars are cast to the same widths the
+    CUDA launch uses so both backends round identically.
+
+    Parameters
+    ----------
+    parallel : bool, optional
+        Distribute runs over Numba's thread pool. Defaults to ``True`` in
+        the main process and ``False`` in worker processes, where forking
+        after the thread pool started is unsafe.
+    """
+    _check_batch_inputs(open_m1, high_m1, low_m1, close_m1,
+                        entry_side, sl_points, tp_points, n_minutes)
+    n_runs = sl_points.shape[0]
+    trail_start_ratio, trail_width_points = _trailing_inputs(n_runs, trail_start_ratio, trail_width_points)
+    if parallel is None:
+        parallel = multiprocessing.parent_process() is None
+    kernel = k_simulate_runs_ohlc4_cpu if parallel else k_simulate_runs_ohlc4_serial
+
+    exit_reason = np.zeros(n_runs, dtype=np.int8)
+    entry_price = np.zeros(n_runs, dtype=np.float32)
+    exit_price = np.zeros(n_runs, dtype=np.float32)
+    pnl = np.zeros(n_runs, dtype=np.float32)
+    entry_index = np.zeros(n_runs, dtype=np.int32)
+    exit_index = np.zeros(n_runs, dtype=np.int32)
+
+    kernel(open_m1, high_m1, low_m1, close_m1,
+           entry_side, sl_points, tp_points,
+           trail_start_ratio, trail_width_points,
+           np.float32(point), np.int8(ohlc_order),
+           np.int32(spread_points), np.int8(spread_policy),
+           np.int32(n_minutes), np.int32(n_minutes), np.int32(n_runs),
+           exit_reason, entry_price, exit_price, pnl,
+           entry_index, exit_index)
+
+    return {
+        "exit_reason": exit_reason,
+        "entry_price": entry_price,
+        "exit_price": exit_price,
+        "pnl_points": pnl,
+        "entry_index": entry_index,
+        "exit_index": exit_index,
+    }
+
+
+def _to_device(arr):
+    """Upload ``arr`` unless it already lives on the CUDA device."""
+    return arr if hasattr(arr, "copy_to_host") else cuda.to_device(arr)
+
+
+def _check_shared_inputs(open_m1, high_m1, low_m1, close_m1,
+                         run_start: np.ndarray, run_length: np.ndarray,
+                         signal_index: np.ndarray, signal_side: np.ndarray,
+                         signal_begin: np.ndarray, signal_end: np.ndarray,
+                         sl_points: np.ndarray, tp_points: np.ndarray) -> None:
+    """Validate the inputs of the shared-series kernels.
+
+    Price and signal arrays may be host or CUDA device arrays; the per-run
+    arrays must be on the host.
+    """
+    n_bars = open_m1.shape[0]
+    for arr in (open_m1, high_m1, low_m1, close_m1):
+        if arr.dtype != np.float32 or arr.ndim != 1 or arr.shape[0] != n_bars:
+            raise ValueError("Price arrays must be 1D float32 of equal length")
+    if sl_points.dtype != np.int32 or tp_points.dtype != np.int32:
+        raise ValueError("sl_points and tp_points must be int32")
+    if run_length.dtype != np.int32:
+        raise ValueError("run_length must be int32")
+    for arr in (run_start, signal_index, signal_begin, signal_end):
+        if arr.dtype != np.int64:
+            raise ValueError("run_start, signal_index, signal_begin and signal_end must be int64")
+    if signal_side.dtype != np.int8 or signal_side.shape != signal_index.shape:
+        raise ValueError("signal_side must be int8 with the shape of signal_index")
+
+    n_runs = sl_points.shape[0]
+    for arr in (tp_points, run_start, run_length, signal_begin, signal_end):
+        if arr.shape != (n_runs,):
+            raise ValueError("per-run arrays length mismatch")
+    if n_runs == 0:
+        return
+    if run_start.min() < 0 or run_length.min() < 1 or (run_start + run_length).max() > n_bars:
+        raise ValueError("run windows must lie inside the price series")
+    if signal_begin.min() < 0 or signal_end.max() > signal_index.shape[0] or (signal_begin > signal_end).any():
+        raise ValueError("signal ranges out of bounds")
+
+
+def simulate_gpu_shared_batch(open_m1, high_m1, low_m1, close_m1,
+                              run_start: np.ndarray, run_length: np.ndarray,
+                              signal_index: np.ndarray, signal_side: np.ndarray,
+                              signal_begin: np.ndarray, signal_end: np.ndarray,
+                              sl_points: np.ndarray, tp_points: np.ndarray,
+                              point: float, ohlc_order: int, spread_points: int,
+                              spread_policy: int,
+                              trail_start_ratio: np.ndarray | None = None,
+                              trail_width_points: np.ndarray | None = None) -> dict[str, np.ndarray]:
+    """Execute the GPU simulation for runs over one shared price series.
+
+    Parameters are numpy arrays with dtypes:
+    - open/high/low/close: float32 of shape (n_bars,), shared by all runs.
+      CUDA device arrays are used in place, so repeated launches over the
+      same data upload it once; the same holds for the signal arrays.
+    - run_start: int64 of shape (n_runs,), first bar of each run's window
+    - run_length: int32 of shape (n_runs,), window length in bars
+    - signal_index, signal_side: int64 / int8 of shape (n_signals,),
+      absolute entry bars (ascending within a run) and their sides
+    - signal_begin, signal_end: int64 of shape (n_runs,), each run's slice
+      of the signal arrays; runs may point at the same slice
+    - sl_points, tp_points, trail_start_ratio, trail_width_points: as in
+      :func:`simulate_gpu_batch`
+
+    Each run enters at its first signal inside its window. Outputs match
+    :func:`simulate_gpu_batch`, with ``entry_index``/``exit_index``
+    relative to ``run_start``.
+    """
+    if not cuda.is_available():
+        raise RuntimeError("CUDA not available")
+
+    _check_shared_inputs(open_m1, high_m1, low_m1, close_m1, run_start, run_length,
+                         signal_index, signal_side, signal_begin, signal_end,
+                         sl_points, tp_points)
+    n_runs = sl_points.shape[0]
+    trail_start_ratio, trail_width_points = _trailing_inputs(n_runs, trail_start_ratio, trail_width_points)
+
+    d_open, d_high, d_low, d_close = (_to_device(arr) for arr in (open_m1, high_m1, low_m1, close_m1))
+    d_start = cuda.to_device(run_start)
+    d_length = cuda.to_device(run_length)
+    d_signal_index = _to_device(signal_index)
+    d_signal_side = _to_device(signal_side)
+    d_signal_begin = cuda.to_device(signal_begin)
+    d_signal_end = cuda.to_device(signal_end)
+    d_sl = cuda.to_device(sl_points)
+    d_tp = cuda.to_device(tp_points)
+    d_trail_start = cuda.to_device(trail_start_ratio)
+    d_trail_width = cuda.to_device(trail_width_points)
+
+    d_exit_reason = cuda.device_array(n_runs, dtype=np.int8)
+    d_entry_price = cuda.device_array(n_runs, dtype=np.float32)
+    d_exit_price = cuda.device_array(n_runs, dtype=np.float32)
+    d_pnl = cuda.device_array(n_runs, dtype=np.float32)
+    d_entry_index = cuda.device_array(n_runs, dtype=np.int32)
+    d_exit_index = cuda.device_array(n_runs, dtype=np.int32)
+
+    block = 128
+    grid = (n_runs + block - 1) // block
+
+    k_simulate_shared_ohlc4[grid, block](d_open, d_high, d_low, d_close,
+                                         d_start, d_length,
+                                         d_signal_index, d_signal_side, d_signal_begin, d_signal_end,
+                                         d_sl, d_tp, d_trail_start, d_trail_width,
+                                         np.float32(point), np.int8(ohlc_order),
+                                         np.int32(spread_points), np.int8(spread_policy), np.int32(n_runs),
+                                         d_exit_reason, d_entry_price, d_exit_price, d_pnl,
+                                         d_entry_index, d_exit_index)
 
     return {
         "exit_reason": d_exit_reason.copy_to_host(),
         "entry_price": d_entry_price.copy_to_host(),
         "exit_price": d_exit_price.copy_to_host(),
         "pnl_points": d_pnl.copy_to_host(),
+        "entry_index": d_entry_index.copy_to_host(),
+        "exit_index": d_exit_index.copy_to_host(),
     }
+
+
+def simulate_cpu_shared_batch(open_m1: np.ndarray, high_m1: np.ndarray,
+                              low_m1: np.ndarray, close_m1: np.ndarray,
+                              run_start: np.ndarray, run_length: np.ndarray,
+                              signal_index: np.ndarray, signal_side: np.ndarray,
+                              signal_begin: np.ndarray, signal_end: np.ndarray,
+                              sl_points: np.ndarray, tp_points: np.ndarray,
+                              point: float, ohlc_order: int, spread_points: int,
+                              spread_policy: int,
+                              trail_start_ratio: np.ndarray | None = None,
+                              trail_width_points: np.ndarray | None = None,
+                              parallel: bool | None = None) -> dict[str, np.ndarray]:
+    """Execute the shared-series simulation on CPU cores.
+
+    Inputs and outputs are identical to :func:`simulate_gpu_shared_batch`
+    (price arrays on the host); ``parallel`` is as in
+    :func:`simulate_cpu_batch`.
+    """
+    _check_shared_inputs(open_m1, high_m1, low_m1, close_m1, run_start, run_length,
+                         signal_index, signal_side, signal_begin, signal_end,
+                         sl_points, tp_points)
+    n_runs = sl_points.shape[0]
+    trail_start_ratio, trail_width_points = _trailing_inputs(n_runs, trail_start_ratio, trail_width_points)
+    if parallel is None:
+        parallel = multiprocessing.parent_process() is None
+    kernel = k_simulate_shared_ohlc4_cpu if parallel else k_simulate_shared_ohlc4_serial
+
+    exit_reason = np.zeros(n_runs, dtype=np.int8)
+    entry_price = np.zeros(n_runs, dtype=np.float32)
+    exit_price = np.zeros(n_runs, dtype=np.float32)
+    pnl = np.zeros(n_runs, dtype=np.float32)
+    entry_index = np.zeros(n_runs, dtype=np.int32)
+    exit_index = np.zeros(n_runs, dtype=np.int32)
+
+    kernel(open_m1, high_m1, low_m1, close_m1,
+           run_start, run_length,
+           signal_index, signal_side, signal_begin, signal_end,
+           sl_points, tp_points,
+           trail_start_ratio, trail_width_points,
+           np.float32(point), np.int8(ohlc_order),
+           np.int32(spread_points), np.int8(spread_policy), np.int32(n_runs),
+           exit_reason, entry_price, exit_price, pnl,
+           entry_index, exit_index)
+
+    return {
+        "exit_reason": exit_reason,
+        "entry_price": entry_price,
+        "exit_price": exit_price,
+        "pnl_points": pnl,
+        "entry_index": entry_index,
+        "exit_index": exit_index,
+    }
+
+
+def resolve_backend(backend: str) -> str:
+    """Return the concrete backend (``"cuda"`` or ``"cpu"``) for ``backend``."""
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend: {backend}")
+    if backend == "auto":
+        backend = "cuda" if cuda.is_available() else "cpu"
+    return backend
+
+
+def simulate_batch(open_m1: np.ndarray, high_m1: np.ndarray,
+                   low_m1: np.ndarray, close_m1: np.ndarray,
+                   entry_side: np.ndarray, sl_points: np.ndarray,
+                   tp_points: np.ndarray, point: float,
+                   ohlc_order: int, spread_points: int,
+                   spread_policy: int, n_minutes: int,
+                   trail_start_ratio: np.ndarray | None = None,
+                   trail_width_points: np.ndarray | None = None,
+                   backend: str = "auto") -> dict[str, np.ndarray]:
+    """Execute the batch simulation on the selected backend.
+
+    Parameters
+    ----------
+    backend : {"auto", "cuda", "cpu"}
+        ``"auto"`` uses CUDA when a device is available and the Numba CPU
+        kernel otherwise.
+    """
+    run = simulate_gpu_batch if resolve_backend(backend) == "cuda" else simulate_cpu_batch
+    return run(open_m1, high_m1, low_m1, close_m1,
+               entry_side, sl_points, tp_points,
+               point, ohlc_order, spread_points,
+               spread_policy, n_minutes,
+               trail_start_ratio, trail_width_points)
+
+
+def simulate_shared_batch(open_m1, high_m1, low_m1, close_m1,
+                          run_start: np.ndarray, run_length: np.ndarray,
+                          signal_index: np.ndarray, signal_side: np.ndarray,
+                          signal_begin: np.ndarray, signal_end: np.ndarray,
+                          sl_points: np.ndarray, tp_points: np.ndarray,
+                          point: float, ohlc_order: int, spread_points: int,
+                          spread_policy: int,
+                          trail_start_ratio: np.ndarray | None = None,
+                          trail_width_points: np.ndarray | None = None,
+                          backend: str = "auto") -> dict[str, np.ndarray]:
+    """Execute the shared-series simulation on the selected backend.
+
+    See :func:`simulate_gpu_shared_batch` for the inputs and
+    :func:`simulate_batch` for ``backend``.
+    """
+    run = simulate_gpu_shared_batch if resolve_backend(backend) == "cuda" else simulate_cpu_shared_batch
+    return run(open_m1, high_m1, low_m1, close_m1,
+               run_start, run_length,
+               signal_index, signal_side, signal_begin, signal_end,
+               sl_points, tp_points,
+               point, ohlc_order, spread_points, spread_policy,
+               trail_start_ratio, trail_width_points)
+
+
+def simulate_trade_chains(open_m1: np.ndarray, high_m1: np.ndarray,
+                          low_m1: np.ndarray, close_m1: np.ndarray,
+                          signal_index: list[np.ndarray], signal_side: list[np.ndarray],
+                          sl_points: np.ndarray, tp_points: np.ndarray,
+                          point: float, ohlc_order: int, spread_points: int,
+                          spread_policy: int,
+                          trail_start_ratio: np.ndarray | None = None,
+                          trail_width_points: np.ndarray | None = None,
+                          batch_size: int = 1024, window: int = 1440,
+                          backend: str = "auto") -> list[dict[str, np.ndarray]]:
+    """Simulate sequential trades for many parameter sets with the batch kernel.
+
+    The kernel resolves a single trade per run, so the trades of each
+    parameter set are simulated in passes. Parameter set ``p`` has
+    candidate entries at the ascending bar positions ``signal_index[p]``
+    of the shared price series with sides ``signal_side[p]``. Every pass
+    launches one run per unfinished set, in chunks of ``batch_size`` runs,
+    over the ``window`` bars starting at the set's next entry. All runs
+    read the shared price series through :func:`simulate_shared_batch`, so
+    no per-run copies of the prices are made. A trade that exits inside
+    the window lets the set take the first signal after the exit bar in
+    the next pass; a trade still open at the end of the window is retried
+    from the same entry with a doubled window. Windows are cut at the end
+    of the data, and a trade still open there is dropped as ``cpu_tester``
+    does.
+
+    Parameters
+    ----------
+    open_m1, high_m1, low_m1, close_m1 : np.ndarray
+        Shared ``(n_minutes,)`` price series.
+    signal_index, signal_side : list of np.ndarray
+        Per parameter set, entry bar positions and ``+1``/``-1`` sides.
+    sl_points, tp_points, trail_start_ratio, trail_width_points : np.ndarray
+        Per parameter set, with the dtypes :func:`simulate_batch` expects.
+    batch_size : int
+        Maximum number of runs per kernel launch.
+    window : int
+        Initial window length in bars.
+
+    Returns
+    -------
+    list of dict
+        Per parameter set, arrays ``entry_index``/``exit_index`` (int64
+        positions in the shared series), ``side`` and ``exit_reason``
+        (int8), ``entry_price``/``exit_price``/``pnl_points`` (float32).
+    """
+    if batch_size <= 0 or window <= 0:
+        raise ValueError("batch_size and window must be positive")
+    prices = [np.asarray(a, dtype=np.float32) for a in (open_m1, high_m1, low_m1, close_m1)]
+    n = prices[0].shape[0]
+    n_sets = sl_points.shape[0]
+    if len(signal_index) != n_sets or len(signal_side) != n_sets or tp_points.shape[0] != n_sets:
+        raise ValueError("per-set inputs length mismatch")
+    trail_start_ratio, trail_width_points = _trailing_inputs(n_sets, trail_start_ratio, trail_width_points)
+    backend = resolve_backend(backend)
+
+    sizes = np.array([len(idx) for idx in signal_index], dtype=np.int64)
+    offsets = np.r_[0, np.cumsum(sizes)].astype(np.int64)
+    all_index = np.concatenate([np.asarray(idx, dtype=np.int64) for idx in signal_index] or [np.zeros(0, np.int64)])
+    all_side = np.concatenate([np.asarray(side, dtype=np.int8) for side in signal_side] or [np.zeros(0, np.int8)])
+    kernel_index, kernel_side = all_index, all_side
+    if backend == "cuda":
+        # Prices and signals are the same in every pass; upload them once.
+        prices = [cuda.to_device(a) for a in prices]
+        kernel_index, kernel_side = cuda.to_device(all_index), cuda.to_device(all_side)
+    cursor = np.zeros(n_sets, dtype=np.int64)
+    width = np.full(n_sets, window, dtype=np.int64)
+    trades: list[list[tuple]] = [[] for _ in range(n_sets)]
+    active = np.flatnonzero(sizes)
+    while active.shape[0]:
+        for lo in range(0, active.shape[0], batch_size):
+            runs = active[lo:lo + batch_size]
+            begin = offsets[runs] + cursor[runs]
+            entries = all_index[begin]
+            length = np.minimum(width[runs], n - entries).astype(np.int32)
+            out = simulate_shared_batch(*prices, entries, length,
+                                        kernel_index, kernel_side, begin, offsets[runs + 1],
+                                        sl_points[runs], tp_points[runs], point,
+                                        ohlc_order, spread_points, spread_policy,
+                                        trail_start_ratio[runs], trail_width_points[runs],
+                                        backend=backend)
+            for k, p in enumerate(runs.tolist()):
+                if out["exit_reason"][k] != 0:
+                    exit_at = entries[k] + out["exit_index"][k]
+                    trades[p].append((entries[k], exit_at, all_side[begin[k]], out["exit_reason"][k],
+                                      out["entry_price"][k], out["exit_price"][k], out["pnl_points"][k]))
+                    cursor[p] = np.searchsorted(signal_index[p], exit_at, side="right")
+                    width[p] = window
+                elif entries[k] + length[k] >= n:
+                    cursor[p] = sizes[p]
+                else:
+                    width[p] *= 2
+        active = active[cursor[active] < sizes[active]]
+
+    names = ("entry_index", "exit_index", "side", "exit_reason", "entry_price", "exit_price", "pnl_points")
+    dtypes = (np.int64, np.int64, np.int8, np.int8, np.float32, np.float32, np.float32)
+    results = []
+    for rows in trades:
+        columns = list(zip(*rows)) if rows else [()] * len(names)
+        results.append({name: np.array(col, dtype=dt) for name, col, dt in zip(names, columns, dtypes)})
+    return results
@@ -1,25 +1,280 @@
+"""バッチカーネルでパラメータセットごとの取引をまとめてシミュレーションするテスター。
+
+パラメータグリッドの各組み合わせについてEAの ``emit_actions_batch`` でエントリー
+シグナルを作り、``simulate_trade_chains`` でCUDAまたはマルチコアCPUの
+カーネルに ``Config.batch_size`` ランずつ渡す。出力は ``gpu_mock`` と同じ
+``outputs/GPU/Run_<id>/<index>/`` のファイル、または列指向の結果ストア。
+
+カーネルは1ランで1取引を判定し、CPUテスターと同じくエントリーした次のバーから
+SL/TP を確認する。
+"""
 from __future__ import annotations
 
 import argparse
+import json
+from dataclasses import dataclass, fields, replace
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import yaml
 
+from .batch import BatchInputs, supports_batch, validate_signals
+from .checkpoint import get_ea_state, set_ea_state
+from .catalog import load_arrays
 from .config import Config
+from .costs import apply_costs
+from .errors import ConfigError, EAValidationError, SimulationError
+from .execution import compute_lot_with_mode, value_per_point
+from .flags import build_flag_set
+from .gpu_mock import write_run_files
+from .gpu_runner import BACKENDS, prefer_fork_safe_threading, resolve_backend, simulate_trade_chains
+from .indicator_cache import IndicatorCache
+from .indicators import compute_rsi_and_flags
+from .loader import load_user_ea
 from .logger import get_logger
+from .optimizer import param_combinations
+from .results_store import ResultsWriter
+from .state import init_states
+from .ticks import build_ask_matrix, frame_tick_matrix
 
+DEFAULT_WINDOW = 1440  # 最初のパスで1ランに渡すバー数 (決済しなければ倍にして再実行する)
 
-def main() -> None:
-    """GPU実行のためのスタブ。
 
-    実装は未提供だが、必要な引数を受け取りログを出力する。
+@dataclass
+class SignalSet:
+    """1パラメータセット分のエントリー位置と売買方向・ロット、およびその設定。
+
+    ``lot`` が NaN のシグナルは ``cpu_tester`` と同じく資金管理設定でロットを決める。
     """
+
+    cfg: Config
+    index: np.ndarray
+    side: np.ndarray
+    lot: np.ndarray
+
+
+def load_param_grid(path: str | None) -> Dict[str, Any]:
+    """YAML/JSON のパラメータグリッドを読み込む。省略時は設定値1組だけを試す。
+
+    値は ``optimizer.grid_search`` と同じくリストまたは ``start``/``stop``/``step`` の辞書。
+    """
+    if path is None:
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            grid = yaml.safe_load(fh) or {}
+    except FileNotFoundError as exc:
+        raise ConfigError(str(exc)) from exc
+    if not isinstance(grid, dict):
+        raise ConfigError(f"parameter grid must be a mapping: {path}")
+    names = {f.name for f in fields(Config)}
+    unknown = sorted(set(grid) - names)
+    if unknown:
+        raise ConfigError(f"unknown parameters: {unknown}")
+    return grid
+
+
+def build_signals(data: Any, cfg: Config, ea: Any, cache: IndicatorCache | None = None) -> SignalSet:
+    """``cfg`` で指標を計算し、EAの ``emit_actions_batch`` からエントリーシグナルを得る。"""
+    rsi_m15, rsi_h1, flags = compute_rsi_and_flags(data, cfg, cache)
+    bid = frame_tick_matrix(data, cfg.ohlc_order)
+    ask = build_ask_matrix(bid, cfg)
+    inputs = BatchInputs(
+        index=data.index,
+        open=data["open"].to_numpy(),
+        high=data["high"].to_numpy(),
+        low=data["low"].to_numpy(),
+        close=data["close"].to_numpy(),
+        bid=bid[:, 0],
+        ask=ask[:, 0],
+        rsi_m15=rsi_m15,
+        rsi_h1=rsi_h1,
+        flags=build_flag_set(data, rsi_m15, rsi_h1, flags, cfg),
+        cfg=cfg,
+    )
+    signals = ea.emit_actions_batch(inputs)
+    side = np.zeros(len(data), dtype=np.int8)
+    lot = np.full(len(data), np.nan)
+    if signals is not None:
+        validate_signals(signals, len(data))
+        side = np.asarray(signals.side, dtype=np.int8)
+        if signals.lot is not None:
+            lot = np.asarray(signals.lot, dtype=np.float64)
+    index = np.flatnonzero(side)
+    return SignalSet(cfg, index, side[index], lot[index])
+
+
+def trade_lots(signals: SignalSet, pnl_points: np.ndarray, entry_index: np.ndarray) -> np.ndarray:
+    """各取引のロットを ``cpu_tester`` と同じ規則で求める。
+
+    EAが指定したロットはそのまま使い、NaN の取引は直前の取引までの損益で
+    更新した資金管理の状態 (残高・連敗数・リスク率) から計算する。
+    """
+    cfg = signals.cfg
+    lots = signals.lot[np.searchsorted(signals.index, entry_index)]
+    if not np.isnan(lots).any():
+        return lots
+    state = init_states(cfg)
+    vpp = value_per_point(cfg)
+    for k, points in enumerate(pnl_points.tolist()):
+        if lots[k] != lots[k]:
+            lots[k] = compute_lot_with_mode(
+                state.balance, state.risk_pct, cfg.stoploss_points, cfg, loss_streak=state.loss_streak
+            )
+        state.update_after_trade(points * vpp * lots[k], cfg)
+    return lots
+
+
+def trade_costs(data: Any, signals: SignalSet, trades: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """連続取引にロット・手数料・スワップ・純損益 (口座通貨) の列を加えて返す。"""
+    cfg = signals.cfg
+    entry = trades["entry_index"]
+    lot = trade_lots(signals, trades["pnl_points"], entry)
+    pnl = trades["pnl_points"].astype(np.float64) * value_per_point(cfg) * lot
+    time = data.index.asi8
+    side = signals.side[np.searchsorted(signals.index, entry)]
+    costs = apply_costs(pnl, time[entry], time[trades["exit_index"]], side, lot, cfg)
+    return {**trades, "lot": lot, "commission": costs.commission, "swap": costs.swap, "net_profit": costs.net_pnl}
+
+
+def trade_metrics(pnl_points: np.ndarray) -> Dict[str, Any]:
+    """ポイント建て損益から ``gpu_mock`` と同じ項目の集計値を求める。
+
+    負けが無く ``profit_factor`` が無限大になる場合は ``None`` (JSON の null) とする。
+    """
+    pnl = np.asarray(pnl_points, dtype=np.float64)
+    wins = pnl[pnl > 0]
+    losses = pnl[pnl <= 0]
+    equity = np.cumsum(np.r_[0.0, pnl])
+    gross_loss = -losses.sum()
+    profit_factor = round(float(wins.sum() / gross_loss), 4) if gross_loss > 0 else None
+    return {
+        "total_trades": int(pnl.size),
+        "win_rate": round(wins.size / pnl.size, 4) if pnl.size else 0.0,
+        "avg_win": round(float(wins.mean()), 4) if wins.size else 0.0,
+        "avg_loss": round(float(losses.mean()), 4) if losses.size else 0.0,
+        "profit_factor": profit_factor,
+        "max_dd_pts": round(float((np.maximum.accumulate(equity) - equity).max()), 4),
+        "net_profit_pts": round(float(pnl.sum()), 4),
+    }
+
+
+def run_param_sets(
+    data: Any,
+    cfg: Config,
+    ea: Any,
+    combos: List[Dict[str, Any]],
+    window: int = DEFAULT_WINDOW,
+    backend: str = "auto",
+) -> List[dict]:
+    """各パラメータの組み合わせで取引をシミュレーションし、組み合わせ順に結果を返す。
+
+    EAの状態は組み合わせごとに開始時の ``get_state()`` の値へ戻す。
+    指標・SL/TP幅・トレーリングは組み合わせごとの設定から取り、
+    スプレッド・OHLCの順序・ポイントは全組み合わせで ``cfg`` の値を使う。
+    取引には ``trade_costs`` の列を加え、集計値の ``net_profit`` は ``cpu_tester`` と
+    同じく手数料とスワップを反映した口座通貨建ての純損益とする。
+    """
+    if not supports_batch(ea):
+        raise EAValidationError("gpu_tester requires an EA with emit_actions_batch")
+    for key in ("ohlc_order", "spread_policy", "fixed_spread_point", "point"):
+        if any(key in combo for combo in combos):
+            raise ConfigError(f"{key} cannot vary within one gpu_tester run")
+    cache = IndicatorCache()
+    initial = get_ea_state(ea)
+    sets = []
+    for combo in combos:
+        set_ea_state(ea, initial)
+        sets.append(build_signals(data, replace(cfg, **combo), ea, cache))
+    set_ea_state(ea, initial)
+
+    sl = np.array([s.cfg.stoploss_points for s in sets], dtype=np.int32)
+    tp = np.array([round(s.cfg.rr * s.cfg.stoploss_points) for s in sets], dtype=np.int32)
+    trailing = np.array([s.cfg.enable_trailing_stop for s in sets])
+    trail_ratio = np.where(trailing, [s.cfg.trailing_start_ratio for s in sets], 0.0).astype(np.float32)
+    trail_width = np.where(trailing, [s.cfg.trailing_width_points for s in sets], 0).astype(np.int32)
+    trades = simulate_trade_chains(
+        data["open"].to_numpy(),
+        data["high"].to_numpy(),
+        data["low"].to_numpy(),
+        data["close"].to_numpy(),
+        [s.index for s in sets],
+        [s.side for s in sets],
+        sl,
+        tp,
+        cfg.point,
+        cfg.ohlc_order.value,
+        cfg.fixed_spread_point,
+        cfg.spread_policy.value,
+        trail_ratio,
+        trail_width,
+        batch_size=cfg.batch_size,
+        window=window,
+        backend=backend,
+    )
+    results = []
+    for combo, signals, chain in zip(combos, sets, trades):
+        chain = trade_costs(data, signals, chain)
+        metrics = {**trade_metrics(chain["pnl_points"]), "net_profit": round(float(chain["net_profit"].sum()), 4)}
+        results.append({"params": combo, "trades": chain, "metrics": metrics})
+    return results
+
+
+def main() -> None:
+    """パラメータグリッドをバッチカーネルで評価し、``gpu_mock`` と同じ形式で書き出す。"""
     parser = argparse.ArgumentParser()
     parser.add_argument("--config", required=True)
     parser.add_argument("--run-id", required=True)
+    parser.add_argument("--data", default=None, help="OHLCデータのCSVファイルパス (省略時は data_path)")
+    parser.add_argument("--symbol", default=None, help="データディレクトリから読むシンボル (省略時は設定の symbol)")
+    parser.add_argument("--start", default=None, help="開始日時 (例: 2015-03)")
+    parser.add_argument("--end", default=None, help="終了日時 (例: 2019-11、その期間の末尾を含む)")
+    parser.add_argument("--params", default=None, help="パラメータグリッドの YAML/JSON (省略時は設定値1組)")
+    parser.add_argument(
+        "--backend",
+        choices=list(BACKENDS),
+        default="auto",
+        help="auto: CUDAが使えなければマルチコアCPUで実行する",
+    )
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="最初のパスで1ランに渡すバー数")
+    parser.add_argument(
+        "--output-format",
+        choices=["files", "columnar"],
+        default="files",
+        help="files: Run_<id>/<index>/ に出力, columnar: outputs/GPU/results に列指向で追記",
+    )
     args = parser.parse_args()
+
+    prefer_fork_safe_threading()
     cfg = Config.from_yaml(args.config)
     logger = get_logger(__name__, args.run_id)
-
     logger.info("gpu tester start: symbol=%s", cfg.symbol)
-    logger.info("gpu tester completed")
+
+    try:
+        ea = load_user_ea()
+        combos = param_combinations(load_param_grid(args.params))
+        arrays = load_arrays(args.data or cfg.data_path, symbol=args.symbol or cfg.symbol, start=args.start, end=args.end)
+        backend = resolve_backend(args.backend)
+        logger.info("backend=%s bars=%s param_sets=%s batch_size=%s", backend, len(arrays), len(combos), cfg.batch_size)
+        results = run_param_sets(arrays.to_frame(), cfg, ea, combos, args.window, backend)
+        if args.output_format == "columnar":
+            with ResultsWriter(Path("outputs/GPU") / "results") as writer:
+                for i, res in enumerate(results):
+                    # 列指向ストアは null を持てないため、定まらない値は NaN で書く
+                    metrics = {k: np.nan if v is None else v for k, v in res["metrics"].items()}
+                    writer.append_run(args.run_id, metrics, {"index": i, **res["params"]})
+        else:
+            out_root = Path("outputs/GPU") / f"Run_{args.run_id}"
+            for i, res in enumerate(results):
+                write_run_files(out_root, args.run_id, i, res["metrics"], {"index": i, **res["params"]}, cfg)
+        logger.info("gpu tester completed: %d runs", len(results))
+    except Exception as exc:  # pragma: no cover - エラー時出力
+        logger.error("gpu tester error: %s", exc)
+        Path("outputs").mkdir(exist_ok=True)
+        err = {"error": str(exc)}
+        (Path("outputs") / f"{args.run_id}_error.json").write_text(json.dumps(err, ensure_ascii=False), encoding="utf-8")
+        raise SimulationError(str(exc)) from exc
 
 
 if __name__ == "__main__":
@@ -0,0 +1,115 @@
+"""計算済み指標配列をメモリ (LRU) とディスクの2段で再利用するキャッシュ。"""
+from __future__ import annotations
+
+import hashlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Tuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+CacheKey = Tuple[str, str, str, int]
+
+
+def data_fingerprint(df: pd.DataFrame) -> str:
+    """時刻と終値の内容から決まるデータの指紋。"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(df.index.asi8).tobytes())
+    h.update(np.ascontiguousarray(df["close"].to_numpy(np.float64)).tobytes())
+    return h.hexdigest()
+
+
+def _key_name(key: Tuple[Hashable, ...]) -> str:
+    return "-".join(str(part) for part in key)
+
+
+class IndicatorCache:
+    """``(データ指紋, 指標, 時間足, 期間)`` をキーに指標配列を保持する。
+
+    メモリ層は合計 ``max_bytes`` を超えると最も古く使われた配列から破棄する。
+    ``disk_dir`` を指定するとディスク層にも ``.npy`` として保存され、別の
+    プロセスや次回の実行でも再利用される。配列は読み取り専用で返す。
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, disk_dir: str | Path | None = None) -> None:
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.bytes = 0
+        self.stats: Dict[str, int] = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._fingerprints: Dict[int, Tuple[pd.DataFrame, str]] = {}
+
+    def fingerprint(self, df: pd.DataFrame) -> str:
+        """``df`` の指紋を返す。直前と同じオブジェクトならハッシュを再計算しない。"""
+        cached = self._fingerprints.get(id(df))
+        if cached is not None and cached[0] is df:
+            return cached[1]
+        fp = data_fingerprint(df)
+        self._fingerprints = {id(df): (df, fp)}
+        return fp
+
+    def _remember(self, name: str, array: np.ndarray) -> None:
+        old = self._memory.pop(name, None)  # 同じキーの再登録は古い配列と置き換えて末尾へ
+        if old is not None:
+            self.bytes -= old.nbytes
+        if array.nbytes > self.max_bytes:
+            return
+        self._memory[name] = array
+        self.bytes += array.nbytes
+        while self.bytes > self.max_bytes:
+            _, old = self._memory.popitem(last=False)
+            self.bytes -= old.nbytes
+            self.stats["evictions"] += 1
+
+    def get(self, key: CacheKey) -> np.ndarray | None:
+        """キャッシュ済みの配列を返す。無ければ ``None``。"""
+        name = _key_name(key)
+        array = self._memory.get(name)
+        if array is not None:
+            self._memory.move_to_end(name)
+            self.stats["memory_hits"] += 1
+            return array
+        if self.disk_dir is not None:
+            path = self.disk_dir / f"{name}.npy"
+            try:
+                array = np.load(path)
+            except (FileNotFoundError, ValueError, OSError):
+                array = None
+            if array is not None:
+                array.flags.writeable = False
+                self._remember(name, array)
+                self.stats["disk_hits"] += 1
+                return array
+        return None
+
+    def put(self, key: CacheKey, array: np.ndarray) -> np.ndarray:
+        """配列を登録する。"""
+        name = _key_name(key)
+        array = np.array(array, copy=True)
+        array.flags.writeable = False
+        self._remember(name, array)
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            path = self.disk_dir / f"{name}.npy"
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            with open(tmp, "wb") as fh:
+                np.save(fh, array)
+            os.replace(tmp, path)
+        return array
+
+    def get_or_compute(self, key: CacheKey, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        """キャッシュに無ければ ``compute`` で計算して登録する。"""
+        array = self.get(key)
+        if array is None:
+            self.stats["misses"] += 1
+            array = self.put(key, compute())
+        return array
+
+    def clear(self) -> None:
+        """メモリ層を空にする。ディスク層と統計は残す。"""
+        self._memory.clear()
+        self.bytes = 0
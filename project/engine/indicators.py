@@ -1,17 +1,17 @@
 from __future__ import annotations
 
-from typing import Tuple
+import math
+from dataclasses import dataclass, field
+from typing import Dict, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
+from numba import njit
 
 from .config import Config
-
-
-def resample_ohlc_m(df: pd.DataFrame, minutes: int) -> pd.DataFrame:
-    """OHLCデータを指定分足へリサンプルする。"""
-    ohlc_dict = {"open": "first", "high": "max", "low": "min", "close": "last"}
-    return df.resample(f"{minutes}T", label="right", closed="right").agg(ohlc_dict).dropna()
+from .data_cache import NS_PER_MINUTE
+from .indicator_cache import IndicatorCache
+from .timeframes import TIMEFRAME_MINUTES, timeframe_index
 
 
 def rsi_wilder(series: pd.Series, period: int) -> pd.Series:
@@ -26,27 +26,334 @@ def rsi_wilder(series: pd.Series, period: int) -> pd.Series:
     return rsi
 
 
+def resampled_rsi(close: pd.Series, timeframe: str, period: int) -> np.ndarray:
+    """``timeframe`` (``m15``/``h1`` など) 足のRSIを1分足へ前方補完して返す。
+
+    ``resample().last()`` と ``reindex(method="ffill")`` の代わりに、
+    インデックスごとに共有されるバケット対応で集約と展開を行う。
+    """
+    bmap = timeframe_index(close.index)[timeframe]
+    dense = pd.Series(bmap.dense_last(close.to_numpy()))
+    return bmap.to_m1(rsi_wilder(dense, period).to_numpy())
+
+
+@njit(cache=True, error_model="numpy")
+def _rsi_matrix_kernel(gain: np.ndarray, loss: np.ndarray, periods: np.ndarray, out: np.ndarray) -> None:
+    """期間ごとに ``rsi_wilder`` と同じ演算順序でRSIを計算する。
+
+    最適化はワーカーを fork で起動するため、fork 非対応のスレッド層を
+    初期化する ``parallel=True`` は使わない。並列化はプロセス側で行う。
+    """
+    n = gain.shape[0]
+    for p in range(periods.shape[0]):
+        period = periods[p]
+        factor = 1.0 - 1.0 / (1.0 + (1.0 - 1.0 / period) / (1.0 / period))
+        wg = np.nan
+        wl = np.nan
+        old_g = 1.0
+        old_l = 1.0
+        nobs = 0
+        for i in range(n):
+            g = gain[i]
+            lo = loss[i]
+            obs = g == g
+            if obs:
+                nobs += 1
+            if wg == wg:
+                old_g *= factor
+                if obs:
+                    if wg != g:
+                        wg = (old_g * wg + g) / (old_g + 1.0)
+                    old_g += 1.0
+            elif obs:
+                wg = g
+            if wl == wl:
+                old_l *= factor
+                if obs:
+                    if wl != lo:
+                        wl = (old_l * wl + lo) / (old_l + 1.0)
+                    old_l += 1.0
+            elif obs:
+                wl = lo
+            if nobs >= period:
+                out[p, i] = 100.0 - 100.0 / (1.0 + wg / wl)
+            else:
+                out[p, i] = np.nan
+
+
+def rsi_matrix(close: np.ndarray, periods: Sequence[int]) -> np.ndarray:
+    """複数期間のWilder RSIを1回の呼び出しで計算し、``(期間数, 本数)`` の float32 行列を返す。
+
+    各行は ``rsi_wilder(pd.Series(close), period)`` と浮動小数の誤差範囲で一致する。
+    上昇幅・下落幅は全期間で共有するため、期間を増やしても前処理は1回で済む。
+    """
+    close = np.asarray(close, dtype=np.float64)
+    delta = np.empty_like(close)
+    if close.shape[0]:
+        delta[0] = np.nan
+        np.subtract(close[1:], close[:-1], out=delta[1:])
+    with np.errstate(invalid="ignore"):
+        gain = np.where(delta > 0, delta, np.where(np.isnan(delta), np.nan, 0.0))
+        loss = np.where(delta < 0, -delta, np.where(np.isnan(delta), np.nan, 0.0))
+    periods_arr = np.asarray(periods, dtype=np.int64)
+    out = np.empty((periods_arr.shape[0], close.shape[0]), dtype=np.float64)
+    _rsi_matrix_kernel(gain, loss, periods_arr, out)
+    return out.astype(np.float32)
+
+
+def resampled_rsi_matrix(close: pd.Series, timeframe: str, periods: Sequence[int]) -> np.ndarray:
+    """``resampled_rsi`` を複数期間まとめて計算し、1分足へ前方補完した行列を返す。"""
+    bmap = timeframe_index(close.index)[timeframe]
+    return bmap.to_m1(rsi_matrix(bmap.dense_last(close.to_numpy()), periods))
+
+
+def rsi_sweep_arrays(df: pd.DataFrame, periods: Sequence[int]) -> Dict[str, np.ndarray]:
+    """``rsi_period`` の探索用に、全期間分のM15/H1 RSI行列をまとめて返す。
+
+    ``grid_search_parallel`` の共有配列にそのまま渡せる形式で、各ランは
+    ``optimizer.select_period`` で自分の期間の行を取り出す。
+    """
+    close = df["close"]
+    return {
+        "rsi_periods": np.asarray(periods, dtype=np.int64),
+        "rsi_m15": resampled_rsi_matrix(close, "m15", periods),
+        "rsi_h1": resampled_rsi_matrix(close, "h1", periods),
+    }
+
+
 def compute_rsi_and_flags(
-    df: pd.DataFrame, cfg: Config
+    df: pd.DataFrame, cfg: Config, cache: IndicatorCache | None = None
 ) -> Tuple[np.ndarray, np.ndarray, pd.DataFrame]:
-    """複数時間足のRSIと各種フラグを計算する。"""
+    """複数時間足のRSIと各種フラグを計算する。
+
+    ``cache`` を渡すとRSIは (データ指紋, 指標, 時間足, 期間) をキーに再利用され、
+    閾値に依存するフラグだけが毎回計算される。
+    """
     close = df["close"]
-    rsi_m15 = (
-        rsi_wilder(close.resample("15T").last(), cfg.rsi_period)
-        .reindex(df.index, method="ffill")
-        .to_numpy()
-    )
-    rsi_h1 = (
-        rsi_wilder(close.resample("1H").last(), cfg.rsi_period)
-        .reindex(df.index, method="ffill")
-        .to_numpy()
-    )
-    flags = pd.DataFrame(
+    if cache is None:
+        rsi_m15 = resampled_rsi(close, "m15", cfg.rsi_period)
+        rsi_h1 = resampled_rsi(close, "h1", cfg.rsi_period)
+    else:
+        fingerprint = cache.fingerprint(df)
+        rsi_m15, rsi_h1 = (
+            cache.get_or_compute(
+                (fingerprint, "rsi", tf, cfg.rsi_period), lambda tf=tf: resampled_rsi(close, tf, cfg.rsi_period)
+            )
+            for tf in ("m15", "h1")
+        )
+    flags = _build_flags(rsi_m15, df.index, cfg)
+    return rsi_m15, rsi_h1, flags
+
+
+def _build_flags(rsi_m15: np.ndarray, index: pd.Index, cfg: Config) -> pd.DataFrame:
+    return pd.DataFrame(
         {
             "overbought": rsi_m15 >= cfg.overbought,
             "oversold": rsi_m15 <= cfg.oversold,
             "reset": rsi_m15 >= cfg.reset_level,
         },
-        index=df.index,
+        index=index,
     )
-    return rsi_m15, rsi_h1, flags
+
+
+@dataclass
+class EwmState:
+    """``Series.ewm(alpha=..., min_periods=...).mean()`` の途中状態。"""
+
+    weighted: float = math.nan
+    old_wt: float = 1.0
+    nobs: int = 0
+
+
+@dataclass
+class ResampledRSIState:
+    """上位足RSIをチャンク間で継続するための状態。
+
+    ``last_label``/``last_close`` は確定済みの最後のバケット。``IndicatorState.update``
+    で1分足ずつ進めた場合は、形成中のバケットの開始時刻 (エポック分) と現在の終値を
+    ``forming_minute``/``forming_close`` に持つ。
+    """
+
+    last_label: pd.Timestamp | None = None
+    last_close: float = math.nan
+    gain: EwmState = field(default_factory=EwmState)
+    loss: EwmState = field(default_factory=EwmState)
+    forming_minute: int | None = None
+    forming_close: float = math.nan
+
+
+@dataclass
+class IndicatorState:
+    """``compute_rsi_and_flags_chunk`` と ``update`` が引き継ぐ指標状態。
+
+    チャンク単位と1分足単位の計算は同じ状態を使うため、チャンクで
+    ウォームアップしてから1本ずつ進めることも、その逆もできる。
+    """
+
+    m15: ResampledRSIState = field(default_factory=ResampledRSIState)
+    h1: ResampledRSIState = field(default_factory=ResampledRSIState)
+
+    def update(self, minute: int, close: float, cfg: Config) -> Tuple[float, float]:
+        """エポック分 ``minute`` の1分足の終値を取り込み、``(rsi_m15, rsi_h1)`` を返す。
+
+        1本あたり定数時間で、形成中のバケットは現在の終値を終値とみなして計算する。
+        バケット最後の1分足では ``compute_rsi_and_flags`` と同じ値になる。
+        """
+        return (
+            _rsi_bar(self.m15, minute, close, TIMEFRAME_MINUTES["m15"], cfg.rsi_period),
+            _rsi_bar(self.h1, minute, close, TIMEFRAME_MINUTES["h1"], cfg.rsi_period),
+        )
+
+
+def ewm_alpha(period: int) -> float:
+    """``ewm(alpha=1/period)`` が内部で使う平滑化係数。"""
+    com = (1 - 1 / period) / (1 / period)
+    return 1.0 / (1.0 + com)
+
+
+def ewm_step(
+    weighted: float, old_wt: float, nobs: int, cur: float, old_wt_factor: float
+) -> Tuple[float, float, int]:
+    """pandas の ``ewm().mean()`` と同じ演算で1観測分だけ状態を進める。"""
+    is_observation = cur == cur
+    nobs += is_observation
+    if weighted == weighted:
+        old_wt *= old_wt_factor
+        if is_observation:
+            if weighted != cur:
+                weighted = old_wt * weighted + cur
+                weighted /= old_wt + 1.0
+            old_wt += 1.0
+    elif is_observation:
+        weighted = cur
+    return weighted, old_wt, nobs
+
+
+def ewm_mean_resume(values: np.ndarray, period: int, state: EwmState) -> np.ndarray:
+    """``ewm(alpha=1/period, min_periods=period).mean()`` を状態から継続計算する。
+
+    pandas の実装と同じ演算順序で計算するため、全系列を一括で渡した場合と
+    チャンクに分けて渡した場合の結果はビット単位で一致する。
+    """
+    old_wt_factor = 1.0 - ewm_alpha(period)
+    weighted, old_wt, nobs = state.weighted, state.old_wt, state.nobs
+    out = np.empty(len(values), dtype=np.float64)
+    for i, cur in enumerate(values.tolist()):
+        weighted, old_wt, nobs = ewm_step(weighted, old_wt, nobs, cur, old_wt_factor)
+        out[i] = weighted if nobs >= period else math.nan
+    state.weighted, state.old_wt, state.nobs = weighted, old_wt, nobs
+    return out
+
+
+def _resampled_rsi_chunk(close: pd.Series, timeframe: str, period: int, state: ResampledRSIState) -> np.ndarray:
+    """チャンク内の上位足RSIを計算し、1分足へ前方補完して返す。"""
+    bmap = timeframe_index(close.index)[timeframe]
+    dense = bmap.dense_last(close.to_numpy())
+    _close_forming(state, period)
+    if state.last_label is not None:
+        last_label = state.last_label.value // NS_PER_MINUTE
+        first_label = bmap.first * bmap.minutes
+        if first_label <= last_label:
+            raise ValueError("chunk overlaps previous chunk")
+        # 前チャンク末尾との間の空バケットも一括計算と同様にNaNとして扱う
+        gap = np.full((first_label - last_label) // bmap.minutes - 1, np.nan)
+        delta = np.diff(np.concatenate([[state.last_close], gap, dense]))[gap.shape[0]:]
+    else:
+        delta = np.diff(dense, prepend=np.nan)
+    with np.errstate(invalid="ignore"):
+        gain = np.where(np.isnan(delta), np.nan, np.maximum(delta, 0.0))
+        loss = np.where(np.isnan(delta), np.nan, np.maximum(-delta, 0.0))
+    avg_gain = ewm_mean_resume(gain, period, state.gain)
+    avg_loss = ewm_mean_resume(loss, period, state.loss)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        rsi = 100 - (100 / (1 + rs))
+    state.last_label = pd.Timestamp(bmap.last_label * NS_PER_MINUTE)
+    state.last_close = float(dense[-1])
+    return bmap.to_m1(rsi)
+
+
+def compute_rsi_and_flags_chunk(
+    df: pd.DataFrame, cfg: Config, state: IndicatorState | None = None
+) -> Tuple[np.ndarray, np.ndarray, pd.DataFrame, IndicatorState]:
+    """チャンク単位で ``compute_rsi_and_flags`` と同じ値を計算する。
+
+    チャンクは時刻順に渡し、境界は1時間足の区切りに揃っている必要がある。
+    返された状態を次のチャンクに渡すことでウォームアップが引き継がれる。
+    """
+    state = state or IndicatorState()
+    close = df["close"]
+    rsi_m15 = _resampled_rsi_chunk(close, "m15", cfg.rsi_period, state.m15)
+    rsi_h1 = _resampled_rsi_chunk(close, "h1", cfg.rsi_period, state.h1)
+    return rsi_m15, rsi_h1, _build_flags(rsi_m15, df.index, cfg), state
+
+
+def rsi_from_averages(avg_gain: float, avg_loss: float) -> float:
+    """平均上昇幅と平均下落幅からRSIを計算する。NumPyの除算と同じ結果を返す。"""
+    if avg_loss == 0:
+        if avg_gain != avg_gain or avg_gain == 0:
+            return math.nan
+        return 100.0
+    rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
+
+
+def bar_flags(rsi_m15: float, cfg: Config) -> Dict[str, bool]:
+    """1本分の ``compute_rsi_and_flags`` と同じ基準のフラグ。"""
+    return {
+        "overbought": bool(rsi_m15 >= cfg.overbought),
+        "oversold": bool(rsi_m15 <= cfg.oversold),
+        "reset": bool(rsi_m15 >= cfg.reset_level),
+    }
+
+
+def _commit_delta(state: ResampledRSIState, delta: float, period: int) -> None:
+    """確定したバケットの終値差分を平均に反映する。欠損は ``NaN`` で渡す。"""
+    factor = 1.0 - ewm_alpha(period)
+    gain = max(delta, 0.0) if delta == delta else math.nan
+    loss = max(-delta, 0.0) if delta == delta else math.nan
+    for ewm, cur in ((state.gain, gain), (state.loss, loss)):
+        ewm.weighted, ewm.old_wt, ewm.nobs = ewm_step(ewm.weighted, ewm.old_wt, ewm.nobs, cur, factor)
+
+
+def _close_forming(state: ResampledRSIState, period: int) -> None:
+    """形成中のバケットを確定させる。"""
+    if state.forming_minute is None:
+        return
+    _commit_delta(state, state.forming_close - state.last_close, period)
+    state.last_label = pd.Timestamp(state.forming_minute * NS_PER_MINUTE)
+    state.last_close = state.forming_close
+    state.forming_minute = None
+    state.forming_close = math.nan
+
+
+def _rsi_bar(state: ResampledRSIState, minute: int, close: float, minutes: int, period: int) -> float:
+    """1分足を1本取り込み、形成中のバケットを暫定的に確定させた場合のRSIを返す。"""
+    bucket = minute - minute % minutes
+    if state.forming_minute is not None and bucket != state.forming_minute:
+        if bucket < state.forming_minute:
+            raise ValueError("bars must be passed in time order")
+        _close_forming(state, period)
+    if state.forming_minute is None:
+        if state.last_label is not None:
+            last = state.last_label.value // NS_PER_MINUTE
+            if bucket <= last:
+                raise ValueError("bars must be passed in time order")
+            empty = (bucket - last) // minutes - 1
+            # 欠損バケットと、その直後のバケットの差分は一括計算でもNaNになる
+            for _ in range(empty):
+                _commit_delta(state, math.nan, period)
+            if empty:
+                state.last_close = math.nan
+        state.forming_minute = bucket
+    state.forming_close = close
+
+    delta = close - state.last_close
+    gain = max(delta, 0.0) if delta == delta else math.nan
+    loss = max(-delta, 0.0) if delta == delta else math.nan
+    factor = 1.0 - ewm_alpha(period)
+    avg_gain, _, nobs = ewm_step(state.gain.weighted, state.gain.old_wt, state.gain.nobs, gain, factor)
+    avg_loss, _, _ = ewm_step(state.loss.weighted, state.loss.old_wt, state.loss.nobs, loss, factor)
+    if nobs < period:
+        return math.nan
+    return rsi_from_averages(avg_gain, avg_loss)
@@ -3,6 +3,8 @@ from __future__ import annotations
 import importlib
 from typing import Any, Callable
 
+from .actions import OpenAction
+from .batch import supports_batch
 from .errors import EAValidationError
 from .logger import get_logger
 
@@ -20,6 +22,11 @@ def load_user_ea(module_path: str = "project.strategies.user_ea") -> Any:
         if not callable(func):
             raise EAValidationError("emit_actions is not callable")
         logger.info("EA emit_actions loaded")
+        batch = getattr(mod, "emit_actions_batch", None)
+        if batch is not None and not callable(batch):
+            raise EAValidationError("emit_actions_batch is not callable")
+        if supports_batch(mod):
+            logger.info("EA emit_actions_batch loaded")
         return mod
 
     if hasattr(mod, "entry_signal"):
@@ -27,7 +34,7 @@ def load_user_ea(module_path: str = "project.strategies.user_ea") -> Any:
         def emit_actions(i_minute: int, ctx: Any) -> list[dict]:
             side = mod.entry_signal(i_minute, ctx)
             if side in {"BUY", "SELL"}:
-                return [{"type": "OPEN", "side": side, "lot": ctx.cfg.min_lot}]
+                return [OpenAction(side, ctx.cfg.min_lot)]
             return []
 
         mod.emit_actions = emit_actions  # type: ignore[attr-defined]
@@ -1,7 +1,15 @@
 from __future__ import annotations
 
+import multiprocessing as mp
+from functools import partial
 from itertools import product
-from typing import Any, Callable, Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Mapping, Tuple
+
+import numpy as np
+
+from .shared_arrays import SharedArrays
+
+_worker_arrays: SharedArrays | None = None
 
 
 def _expand_values(spec: Any) -> List[Any]:
@@ -21,6 +29,13 @@ def _expand_values(spec: Any) -> List[Any]:
     return list(spec)
 
 
+def param_combinations(param_grid: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """``param_grid`` の全組み合わせを ``grid_search`` と同じ順序で返す。"""
+    keys = list(param_grid.keys())
+    grids = [_expand_values(param_grid[k]) for k in keys]
+    return [dict(zip(keys, values)) for values in product(*grids)]
+
+
 def grid_search(param_grid: Dict[str, Any], evaluate: Callable[[Dict[str, Any]], float]) -> Tuple[Dict[str, Any], float]:
     """指定されたパラメータ網羅探索を行い、最高スコアの組み合わせを返す。
 
@@ -42,10 +57,7 @@ def grid_search(param_grid: Dict[str, Any], evaluate: Callable[[Dict[str, Any]],
 
     best_params: Dict[str, Any] | None = None
     best_score: float | None = None
-    keys = list(param_grid.keys())
-    grids = [_expand_values(param_grid[k]) for k in keys]
-    for values in product(*grids):
-        params = dict(zip(keys, values))
+    for params in param_combinations(param_grid):
         score = evaluate(params)
         if best_score is None or score > best_score:
             best_score = score
@@ -53,3 +65,52 @@ def grid_search(param_grid: Dict[str, Any], evaluate: Callable[[Dict[str, Any]],
 
     assert best_params is not None and best_score is not None
     return best_params, best_score
+
+
+def select_period(arrays: Mapping[str, np.ndarray], name: str, period: int) -> np.ndarray:
+    """``rsi_sweep_arrays`` で作った行列から ``period`` の行をコピーなしで取り出す。"""
+    rows = np.flatnonzero(np.asarray(arrays["rsi_periods"]) == period)
+    if rows.size == 0:
+        raise KeyError(f"period {period} is not in rsi_periods")
+    return arrays[name][int(rows[0])]
+
+
+def _init_shared_worker(manifest: Dict[str, Any]) -> None:
+    """ワーカー起動時に共有配列へ接続する。"""
+    global _worker_arrays
+    _worker_arrays = SharedArrays.attach(manifest)
+
+
+def _evaluate_shared(evaluate: Callable[[Dict[str, Any], Mapping[str, np.ndarray]], float], params: Dict[str, Any]) -> float:
+    assert _worker_arrays is not None
+    return evaluate(params, _worker_arrays)
+
+
+def grid_search_parallel(
+    param_grid: Dict[str, Any],
+    evaluate: Callable[[Dict[str, Any], Mapping[str, np.ndarray]], float],
+    arrays: Mapping[str, np.ndarray],
+    processes: int | None = None,
+) -> Tuple[Dict[str, Any], float]:
+    """共有メモリ上の配列を使い、複数プロセスで網羅探索を行う。
+
+    ``arrays`` は1度だけ共有メモリへコピーされ、各ワーカーはコピーなしの
+    読み取り専用ビューを ``evaluate(params, arrays)`` の第2引数として受け取る。
+    ``evaluate`` はワーカーへ渡せるようモジュールレベルの関数である必要がある。
+    結果の選び方は ``grid_search`` と同じで、同点の場合は先の組み合わせを採用する。
+    """
+    if not param_grid:
+        raise ValueError("param_grid が空です")
+
+    combos = param_combinations(param_grid)
+    with SharedArrays.publish(arrays) as shared:
+        pool = mp.Pool(processes, initializer=_init_shared_worker, initargs=(shared.manifest,))
+        try:
+            scores = pool.map(partial(_evaluate_shared, evaluate), combos)
+        finally:
+            # ワーカーを正常終了させ、共有メモリの参照を解放させる
+            pool.close()
+            pool.join()
+
+    best = max(range(len(combos)), key=lambda i: (scores[i], -i))
+    return combos[best], scores[best]
@@ -0,0 +1,395 @@
+"""チケット番号で建玉と予約注文を管理する注文エンジン。"""
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .actions import Action
+from .config import Config
+from .execution import value_per_point
+from .hit_rules import resolve_hit
+from .state import RunState
+from .trailing import resolve_hit_trailing, trailing_activation, trailing_bounds
+
+_INF = float("inf")
+_COMPACT_MIN = 1024  # 無効な要素がこの数を超えたらヒープを作り直す
+
+# 決済結果 ``(チケット, 結果, 損益, 約定時刻, 売買方向, ロット)``
+ClosedTrade = Tuple[int, str, float, Optional[int], str, float]
+
+
+def initial_stops(side: str, entry: float, spread: float, cfg: Config) -> Tuple[float, float]:
+    """約定価格から設定値どおりの SL/TP を求める。スプレッドの扱いはバッチカーネルと同じ。"""
+    sl_dist = cfg.stoploss_points * cfg.point
+    tp_dist = cfg.rr * sl_dist
+    policy = cfg.spread_policy.value
+    if side == "BUY":
+        sl = entry - sl_dist - (spread if policy >= 1 else 0.0)
+        tp = entry + tp_dist - (spread if policy == 2 else 0.0)
+    else:
+        sl = entry + sl_dist + (spread if policy >= 1 else 0.0)
+        tp = entry - tp_dist + (spread if policy == 2 else 0.0)
+    return sl, tp
+
+
+class Position:
+    """約定済みの建玉。``version`` は SL/TP 変更や決済のたびに増え、古いヒープ要素の判定に使う。
+
+    ``best_price`` はトレーリング中の最有利価格 (BUY はBid、SELL はAsk)。
+    ``open_time`` は約定したバーの時刻 (エポックns)。
+    """
+
+    __slots__ = (
+        "ticket", "side", "lot", "open_price", "sl", "tp", "trailing_start_ratio", "best_price", "open_time", "version"
+    )
+
+    def __init__(
+        self, ticket: int, side: str, lot: float, open_price: float, sl: float, tp: float, open_time: int | None = None
+    ) -> None:
+        self.ticket = ticket
+        self.side = side
+        self.lot = lot
+        self.open_price = open_price
+        self.sl = sl
+        self.tp = tp
+        self.trailing_start_ratio: float | None = None
+        self.best_price = open_price
+        self.open_time = open_time
+        self.version = 0
+
+    def __repr__(self) -> str:
+        return f"Position(ticket={self.ticket}, side={self.side}, lot={self.lot}, open={self.open_price}, sl={self.sl}, tp={self.tp})"
+
+
+class PendingOrder:
+    """予約注文。発注時の気配値より有利な価格なら指値、不利なら逆指値として扱う。"""
+
+    __slots__ = ("ticket", "side", "lot", "price", "sl", "tp", "limit")
+
+    def __init__(
+        self, ticket: int, side: str, lot: float, price: float, sl: float | None, tp: float | None, limit: bool
+    ) -> None:
+        self.ticket = ticket
+        self.side = side
+        self.lot = lot
+        self.price = price
+        self.sl = sl
+        self.tp = tp
+        self.limit = limit
+
+    def __repr__(self) -> str:
+        kind = "limit" if self.limit else "stop"
+        return f"PendingOrder(ticket={self.ticket}, side={self.side}, {kind}@{self.price}, lot={self.lot})"
+
+
+class OrderBook:
+    """複数の建玉と予約注文をチケット番号で管理する。
+
+    建玉の SL/TP は売買方向ごとのヒープに、予約注文は方向と種類ごとに
+    価格順のリストに保持する。1本のバーで調べるのは、ヒープの先頭と
+    二分探索で切り出した範囲だけで、そのバーの値幅に届いた注文以外には触れない。
+    変更・決済された建玉のヒープ要素は取り出し時に読み捨てる。
+
+    トレーリング中の建玉は TP の代わりに ``trailing_bounds`` の閾値をヒープに積み、
+    SLを動かし得るバーでだけ ``resolve_hit_trailing`` で判定して積み直す。
+    ``cfg.enable_trailing_stop`` が真なら全建玉が約定時からトレーリングになる。
+
+    約定したバーでは建玉の SL/TP を判定しない (``simulate_bar`` と同じ)。
+    """
+
+    def __init__(self, cfg: Config) -> None:
+        self.cfg = cfg
+        self.positions: Dict[int, Position] = {}
+        self.pending: Dict[int, PendingOrder] = {}
+        self._next_ticket = 1
+        self._vpp = value_per_point(cfg)
+        # (キー, チケット, version) の最小ヒープ。キーは「キー <= 閾値」で発火するよう符号を揃える。
+        self._buy_sl: List[Tuple[float, int, int]] = []  # -sl <= -Bid安値
+        self._buy_tp: List[Tuple[float, int, int]] = []  # tp <= Bid高値
+        self._sell_sl: List[Tuple[float, int, int]] = []  # sl <= Ask高値
+        self._sell_tp: List[Tuple[float, int, int]] = []  # -tp <= -Ask安値
+        # (価格, チケット) の昇順リスト
+        self._buy_limit: List[Tuple[float, int]] = []  # Ask安値が価格以下で約定
+        self._buy_stop: List[Tuple[float, int]] = []  # Ask高値が価格以上で約定
+        self._sell_limit: List[Tuple[float, int]] = []  # Bid高値が価格以上で約定
+        self._sell_stop: List[Tuple[float, int]] = []  # Bid安値が価格以下で約定
+        self._new: List[Position] = []
+        self.time: int | None = None  # 処理中のバーの時刻。約定時刻として記録する
+        self._trail_width = cfg.trailing_width_points * cfg.point
+        self._compact_at = _COMPACT_MIN
+
+    # --- EA からの操作 -------------------------------------------------
+
+    def _ticket(self) -> int:
+        ticket = self._next_ticket
+        self._next_ticket += 1
+        return ticket
+
+    @property
+    def next_ticket(self) -> int:
+        """次に発行されるチケット番号。"""
+        return self._next_ticket
+
+    def open(self, side: str, lot: float, bid: float, ask: float, sl: float | None = None, tp: float | None = None) -> int:
+        """成行で建玉し、チケット番号を返す。BUY は Ask、SELL は Bid で約定する。"""
+        entry = ask if side == "BUY" else bid
+        return self._fill(self._ticket(), side, lot, entry, ask - bid, sl, tp)
+
+    def place_pending(
+        self, side: str, lot: float, price: float, bid: float, ask: float, sl: float | None = None, tp: float | None = None
+    ) -> int:
+        """予約注文を出し、チケット番号を返す。"""
+        ticket = self._ticket()
+        market = ask if side == "BUY" else bid
+        limit = price < market if side == "BUY" else price > market
+        order = PendingOrder(ticket, side, lot, price, sl, tp, limit)
+        self.pending[ticket] = order
+        insort(self._pending_list(order), (price, ticket))
+        return ticket
+
+    def cancel_pending(self, ticket: int) -> bool:
+        """予約注文を取り消す。該当が無ければ False。"""
+        order = self.pending.pop(ticket, None)
+        if order is None:
+            return False
+        orders = self._pending_list(order)
+        del orders[bisect_left(orders, (order.price, ticket))]
+        return True
+
+    def modify(self, ticket: int, sl: float | None = None, tp: float | None = None) -> bool:
+        """建玉または予約注文の SL/TP を変更する。該当が無ければ False。"""
+        order = self.pending.get(ticket)
+        if order is not None:
+            if sl is not None:
+                order.sl = sl
+            if tp is not None:
+                order.tp = tp
+            return True
+        pos = self.positions.get(ticket)
+        if pos is None:
+            return False
+        if sl is not None:
+            pos.sl = sl
+        if tp is not None:
+            pos.tp = tp
+        pos.version += 1
+        if pos not in self._new:
+            self._push(pos)
+        return True
+
+    def set_trailing(self, ticket: int, start_ratio: float | None) -> bool:
+        """建玉のトレーリングを開始する。該当が無ければ False。
+
+        ``start_ratio`` を省略すると ``cfg.trailing_start_ratio`` を使う。
+        追従幅は ``cfg.trailing_width_points``。
+        """
+        pos = self.positions.get(ticket)
+        if pos is None:
+            return False
+        pos.trailing_start_ratio = self.cfg.trailing_start_ratio if start_ratio is None else start_ratio
+        pos.version += 1  # TP の閾値が変わるのでヒープ上の要素を無効にする
+        if pos not in self._new:
+            self._push(pos)
+        return True
+
+    def close(self, ticket: int, bid: float, ask: float) -> Tuple[str, float] | None:
+        """建玉を現在値で決済し ``("CLOSE", 損益)`` を返す。該当が無ければ None。"""
+        pos = self.positions.get(ticket)
+        if pos is None:
+            return None
+        return "CLOSE", self._close(pos, bid if pos.side == "BUY" else ask)
+
+    def apply(self, actions: Sequence[Action], bid: float, ask: float) -> List[ClosedTrade]:
+        """EAのアクションを適用し、決済された建玉の ``ClosedTrade`` を返す。"""
+        closed: List[ClosedTrade] = []
+        for act in actions:
+            kind = act.type
+            if kind == "OPEN":
+                self.open(act.side, act.lot, bid, ask, act.sl, act.tp)
+            elif kind == "PENDING_OPEN":
+                self.place_pending(act.side, act.lot, act.price, bid, ask, act.sl, act.tp)
+            elif kind == "CLOSE":
+                pos = self.positions.get(act.ticket)
+                res = self.close(act.ticket, bid, ask)
+                if res is not None:
+                    closed.append(_closed_trade(pos, *res))
+            elif kind == "MODIFY":
+                self.modify(act.ticket, act.sl, act.tp)
+            elif kind == "CANCEL_PENDING":
+                self.cancel_pending(act.ticket)
+            elif kind == "SET_TRAILING":
+                self.set_trailing(act.ticket, act.start_ratio)
+        return closed
+
+    # --- バーごとの処理 ------------------------------------------------
+
+    def step(self, bid: Sequence[float], ask: Sequence[float]) -> List[ClosedTrade]:
+        """1本のバー (4本のティック) で SL/TP 到達と予約注文の約定を処理する。
+
+        決済された建玉の ``ClosedTrade`` をチケット順に返す。
+        このバーで約定した建玉は次のバーから判定対象になる。
+        """
+        closed: List[ClosedTrade] = []
+        if self.positions:
+            bid_high, bid_low = max(bid), min(bid)
+            ask_high, ask_low = max(ask), min(ask)
+            hits = set()
+            self._collect(self._buy_sl, -bid_low, hits)
+            self._collect(self._buy_tp, bid_high, hits)
+            self._collect(self._sell_sl, ask_high, hits)
+            self._collect(self._sell_tp, -ask_low, hits)
+            for ticket in sorted(hits):
+                pos = self.positions[ticket]
+                ticks = bid if pos.side == "BUY" else ask
+                if pos.trailing_start_ratio is None:
+                    result = resolve_hit(pos.side, max(ticks), min(ticks), pos.sl, pos.tp, ticks[0] < ticks[-1])
+                else:
+                    result, pos.sl, pos.best_price = resolve_hit_trailing(
+                        pos.side, ticks, pos.sl, pos.tp, pos.best_price, pos.open_price, self._activation(pos),
+                        self._trail_width,
+                    )
+                    if not result:
+                        pos.version += 1
+                        self._push(pos)
+                        continue
+                closed.append(_closed_trade(pos, result, self._close(pos, pos.sl if result == "SL" else pos.tp)))
+        if self.pending:
+            self._trigger(bid, ask)
+        for pos in self._new:
+            if pos.ticket in self.positions:
+                self._push(pos)
+        self._new.clear()
+        if sum(map(len, (self._buy_sl, self._buy_tp, self._sell_sl, self._sell_tp))) > self._compact_at:
+            self._compact()
+        return closed
+
+    def settle(self, closed: Iterable[ClosedTrade], state: RunState, ts: int, history: List[dict]) -> None:
+        """決済結果を ``RunState`` と取引履歴に反映する。"""
+        for ticket, result, profit, open_time, side, lot in closed:
+            state.update_after_trade(profit, self.cfg)
+            history.append(
+                {
+                    "time": pd.Timestamp(ts),
+                    "result": result,
+                    "ticket": ticket,
+                    "entry_time": pd.Timestamp(open_time),
+                    "side": side,
+                    "lot": lot,
+                    "profit": profit,
+                }
+            )
+
+    # --- 内部処理 ------------------------------------------------------
+
+    def _fill(
+        self, ticket: int, side: str, lot: float, entry: float, spread: float, sl: float | None, tp: float | None
+    ) -> int:
+        default_sl, default_tp = initial_stops(side, entry, spread, self.cfg)
+        pos = Position(
+            ticket, side, lot, entry, default_sl if sl is None else sl, default_tp if tp is None else tp, self.time
+        )
+        self.positions[ticket] = pos
+        self._new.append(pos)
+        if self.cfg.enable_trailing_stop:
+            pos.trailing_start_ratio = self.cfg.trailing_start_ratio
+        return ticket
+
+    def _activation(self, pos: Position) -> float:
+        cfg = self.cfg
+        return trailing_activation(pos.trailing_start_ratio, cfg.rr, cfg.stoploss_points, cfg.point)
+
+    def _push(self, pos: Position) -> None:
+        tp = pos.tp
+        if pos.trailing_start_ratio is not None:
+            # SLを動かし得る価格 (発動価格と最有利価格の先) に届くバーでも取り出す
+            _, tp = trailing_bounds(pos.side, pos.sl, pos.tp, pos.best_price, pos.open_price, self._activation(pos))
+        if pos.side == "BUY":
+            heapq.heappush(self._buy_sl, (-pos.sl, pos.ticket, pos.version))
+            heapq.heappush(self._buy_tp, (tp, pos.ticket, pos.version))
+        else:
+            heapq.heappush(self._sell_sl, (pos.sl, pos.ticket, pos.version))
+            heapq.heappush(self._sell_tp, (-tp, pos.ticket, pos.version))
+
+    def _compact(self) -> None:
+        """読み捨てられずに残った古い要素をヒープから取り除く。"""
+        for heap in (self._buy_sl, self._buy_tp, self._sell_sl, self._sell_tp):
+            heap[:] = [e for e in heap if (pos := self.positions.get(e[1])) is not None and pos.version == e[2]]
+            heapq.heapify(heap)
+        self._compact_at = max(_COMPACT_MIN, 4 * len(self.positions))
+
+    def _collect(self, heap: List[Tuple[float, int, int]], limit: float, hits: set) -> None:
+        """キーが ``limit`` 以下の有効な要素をヒープから取り出す。"""
+        while heap:
+            key, ticket, version = heap[0]
+            pos = self.positions.get(ticket)
+            if pos is None or pos.version != version:
+                heapq.heappop(heap)
+                continue
+            if key > limit:
+                return
+            heapq.heappop(heap)
+            hits.add(ticket)
+
+    def _close(self, pos: Position, price: float) -> float:
+        del self.positions[pos.ticket]
+        pos.version += 1
+        sign = 1 if pos.side == "BUY" else -1
+        points = (price - pos.open_price) / self.cfg.point * sign
+        return points * self._vpp * pos.lot
+
+    def _pending_list(self, order: PendingOrder) -> List[Tuple[float, int]]:
+        if order.side == "BUY":
+            return self._buy_limit if order.limit else self._buy_stop
+        return self._sell_limit if order.limit else self._sell_stop
+
+    def _trigger(self, bid: Sequence[float], ask: Sequence[float]) -> None:
+        ask_low, ask_high = min(ask), max(ask)
+        bid_low, bid_high = min(bid), max(bid)
+        spread = ask[0] - bid[0]
+        filled: List[Tuple[int, float]] = []
+        # 指値は価格より有利な側、逆指値は不利な側に届いたら約定する。
+        # 始値の時点で既に越えていれば始値で約定する。
+        start = bisect_left(self._buy_limit, (ask_low, -_INF))
+        filled += [(t, min(p, ask[0])) for p, t in self._buy_limit[start:]]
+        del self._buy_limit[start:]
+        stop = bisect_right(self._buy_stop, (ask_high, _INF))
+        filled += [(t, max(p, ask[0])) for p, t in self._buy_stop[:stop]]
+        del self._buy_stop[:stop]
+        stop = bisect_right(self._sell_limit, (bid_high, _INF))
+        filled += [(t, max(p, bid[0])) for p, t in self._sell_limit[:stop]]
+        del self._sell_limit[:stop]
+        start = bisect_left(self._sell_stop, (bid_low, -_INF))
+        filled += [(t, min(p, bid[0])) for p, t in self._sell_stop[start:]]
+        del self._sell_stop[start:]
+        for ticket, price in sorted(filled):
+            order = self.pending.pop(ticket)
+            self._fill(ticket, order.side, order.lot, price, spread, order.sl, order.tp)
+
+
+def _closed_trade(pos: Position, result: str, profit: float) -> ClosedTrade:
+    return pos.ticket, result, profit, pos.open_time, pos.side, pos.lot
+
+
+class OrderBookView:
+    """EAに渡す注文エンジンの読み取り専用ビュー。``ctx.orders`` として参照する。"""
+
+    __slots__ = ("_book", "positions", "pending")
+
+    def __init__(self, book: OrderBook) -> None:
+        self._book = book
+        self.positions = MappingProxyType(book.positions)
+        self.pending = MappingProxyType(book.pending)
+
+    @property
+    def next_ticket(self) -> int:
+        """次の OPEN/PENDING_OPEN に割り当てられるチケット番号。"""
+        return self._book.next_ticket
+
+
+def uses_order_book(ea: Any) -> bool:
+    """EAが ``ORDER_BOOK = True`` を宣言していれば True。"""
+    return bool(getattr(ea, "ORDER_BOOK", False))
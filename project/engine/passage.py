@@ -0,0 +1,62 @@
+"""建玉のSL/TPに最初に届くバーを範囲最大・最小の階層から求める。"""
+from __future__ import annotations
+
+from typing import List
+
+import numpy as np
+
+
+def _pyramid(values: np.ndarray, reduce: np.ufunc, pad: float) -> List[np.ndarray]:
+    """隣り合う2ブロックをまとめた集約値を段ごとに並べる (段 ``l`` はブロック幅 ``2**l``)。"""
+    levels = [np.ascontiguousarray(values, dtype=np.float64)]
+    while levels[-1].shape[0] > 1:
+        prev = levels[-1]
+        if prev.shape[0] % 2:
+            prev = np.r_[prev, pad]
+        levels.append(reduce(prev[0::2], prev[1::2]))
+    return levels
+
+
+class PassageIndex:
+    """区間内の各バーの高値・安値から、価格が閾値を最初に越えるバーを探す索引。
+
+    ``bid``/``ask`` は ``(N, 4)`` のティック行列。``bar_sim.simulate_bar`` と同じく
+    BUY はBid、SELL はAskの4本の最大・最小で判定する。各段はブロック幅
+    ``2**l`` の最大・最小を持ち、合計でバー数の約2倍の大きさになる。
+    1回の検索は O(log N) で、閾値に届かないバーは調べずに飛ばす。
+    """
+
+    def __init__(self, bid: np.ndarray, ask: np.ndarray) -> None:
+        self.n = int(bid.shape[0])
+        self._high = {"BUY": _pyramid(bid.max(axis=1), np.maximum, -np.inf)}
+        self._low = {"BUY": _pyramid(bid.min(axis=1), np.minimum, np.inf)}
+        if ask is bid:
+            self._high["SELL"] = self._high["BUY"]
+            self._low["SELL"] = self._low["BUY"]
+        else:
+            self._high["SELL"] = _pyramid(ask.max(axis=1), np.maximum, -np.inf)
+            self._low["SELL"] = _pyramid(ask.min(axis=1), np.minimum, np.inf)
+
+    def first_hit(self, side: str, start: int, sl: float, tp: float) -> int:
+        """``start`` 本目以降で SL か TP に届く最初のバー。無ければ ``n`` を返す。
+
+        BUY は高値が TP 以上または安値が SL 以下、SELL は安値が TP 以下または
+        高値が SL 以上のバーが対象で、``resolve_hit`` が結果を返す条件と同じ。
+        """
+        upper, lower = (tp, sl) if side == "BUY" else (sl, tp)
+        highs = self._high[side]
+        lows = self._low[side]
+        top = len(highs) - 1
+        pos = start
+        level = 0
+        while pos < self.n:
+            block = pos >> level
+            if highs[level][block] < upper and lows[level][block] > lower:
+                pos += 1 << level
+                while level < top and not (pos >> level) & 1:
+                    level += 1
+            elif level == 0:
+                return pos
+            else:
+                level -= 1
+        return self.n
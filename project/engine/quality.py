@@ -0,0 +1,181 @@
+"""1分足データの品質チェックと、キャッシュされるバーマスク。"""
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+
+from .config import Config
+from .costs import to_local_ns
+from .data_cache import NS_PER_MINUTE, OHLCArrays, cache_dir_for, load_ohlc, read_cache_meta
+
+MASK_NAMES = ("session", "gap_after", "bad")
+MINUTES_PER_DAY = 1440
+SPIKE_FACTOR = 20.0
+
+
+@dataclass
+class QualityReport:
+    """品質チェックの集計結果。"""
+
+    rows: int
+    duplicates: int
+    out_of_order: int
+    gaps: int
+    missing_minutes: int
+    max_gap_minutes: int
+    zero_range: int
+    invalid_ohlc: int
+    spikes: int
+    weekend_bars: int
+    bad_bars: int
+
+    def to_dict(self) -> Dict[str, int]:
+        """辞書へ変換する。"""
+        return asdict(self)
+
+
+def weekday_of(time: np.ndarray, cfg: Config | None = None) -> np.ndarray:
+    """エポック分から曜日 (月曜=0) を返す。1970-01-01 は木曜日。
+
+    ``cfg`` を渡すと ``costs.to_local_ns`` と同じく ``cfg.timezone`` の壁時計で数える。
+    """
+    if cfg is not None:
+        time = to_local_ns(np.asarray(time, dtype=np.int64) * NS_PER_MINUTE, cfg) // NS_PER_MINUTE
+    return (time // MINUTES_PER_DAY + 3) % 7
+
+
+def _session_key(cfg: Config | None) -> str:
+    """保存したマスクを作った時の曜日の基準。"""
+    return "UTC" if cfg is None else f"{cfg.timezone}/dst={cfg.dst}"
+
+
+def scan_quality(
+    arrays: OHLCArrays, out_of_order: int = 0, spike_factor: float = SPIKE_FACTOR, cfg: Config | None = None
+) -> Tuple[QualityReport, Dict[str, np.ndarray]]:
+    """時刻順に並んだ配列を1回ずつ走査して品質レポートとマスクを返す。
+
+    マスクは次の3種類で、いずれもバー数と同じ長さの bool 配列。
+
+    - ``session``: 土日以外のバー (``cfg`` を渡すと ``cfg.timezone`` の曜日、省略時はUTC)
+    - ``gap_after``: 次のバーまでに1分以上の欠損があるバー
+    - ``bad``: 重複時刻・OHLC不整合・スパイクのいずれかに該当するバー
+
+    スパイクは終値の変化幅または高安の幅が、それぞれの中央値の
+    ``spike_factor`` 倍を超えるバーとする。値幅0のバーは集計のみ行う。
+    """
+    time = np.asarray(arrays.time, dtype=np.int64)
+    open_, high, low, close = (np.asarray(getattr(arrays, c)) for c in ("open", "high", "low", "close"))
+    n = time.shape[0]
+
+    step = np.diff(time)
+    duplicate = np.zeros(n, dtype=bool)
+    duplicate[1:] = step == 0
+    gap_after = np.zeros(n, dtype=bool)
+    gap_after[:-1] = step > 1
+    missing = step[step > 1] - 1
+
+    bar_range = high - low
+    zero_range = bar_range == 0
+    invalid = (high < np.maximum(open_, close)) | (low > np.minimum(open_, close)) | (bar_range < 0)
+
+    jump = np.abs(np.diff(close, prepend=close[:1]))
+    spike = np.zeros(n, dtype=bool)
+    if n > 1:
+        jump_med = np.median(jump[1:])
+        range_med = np.median(bar_range)
+        if jump_med > 0:
+            spike |= jump > spike_factor * jump_med
+        if range_med > 0:
+            spike |= bar_range > spike_factor * range_med
+
+    session = weekday_of(time, cfg) < 5
+    bad = duplicate | invalid | spike
+    report = QualityReport(
+        rows=int(n),
+        duplicates=int(np.count_nonzero(duplicate)),
+        out_of_order=int(out_of_order),
+        gaps=int(missing.shape[0]),
+        missing_minutes=int(missing.sum()),
+        max_gap_minutes=int(missing.max()) if missing.shape[0] else 0,
+        zero_range=int(np.count_nonzero(zero_range)),
+        invalid_ohlc=int(np.count_nonzero(invalid)),
+        spikes=int(np.count_nonzero(spike)),
+        weekend_bars=int(n - np.count_nonzero(session)),
+        bad_bars=int(np.count_nonzero(bad)),
+    )
+    return report, {"session": session, "gap_after": gap_after, "bad": bad}
+
+
+def _save_atomic(path: Path, array: np.ndarray) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as fh:
+        np.save(fh, array)
+    os.replace(tmp, path)
+
+
+def load_or_scan_quality(
+    csv_path: str | Path,
+    cache_root: str | Path | None = None,
+    spike_factor: float = SPIKE_FACTOR,
+    cfg: Config | None = None,
+) -> Tuple[QualityReport, Dict[str, np.ndarray]]:
+    """OHLCキャッシュと同じエントリに保存された品質結果を読み込む。
+
+    未計算または条件 (スパイク倍率、``session`` の曜日を数えるタイムゾーン) が
+    異なる場合は計算して保存する。キャッシュが再作成される
+    とエントリごと削除されるため、古いマスクが使われることはない。
+    """
+    arrays = load_ohlc(csv_path, cache_root)
+    entry = cache_dir_for(csv_path, cache_root)
+    report_path = entry / "quality.json"
+    try:
+        saved = json.loads(report_path.read_text(encoding="utf-8"))
+        if (
+            saved["spike_factor"] == spike_factor
+            and saved.get("session") == _session_key(cfg)
+            and saved["report"]["rows"] == len(arrays)
+        ):
+            masks = {name: np.load(entry / f"{name}.npy", mmap_mode="r") for name in MASK_NAMES}
+            return QualityReport(**saved["report"]), masks
+    except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+        pass
+
+    meta = read_cache_meta(entry) or {}
+    report, masks = scan_quality(arrays, meta.get("out_of_order", 0), spike_factor, cfg)
+    for name, mask in masks.items():
+        _save_atomic(entry / f"{name}.npy", mask)
+    tmp = report_path.with_name(f".quality.json.{os.getpid()}.tmp")
+    tmp.write_text(
+        json.dumps(
+            {"spike_factor": spike_factor, "session": _session_key(cfg), "report": report.to_dict()}, ensure_ascii=False
+        ),
+        encoding="utf-8",
+    )
+    os.replace(tmp, report_path)
+    return report, masks
+
+
+def select_good_bars(arrays: OHLCArrays, masks: Dict[str, np.ndarray]) -> OHLCArrays:
+    """``bad`` でなく取引時間内のバーだけを残した配列を返す。"""
+    keep = np.asarray(masks["session"]) & ~np.asarray(masks["bad"])
+    return OHLCArrays(
+        time=arrays.time[keep],
+        open=arrays.open[keep],
+        high=arrays.high[keep],
+        low=arrays.low[keep],
+        close=arrays.close[keep],
+    )
+
+
+def mask_flags(masks: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """マスクをEAに渡すフラグ列 (``bad_bar``/``off_session``/``gap_after``) に変換する。"""
+    return {
+        "bad_bar": np.asarray(masks["bad"]),
+        "off_session": ~np.asarray(masks["session"]),
+        "gap_after": np.asarray(masks["gap_after"]),
+    }
@@ -0,0 +1,310 @@
+"""取引履歴とラン集計を列指向・パーティション分割で保存するストア。
+
+複数のプロセスが同じストアへ同時に追記できるよう、共有ファイルは書き換えない。
+パーティションはライターごとに一意な名前で作り、列構成とパーティション一覧は
+ライターごとのマニフェスト (``manifest/<ライターID>.json``) に記録する。
+読み出し時に全マニフェストをまとめて1つのスキーマとして扱う。
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+SCHEMA_FILENAME = "schema.json"
+MANIFEST_DIR = "manifest"
+COMPACT_LOCK = ".compact.lock"
+STORE_VERSION = 2
+DEFAULT_BATCH_ROWS = 1_000_000
+TRADES_TABLE = "trades"
+RUNS_TABLE = "runs"
+PARAM_PREFIX = "param_"
+TIME_COLUMNS = ("time", "entry_time")
+NO_TICKET = -1  # 単一ポジションの取引履歴にはチケット番号が無い
+
+
+def _column_kind(array: np.ndarray) -> str:
+    """列の型をスキーマ上の表記に変換する。文字列は幅によらず ``str`` とする。"""
+    if array.dtype.kind in "US":
+        return "str"
+    return array.dtype.str
+
+
+def _as_column(values: Any, n: int) -> np.ndarray:
+    """配列またはスカラーを長さ ``n`` の列に変換する。"""
+    if np.isscalar(values):
+        return np.full(n, values)
+    array = np.asarray(values)
+    if array.dtype.kind == "O":
+        array = array.astype(str)
+    if array.shape != (n,):
+        raise ValueError(f"column length {array.shape} does not match {n}")
+    return array
+
+
+def _save_atomic(path: Path, columns: Mapping[str, np.ndarray]) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as fh:
+        np.savez(fh, **columns)
+    os.replace(tmp, path)
+
+
+def _write_json_atomic(path: Path, data: Mapping[str, Any]) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _new_writer_id() -> str:
+    """作成時刻順に並ぶ一意なライターID。"""
+    return f"{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class ResultsWriter:
+    """テーブルごとに行を溜め、``batch_rows`` 行に達するたびに1ファイルへ書き出す。
+
+    各パーティションは列ごとの配列を格納した ``.npz`` で、名前にライターIDを含む。
+    このライターが書いたパーティションと列構成は自分のマニフェストだけに記録するため、
+    別プロセスのライターと同時に同じストアへ追記できる。テーブルの列構成は
+    ストアで最初に書き込んだ時点で固定され、以降の追記で列が異なるとエラーになる。
+    """
+
+    def __init__(self, root: str | Path, batch_rows: int = DEFAULT_BATCH_ROWS) -> None:
+        self.root = Path(root)
+        (self.root / MANIFEST_DIR).mkdir(parents=True, exist_ok=True)
+        _init_store(self.root)
+        self.batch_rows = batch_rows
+        self.schema = _read_schema(self.root)
+        self.writer_id = _new_writer_id()
+        self.replaces: List[str] = []
+        self._manifest: Dict[str, Dict[str, Any]] = {}
+        self._pending: Dict[str, List[Dict[str, np.ndarray]]] = {}
+        self._pending_rows: Dict[str, int] = {}
+        self._parts = 0
+
+    def append(self, table: str, columns: Mapping[str, Any], **constants: Any) -> None:
+        """列の辞書で行を追加する。``constants`` は全行に同じ値を入れる列。"""
+        lengths = {len(v) for v in columns.values() if not np.isscalar(v)}
+        if len(lengths) > 1:
+            raise ValueError(f"columns have different lengths: {sorted(lengths)}")
+        n = lengths.pop() if lengths else 1
+        if n == 0:
+            return
+        batch = {name: _as_column(values, n) for name, values in {**constants, **columns}.items()}
+        kinds = {name: _column_kind(array) for name, array in batch.items()}
+        known = self.schema["tables"].get(table)
+        if known is None:
+            self.schema["tables"][table] = {"columns": kinds, "parts": [], "rows": 0}
+        elif list(known["columns"]) != list(kinds):
+            raise ValueError(f"columns of table '{table}' changed: {list(known['columns'])} -> {list(kinds)}")
+        self._pending.setdefault(table, []).append(batch)
+        self._pending_rows[table] = self._pending_rows.get(table, 0) + n
+        if self._pending_rows[table] >= self.batch_rows:
+            self.flush(table)
+
+    def append_trades(
+        self,
+        run_id: str,
+        history: Sequence[Mapping[str, Any]],
+        params: Mapping[str, Any] | None = None,
+        columns: Mapping[str, Any] | None = None,
+    ) -> None:
+        """``cpu_tester`` 形式の取引履歴を追加する。
+
+        履歴の全項目 (``time``/``result``/``entry_time``/``side``/``lot``/``profit``) と
+        ``ticket`` を列にする。チケット番号の無い単一ポジションの履歴では ``ticket`` を
+        ``NO_TICKET`` とし、どちらの履歴も同じテーブルに追記できるようにする。
+        ``columns`` には取引と同じ長さの追加列 (手数料や残高など) を渡せる。
+        """
+        if not history:
+            return
+        trades = {
+            "time": pd.DatetimeIndex([rec["time"] for rec in history]).asi8,
+            "result": np.array([rec["result"] for rec in history], dtype=str),
+            "ticket": np.array([rec.get("ticket", NO_TICKET) for rec in history], dtype=np.int64),
+            "entry_time": pd.DatetimeIndex([rec["entry_time"] for rec in history]).asi8,
+            "side": np.array([rec["side"] for rec in history], dtype=str),
+            "lot": np.array([rec["lot"] for rec in history], dtype=np.float64),
+            "profit": np.array([rec["profit"] for rec in history], dtype=np.float64),
+        }
+        self.append(TRADES_TABLE, {**trades, **(columns or {})}, run_id=run_id, **_param_columns(params))
+
+    def append_run(self, run_id: str, metrics: Mapping[str, Any], params: Mapping[str, Any] | None = None) -> None:
+        """1ラン分の集計値を追加する。"""
+        self.append(RUNS_TABLE, {}, run_id=run_id, **_param_columns(params), **metrics)
+
+    def flush(self, table: str | None = None) -> None:
+        """溜まっている行をパーティションとして書き出す。"""
+        for name in [table] if table else list(self._pending):
+            batches = self._pending.pop(name, [])
+            rows = self._pending_rows.pop(name, 0)
+            if not batches:
+                continue
+            columns = {col: np.concatenate([b[col] for b in batches]) for col in batches[0]}
+            part = {"file": f"{name}/part-{self.writer_id}-{self._parts:05d}.npz", "rows": rows}
+            self._parts += 1
+            (self.root / name).mkdir(exist_ok=True)
+            _save_atomic(self.root / part["file"], columns)
+            spec = self.schema["tables"][name]
+            spec["parts"].append(part)
+            spec["rows"] += rows
+            own = self._manifest.setdefault(name, {"columns": spec["columns"], "parts": [], "rows": 0})
+            own["parts"].append(part)
+            own["rows"] += rows
+            # まとめ直しの結果は元のマニフェストと二重に読まれないよう、閉じる時に一度だけ書く
+            if not self.replaces:
+                self._write_manifest(closed=False)
+
+    def close(self) -> None:
+        """残りの行を書き出し、マニフェストを書き込み済みとして閉じる。"""
+        self.flush()
+        if self._manifest or self.replaces:
+            self._write_manifest(closed=True)
+
+    def _write_manifest(self, closed: bool) -> None:
+        manifest = {"closed": closed, "replaces": self.replaces, "tables": self._manifest}
+        _write_json_atomic(self.root / MANIFEST_DIR / f"{self.writer_id}.json", manifest)
+
+    def __enter__(self) -> "ResultsWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def compact(root: str | Path, min_manifests: int = 2, batch_rows: int = DEFAULT_BATCH_ROWS) -> int:
+    """閉じたマニフェストが ``min_manifests`` 個以上あれば、その行を大きなパーティションへまとめ直す。
+
+    まとめた結果は新しいマニフェストとして書き、元のマニフェストは ``replaces`` に
+    記録してから削除するため、追記中のライターや読み出しと同時に実行できる。
+    別のプロセスがまとめ直している間は何もしない。まとめたマニフェストの数を返す。
+    まとめ直しの前に開いた ``ResultsStore`` は、削除されたパーティションを読めなくなる。
+    """
+    root = Path(root)
+    lock = root / COMPACT_LOCK
+    try:
+        fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return 0
+    try:
+        manifests = [(writer_id, m) for writer_id, m in _read_manifests(root) if m.get("closed")]
+        if len(manifests) < max(min_manifests, 2):
+            return 0
+        writer = ResultsWriter(root, batch_rows)
+        writer.replaces = [writer_id for writer_id, _ in manifests]
+        for _, manifest in manifests:
+            for table, spec in manifest["tables"].items():
+                for part in spec["parts"]:
+                    with np.load(root / part["file"]) as data:
+                        writer.append(table, {name: data[name] for name in spec["columns"]})
+        writer.close()
+        for writer_id, manifest in manifests:
+            (root / MANIFEST_DIR / f"{writer_id}.json").unlink(missing_ok=True)
+            for spec in manifest["tables"].values():
+                for part in spec["parts"]:
+                    (root / part["file"]).unlink(missing_ok=True)
+        return len(manifests)
+    finally:
+        os.close(fd)
+        lock.unlink(missing_ok=True)
+
+
+def _param_columns(params: Mapping[str, Any] | None) -> Dict[str, Any]:
+    return {f"{PARAM_PREFIX}{k}": v for k, v in (params or {}).items()}
+
+
+def _init_store(root: Path) -> None:
+    """``schema.json`` (ストアの版) が無ければ作る。内容は変わらないので同時に作っても良い。"""
+    if not (root / SCHEMA_FILENAME).exists():
+        _write_json_atomic(root / SCHEMA_FILENAME, {"version": STORE_VERSION})
+
+
+def _read_manifests(root: Path) -> List[Tuple[str, Dict[str, Any]]]:
+    """有効なマニフェストを ``(ライターID, 内容)`` の作成順で返す。
+
+    まとめ直しで置き換えられたものは除く。読んでいる間に削除されたマニフェストが
+    あれば、置き換え後のマニフェストを取りこぼさないよう一覧から読み直す。
+    """
+    while True:
+        paths = sorted((root / MANIFEST_DIR).glob("*.json"))
+        try:
+            manifests = [(p.stem, json.loads(p.read_text(encoding="utf-8"))) for p in paths]
+        except FileNotFoundError:
+            continue
+        replaced = {writer_id for _, m in manifests for writer_id in m.get("replaces", [])}
+        return [(writer_id, m) for writer_id, m in manifests if writer_id not in replaced]
+
+
+def _read_schema(root: Path) -> Dict[str, Any]:
+    """全マニフェストをまとめたスキーマ (テーブルごとの列・パーティション・行数)。"""
+    try:
+        version = json.loads((root / SCHEMA_FILENAME).read_text(encoding="utf-8")).get("version")
+    except FileNotFoundError:
+        version = STORE_VERSION
+    if version != STORE_VERSION:
+        raise ValueError(f"unsupported results store version: {version}")
+    tables: Dict[str, Dict[str, Any]] = {}
+    for _, manifest in _read_manifests(root) if (root / MANIFEST_DIR).is_dir() else []:
+        for name, spec in manifest["tables"].items():
+            merged = tables.setdefault(name, {"columns": spec["columns"], "parts": [], "rows": 0})
+            if list(merged["columns"]) != list(spec["columns"]):
+                raise ValueError(f"columns of table '{name}' differ between writers")
+            merged["parts"].extend(spec["parts"])
+            merged["rows"] += spec["rows"]
+    return {"version": STORE_VERSION, "tables": tables}
+
+
+class ResultsStore:
+    """``ResultsWriter`` で作成したストアの読み出し。
+
+    ``.npz`` は列ごとに読み込まれるため、指定した列だけを走査できる。
+    """
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+        self.schema = _read_schema(self.root)
+
+    def tables(self) -> List[str]:
+        """テーブル名の一覧。"""
+        return list(self.schema["tables"])
+
+    def columns(self, table: str) -> Dict[str, str]:
+        """列名と型の辞書。"""
+        return dict(self.schema["tables"][table]["columns"])
+
+    def rows(self, table: str) -> int:
+        """書き込み済みの行数。"""
+        return int(self.schema["tables"][table]["rows"])
+
+    def iter_parts(self, table: str, columns: Iterable[str] | None = None) -> Iterator[Dict[str, np.ndarray]]:
+        """パーティションごとに指定列の配列を返す。"""
+        names = list(columns) if columns is not None else list(self.columns(table))
+        unknown = set(names) - set(self.columns(table))
+        if unknown:
+            raise KeyError(f"unknown columns for table '{table}': {sorted(unknown)}")
+        for part in self.schema["tables"][table]["parts"]:
+            with np.load(self.root / part["file"]) as data:
+                yield {name: data[name] for name in names}
+
+    def read(self, table: str, columns: Iterable[str] | None = None) -> Dict[str, np.ndarray]:
+        """全パーティションを連結した列の辞書を返す。"""
+        names = list(columns) if columns is not None else list(self.columns(table))
+        parts = list(self.iter_parts(table, names))
+        if not parts:
+            return {name: np.empty(0) for name in names}
+        return {name: np.concatenate([p[name] for p in parts]) for name in names}
+
+    def to_frame(self, table: str, columns: Iterable[str] | None = None) -> pd.DataFrame:
+        """DataFrameとして読み込む。取引テーブルの ``time``/``entry_time`` は日時に変換する。"""
+        frame = pd.DataFrame(self.read(table, columns))
+        if table == TRADES_TABLE:
+            for name in TIME_COLUMNS:
+                if name in frame:
+                    frame[name] = pd.to_datetime(frame[name])
+        return frame
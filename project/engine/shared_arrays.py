@@ -0,0 +1,149 @@
+"""複数プロセスで価格・指標配列を共有するための共有メモリ管理。"""
+from __future__ import annotations
+
+import multiprocessing as mp
+import secrets
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.util import Finalize
+from typing import Any, Dict, Iterator, Mapping
+
+import numpy as np
+
+from .data_cache import PRICE_COLUMNS, OHLCArrays
+
+
+def _attach_segment(name: str) -> shared_memory.SharedMemory:
+    """既存セグメントへ接続し、``resource_tracker`` への登録を取り消す。
+
+    接続側の登録が残ると、ワーカー終了時に作成元より先にセグメントが
+    削除されてしまう。Python 3.11 には ``track=False`` が無いため、通常どおり
+    接続してから登録だけを外す。
+    """
+    seg = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(seg._name, "shared_memory")  # type: ignore[attr-defined]
+    return seg
+
+
+def _unlink_segment(seg: shared_memory.SharedMemory) -> None:
+    """セグメントを削除する。
+
+    ``resource_tracker`` はプロセス間で共有されるため、接続時の登録取り消しで
+    作成元の登録も外れていることがある。``unlink`` が登録の取り消しを伴うので、
+    その前に登録し直して対応を揃える。
+    """
+    resource_tracker.register(seg._name, "shared_memory")  # type: ignore[attr-defined]
+    seg.unlink()
+
+
+class SharedArrays(Mapping[str, np.ndarray]):
+    """名前付き共有メモリに公開したNumPy配列の集合。
+
+    ``publish`` で作成したプロセスが配列を1度だけコピーし、ワーカーは
+    ``attach(manifest)`` でコピーなしの読み取り専用ビューを得る。
+    セグメントは作成したプロセスの ``close`` で必ず削除する。ワーカーを
+    join してから閉じれば安全で、``close`` せずに終了したワーカーがいても
+    ``/dev/shm`` に残らない。接続済みのワーカーのビューは削除後も有効。
+    共有メモリ上の参照数は診断用で、削除の判断には使わない。
+    ``manifest`` にはロックが含まれるため、ワーカーへは ``Pool`` の
+    ``initargs`` やプロセス引数で渡すこと。
+    """
+
+    def __init__(
+        self,
+        manifest: Dict[str, Any],
+        segments: Dict[str, shared_memory.SharedMemory],
+        refs: shared_memory.SharedMemory,
+        owner: bool = False,
+    ) -> None:
+        self.manifest = manifest
+        self.owner = owner
+        self._segments = segments
+        self._refs = refs
+        self._counter = np.ndarray((1,), dtype=np.int64, buffer=refs.buf)
+        self._views: Dict[str, np.ndarray] = {}
+        for name, spec in manifest["arrays"].items():
+            view = np.ndarray(tuple(spec["shape"]), dtype=np.dtype(spec["dtype"]), buffer=segments[name].buf)
+            view.flags.writeable = False
+            self._views[name] = view
+        self._closed = False
+        self._finalizer = Finalize(self, self.close, exitpriority=10)
+
+    @classmethod
+    def publish(cls, arrays: Mapping[str, np.ndarray], prefix: str | None = None) -> "SharedArrays":
+        """配列を共有メモリへコピーして公開する。"""
+        prefix = prefix or f"bt_{secrets.token_hex(4)}"
+        segments: Dict[str, shared_memory.SharedMemory] = {}
+        specs: Dict[str, Dict[str, Any]] = {}
+        try:
+            for name, array in arrays.items():
+                src = np.ascontiguousarray(array)
+                seg = shared_memory.SharedMemory(name=f"{prefix}_{name}", create=True, size=max(src.nbytes, 1))
+                np.ndarray(src.shape, dtype=src.dtype, buffer=seg.buf)[...] = src
+                segments[name] = seg
+                specs[name] = {"segment": seg.name, "shape": list(src.shape), "dtype": src.dtype.str}
+            refs = shared_memory.SharedMemory(name=f"{prefix}__refs", create=True, size=8)
+        except BaseException:
+            for seg in segments.values():
+                seg.close()
+                seg.unlink()
+            raise
+        np.ndarray((1,), dtype=np.int64, buffer=refs.buf)[0] = 1
+        manifest = {"refs": refs.name, "lock": mp.Lock(), "arrays": specs}
+        return cls(manifest, segments, refs, owner=True)
+
+    @classmethod
+    def attach(cls, manifest: Dict[str, Any]) -> "SharedArrays":
+        """公開済みの配列へ接続し、参照数を1増やす。"""
+        with manifest["lock"]:
+            refs = _attach_segment(manifest["refs"])
+            segments = {name: _attach_segment(spec["segment"]) for name, spec in manifest["arrays"].items()}
+            np.ndarray((1,), dtype=np.int64, buffer=refs.buf)[0] += 1
+        return cls(manifest, segments, refs)
+
+    @property
+    def refcount(self) -> int:
+        """接続中のプロセス数。``close`` せずに終了したプロセスの分は減らない。"""
+        return int(self._counter[0])
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self._views[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._views)
+
+    def __len__(self) -> int:
+        return len(self._views)
+
+    def ohlc(self) -> OHLCArrays:
+        """``time`` と OHLC 列を ``OHLCArrays`` として返す。"""
+        return OHLCArrays(time=self._views["time"], **{c: self._views[c] for c in PRICE_COLUMNS})
+
+    def close(self) -> None:
+        """接続を解除する。作成したプロセスでは参照数によらずセグメントを削除する。"""
+        if self._closed:
+            return
+        self._closed = True
+        self._views.clear()
+        with self.manifest["lock"]:
+            self._counter[0] -= 1
+            del self._counter
+            for seg in self._segments.values():
+                seg.close()
+                if self.owner:
+                    _unlink_segment(seg)
+            self._refs.close()
+            if self.owner:
+                _unlink_segment(self._refs)
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def ohlc_payload(arrays: OHLCArrays, **extra: np.ndarray) -> Dict[str, np.ndarray]:
+    """``OHLCArrays`` と追加の指標配列を公開用の辞書にまとめる。"""
+    payload = {"time": np.asarray(arrays.time), **{c: np.asarray(getattr(arrays, c)) for c in PRICE_COLUMNS}}
+    payload.update(extra)
+    return payload
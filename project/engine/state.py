@@ -19,6 +19,8 @@ class RunState:
     buy_locked: bool = False
     sell_locked: bool = False
     lot: float | None = None
+    best_price: float | None = None
+    open_time: int | None = None
     balance: float = 0.0
     risk_pct: float = 0.0
     cycle_profit: float = 0.0
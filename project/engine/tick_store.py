@@ -0,0 +1,277 @@
+"""Bid/Askの実ティックを差分符号化・圧縮して保存し、チャンク単位で読み出すストア。"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .data_cache import NS_PER_MINUTE, PRICE_COLUMNS, OHLCArrays
+from .logger import get_logger
+
+STORE_VERSION = 1
+DATA_FILENAME = "ticks.bin"
+META_FILENAME = "meta.json"
+DEFAULT_CHUNK_TICKS = 1_000_000
+
+
+@dataclass(frozen=True)
+class TickChunk:
+    """復号済みのティック列。時刻はエポックナノ秒。"""
+
+    time: np.ndarray
+    bid: np.ndarray
+    ask: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.time.shape[0])
+
+
+def price_scale(point: float) -> float:
+    """価格を整数ポイントへ変換する倍率。``1/point`` が整数に近ければ整数に丸める。"""
+    scale = 1.0 / point
+    return float(round(scale)) if abs(scale - round(scale)) < 1e-6 else scale
+
+
+def _narrow(values: np.ndarray) -> np.ndarray:
+    """値域に収まる最小の符号付き整数型へ変換する。"""
+    if values.size == 0:
+        return values.astype(np.int16)
+    lo, hi = int(values.min()), int(values.max())
+    for dt in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dt)
+        if info.min <= lo and hi <= info.max:
+            return values.astype(dt)
+    return values.astype(np.int64)
+
+
+def _encode_column(values: np.ndarray) -> Tuple[int, bytes, str]:
+    """先頭値と、差分を最小幅の整数で圧縮したバイト列を返す。"""
+    first = int(values[0])
+    delta = _narrow(np.diff(values))
+    return first, zlib.compress(delta.tobytes(), 6), delta.dtype.str
+
+
+def _decode_column(first: int, payload: bytes, dtype: str, n: int) -> np.ndarray:
+    delta = np.frombuffer(zlib.decompress(payload), dtype=np.dtype(dtype))
+    out = np.empty(n, dtype=np.int64)
+    out[0] = first
+    np.cumsum(delta, dtype=np.int64, out=out[1:])
+    out[1:] += first
+    return out
+
+
+class TickStoreWriter:
+    """ティックを追記してチャンクごとに圧縮書き込みする。
+
+    価格は ``point`` 単位の整数に丸めて保存するため、``point`` には
+    データの最小刻み以下の値 (``0.001`` など 1/整数 の値) を指定する。
+    """
+
+    def __init__(self, path: str | Path, point: float, chunk_ticks: int = DEFAULT_CHUNK_TICKS) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.point = point
+        self.scale = price_scale(point)
+        self.chunk_ticks = chunk_ticks
+        self._fh = open(self.path / DATA_FILENAME, "wb")
+        self._chunks: List[Dict[str, Any]] = []
+        self._pending: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self._pending_n = 0
+        self._last_time: int | None = None
+
+    def append(self, time_ns: np.ndarray, bid: np.ndarray, ask: np.ndarray) -> None:
+        """時刻順に並んだティックを追加する。"""
+        time_ns = np.asarray(time_ns, dtype=np.int64)
+        if time_ns.size == 0:
+            return
+        if np.any(np.diff(time_ns) < 0) or (self._last_time is not None and time_ns[0] < self._last_time):
+            raise ValueError("ticks must be appended in time order")
+        self._last_time = int(time_ns[-1])
+        bid_pts = np.rint(np.asarray(bid, dtype=np.float64) * self.scale).astype(np.int64)
+        ask_pts = np.rint(np.asarray(ask, dtype=np.float64) * self.scale).astype(np.int64)
+        self._pending.append((time_ns, bid_pts, ask_pts))
+        self._pending_n += time_ns.size
+        while self._pending_n >= self.chunk_ticks:
+            self._flush(self.chunk_ticks)
+
+    def _flush(self, n: int) -> None:
+        time_ns, bid_pts, ask_pts = (np.concatenate(cols) for cols in zip(*self._pending))
+        rest = (time_ns[n:], bid_pts[n:], ask_pts[n:])
+        time_ns, bid_pts, ask_pts = time_ns[:n], bid_pts[:n], ask_pts[:n]
+        self._pending = [rest] if rest[0].size else []
+        self._pending_n = int(rest[0].size)
+
+        columns: Dict[str, Any] = {}
+        # スプレッドはほぼ一定なので、Askは差分ではなくBidとの差として保存する
+        for name, values in (("time", time_ns), ("bid", bid_pts)):
+            first, payload, dtype = _encode_column(values)
+            columns[name] = {"first": first, "offset": self._fh.tell(), "length": len(payload), "dtype": dtype}
+            self._fh.write(payload)
+        spread = _narrow(ask_pts - bid_pts)
+        payload = zlib.compress(spread.tobytes(), 6)
+        columns["spread"] = {"first": 0, "offset": self._fh.tell(), "length": len(payload), "dtype": spread.dtype.str}
+        self._fh.write(payload)
+        self._chunks.append(
+            {"n": int(n), "first_time": int(time_ns[0]), "last_time": int(time_ns[-1]), "columns": columns}
+        )
+
+    def close(self) -> None:
+        """未書き込みのティックを書き出してメタデータを保存する。"""
+        if self._pending_n:
+            self._flush(self._pending_n)
+        self._fh.close()
+        meta = {"version": STORE_VERSION, "point": self.point, "ticks": sum(c["n"] for c in self._chunks), "chunks": self._chunks}
+        tmp = self.path / f".{META_FILENAME}.tmp"
+        tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp, self.path / META_FILENAME)
+
+    def __enter__(self) -> "TickStoreWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class TickStore:
+    """``TickStoreWriter`` で作成したストアの読み出し。
+
+    ``iter_chunks`` は1チャンクずつ展開するため、ティック総数に関係なく
+    メモリ使用量はチャンクサイズ程度に収まる。
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.meta = json.loads((self.path / META_FILENAME).read_text(encoding="utf-8"))
+        if self.meta.get("version") != STORE_VERSION:
+            raise ValueError(f"unsupported tick store version: {self.meta.get('version')}")
+        self.point = float(self.meta["point"])
+        self.scale = price_scale(self.point)
+
+    def __len__(self) -> int:
+        return int(self.meta["ticks"])
+
+    def iter_chunks(self) -> Iterator[TickChunk]:
+        """チャンクを時刻順に復号して返す。"""
+        with open(self.path / DATA_FILENAME, "rb") as fh:
+            for chunk in self.meta["chunks"]:
+                n = chunk["n"]
+                cols = {}
+                for name in ("time", "bid"):
+                    spec = chunk["columns"][name]
+                    fh.seek(spec["offset"])
+                    cols[name] = _decode_column(spec["first"], fh.read(spec["length"]), spec["dtype"], n)
+                spec = chunk["columns"]["spread"]
+                fh.seek(spec["offset"])
+                spread = np.frombuffer(zlib.decompress(fh.read(spec["length"])), dtype=np.dtype(spec["dtype"]))
+                # 整数で割ることでCSVの10進表記と同じ浮動小数に戻す
+                bid = cols["bid"] / self.scale
+                ask = (cols["bid"] + spread) / self.scale
+                yield TickChunk(time=cols["time"], bid=bid, ask=ask)
+
+    def iter_m1_bars(self) -> Iterator[OHLCArrays]:
+        """Bidから1分足を逐次生成する。チャンクをまたぐ分は次のチャンクで確定する。"""
+        carry: TickChunk | None = None
+        for chunk in self.iter_chunks():
+            if carry is not None:
+                chunk = TickChunk(
+                    time=np.concatenate([carry.time, chunk.time]),
+                    bid=np.concatenate([carry.bid, chunk.bid]),
+                    ask=np.concatenate([carry.ask, chunk.ask]),
+                )
+            minutes = chunk.time // NS_PER_MINUTE
+            tail = int(np.searchsorted(minutes, minutes[-1], side="left"))
+            carry = TickChunk(chunk.time[tail:], chunk.bid[tail:], chunk.ask[tail:])
+            if tail:
+                yield _ticks_to_bars(minutes[:tail], chunk.bid[:tail])
+        if carry is not None and len(carry):
+            yield _ticks_to_bars(carry.time // NS_PER_MINUTE, carry.bid)
+
+    def m1_bars(self) -> OHLCArrays:
+        """全期間の1分足を返す。"""
+        parts = list(self.iter_m1_bars())
+        if not parts:
+            empty = np.empty(0, dtype=np.float64)
+            return OHLCArrays(time=np.empty(0, dtype=np.int64), **{c: empty for c in PRICE_COLUMNS})
+        return OHLCArrays(
+            time=np.concatenate([p.time for p in parts]),
+            **{c: np.concatenate([getattr(p, c) for p in parts]) for c in PRICE_COLUMNS},
+        )
+
+
+def _ticks_to_bars(minutes: np.ndarray, price: np.ndarray) -> OHLCArrays:
+    starts = np.flatnonzero(np.r_[True, minutes[1:] != minutes[:-1]])
+    ends = np.r_[starts[1:], minutes.shape[0]] - 1
+    return OHLCArrays(
+        time=minutes[starts],
+        open=price[starts],
+        high=np.maximum.reduceat(price, starts),
+        low=np.minimum.reduceat(price, starts),
+        close=price[ends],
+    )
+
+
+def resolve_on_ticks(side: str, sl: float, tp: float, bid: np.ndarray, ask: np.ndarray) -> Tuple[str, int]:
+    """ティック列を先頭から走査し、最初にSL/TPへ到達した結果と位置を返す。
+
+    BUYはBid、SELLはAskで判定し、同一ティックで両方に達した場合はSLを優先する。
+    到達しなければ ``("", -1)`` を返す。
+    """
+    price = bid if side == "BUY" else ask
+    if side == "BUY":
+        hit_sl = price <= sl
+        hit_tp = price >= tp
+    else:
+        hit_sl = price >= sl
+        hit_tp = price <= tp
+    hit = hit_sl | hit_tp
+    if not hit.any():
+        return "", -1
+    k = int(np.argmax(hit))
+    return ("SL" if hit_sl[k] else "TP"), k
+
+
+def ingest_csv(
+    csv_path: str | Path,
+    store_path: str | Path,
+    point: float,
+    chunk_ticks: int = DEFAULT_CHUNK_TICKS,
+    read_rows: int = DEFAULT_CHUNK_TICKS,
+) -> TickStore:
+    """``time,bid,ask`` 形式のCSVを分割読み込みしながらストアへ変換する。"""
+    with TickStoreWriter(store_path, point, chunk_ticks) as writer:
+        for frame in pd.read_csv(csv_path, chunksize=read_rows):
+            times = pd.to_datetime(frame["time"]).to_numpy("datetime64[ns]").astype("int64")
+            writer.append(times, frame["bid"].to_numpy("float64"), frame["ask"].to_numpy("float64"))
+    return TickStore(store_path)
+
+
+def main() -> None:
+    """ティックCSVの取り込みとストア情報の表示を行うCLI。"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["ingest", "info"])
+    parser.add_argument("paths", nargs="+", help="ingest: CSV ストア / info: ストア")
+    parser.add_argument("--point", type=float, default=None, help="価格の最小刻み")
+    parser.add_argument("--chunk-ticks", type=int, default=DEFAULT_CHUNK_TICKS)
+    args = parser.parse_args()
+    logger = get_logger(__name__)
+
+    if args.command == "ingest":
+        if len(args.paths) != 2 or args.point is None:
+            parser.error("ingest requires CSV and store paths and --point")
+        store = ingest_csv(args.paths[0], args.paths[1], args.point, args.chunk_ticks)
+        logger.info("ingested %d ticks into %s", len(store), args.paths[1])
+        return
+    store = TickStore(args.paths[0])
+    size = (store.path / DATA_FILENAME).stat().st_size
+    print(f"ticks: {len(store)}\tchunks: {len(store.meta['chunks'])}\tbytes: {size}\tpoint: {store.point}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
-from typing import Iterator, Tuple
+from typing import Iterator, List, Tuple
 
+import numpy as np
 import pandas as pd
 
+from .config import Config
 from .enums import OHLCOrder
 
+TICK_ROW_BLOCK = 65536  # iter_tick_rows が一度にPythonの値へ変換する行数
+
 
 def ohlc_to_4ticks(open_: float, high: float, low: float, close: float, order: OHLCOrder) -> Tuple[float, float, float, float]:
     """OHLCを4ティックへ展開する。"""
@@ -14,7 +18,50 @@ def ohlc_to_4ticks(open_: float, high: float, low: float, close: float, order: O
     return open_, low, high, close
 
 
+def build_tick_matrix(
+    open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray, order: OHLCOrder
+) -> np.ndarray:
+    """OHLC配列を (N, 4) の float64 ティック行列へ一括で展開する。"""
+    second, third = (high, low) if order == OHLCOrder.O_H_L_C else (low, high)
+    return np.column_stack((open_, second, third, close)).astype(np.float64, copy=False)
+
+
+def build_ask_matrix(bid: np.ndarray, cfg: Config) -> np.ndarray:
+    """Bidティック行列に固定スプレッドを加えたAsk行列を返す。
+
+    スプレッドが0の場合はBid行列をそのまま返す。``SpreadPolicy`` は
+    SL/TPの置き方にのみ作用するため、気配値自体には常にスプレッドを加える。
+    """
+    spread = cfg.fixed_spread_point * cfg.point
+    if spread == 0:
+        return bid
+    return bid + spread
+
+
+def frame_tick_matrix(df: pd.DataFrame, order: OHLCOrder) -> np.ndarray:
+    """DataFrameの ``open``/``high``/``low``/``close`` 列からティック行列を作る。"""
+    return build_tick_matrix(
+        df["open"].to_numpy(), df["high"].to_numpy(), df["low"].to_numpy(), df["close"].to_numpy(), order
+    )
+
+
+def iter_tick_rows(
+    times: np.ndarray, bid: np.ndarray, ask: np.ndarray, start: int = 0, block: int = TICK_ROW_BLOCK
+) -> Iterator[Tuple[int, List[float], List[float]]]:
+    """ティック行列を ``start`` 本目から1分ずつ ``(時刻int64, bid4本, ask4本)`` として返す。
+
+    ``block`` 行ずつ ``tolist()`` でPythonの ``int``/``float`` に変換するため、
+    箱詰めはブロック単位で済み、同時に保持するのも1ブロック分だけになる。
+    """
+    for lo in range(start, len(times), block):
+        hi = lo + block
+        bid_rows = bid[lo:hi].tolist()
+        ask_rows = bid_rows if ask is bid else ask[lo:hi].tolist()
+        yield from zip(times[lo:hi].tolist(), bid_rows, ask_rows)
+
+
 def iter_minute_segments(df: pd.DataFrame, order: OHLCOrder) -> Iterator[Tuple[pd.Timestamp, float, float, float, float]]:
     """DataFrameから1分足セグメントを順次返す。"""
-    for ts, row in df.iterrows():
-        yield ts, *ohlc_to_4ticks(row["open"], row["high"], row["low"], row["close"], order)
+    matrix = frame_tick_matrix(df, order)
+    for ts, row in zip(df.index, matrix.tolist()):
+        yield ts, *row
@@ -0,0 +1,111 @@
+"""1分足から上位足へのバケット対応を整数演算で求め、データセットごとに再利用する。"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .data_cache import NS_PER_MINUTE, OHLCArrays
+
+TIMEFRAME_MINUTES = {"m15": 15, "h1": 60, "h4": 240, "d1": 1440}
+_INDEX_CACHE_SIZE = 4
+
+
+@dataclass(frozen=True)
+class BucketMap:
+    """1つの時間足について、1分足と上位足バケットの対応を保持する。
+
+    バケットは ``エポック分 // minutes`` で決まり、ラベルは区間の開始時刻
+    (``pandas.resample`` の既定と同じ)。``dense`` 系の値は先頭から末尾までの
+    全バケットを並べたもので、1分足が存在しないバケットも含む。
+
+    - ``first``: 先頭バケットの番号 (``エポック分 // minutes``)
+    - ``size``: 先頭から末尾までのバケット数
+    - ``position``: 各1分足が属するバケットの ``dense`` 上の位置
+    - ``starts``/``ends``: 1分足が存在するバケットごとの先頭行と末尾行
+    """
+
+    minutes: int
+    first: int
+    size: int
+    position: np.ndarray
+    starts: np.ndarray
+    ends: np.ndarray
+
+    @classmethod
+    def build(cls, time: np.ndarray, minutes: int) -> "BucketMap":
+        """時刻順に並んだエポック分から対応を作る。"""
+        bucket = np.asarray(time, dtype=np.int64) // minutes
+        if bucket.shape[0] == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return cls(minutes, 0, 0, empty, empty, empty)
+        first = int(bucket[0])
+        position = bucket - first
+        starts = np.flatnonzero(np.r_[True, position[1:] != position[:-1]])
+        ends = np.r_[starts[1:], position.shape[0]] - 1
+        return cls(minutes, first, int(position[-1]) + 1, position, starts, ends)
+
+    @property
+    def labels(self) -> np.ndarray:
+        """``dense`` 上の各バケットの開始時刻 (エポック分)。"""
+        return (self.first + np.arange(self.size, dtype=np.int64)) * self.minutes
+
+    @property
+    def last_label(self) -> int:
+        """末尾バケットの開始時刻 (エポック分)。"""
+        return (self.first + self.size - 1) * self.minutes
+
+    def dense_last(self, values: np.ndarray) -> np.ndarray:
+        """各バケットの最後の値。1分足が無いバケットは NaN (``resample().last()`` 相当)。"""
+        out = np.full(self.size, np.nan)
+        out[self.position[self.ends]] = np.asarray(values, dtype=np.float64)[self.ends]
+        return out
+
+    def ohlc(self, arrays: OHLCArrays) -> OHLCArrays:
+        """1分足が存在するバケットだけのOHLCを区間ごとの集約で作る。"""
+        return OHLCArrays(
+            time=(self.first + self.position[self.starts]) * self.minutes,
+            open=np.asarray(arrays.open)[self.starts],
+            high=np.maximum.reduceat(np.asarray(arrays.high), self.starts),
+            low=np.minimum.reduceat(np.asarray(arrays.low), self.starts),
+            close=np.asarray(arrays.close)[self.ends],
+        )
+
+    def to_m1(self, dense: np.ndarray) -> np.ndarray:
+        """``dense`` 上の値を1分足へ展開する (``reindex(method="ffill")`` 相当)。"""
+        return np.asarray(dense)[..., self.position]
+
+
+class TimeframeIndex:
+    """1つのデータセットについて、時間足ごとの ``BucketMap`` を遅延生成して保持する。"""
+
+    def __init__(self, time: np.ndarray) -> None:
+        self.time = np.asarray(time, dtype=np.int64)
+        self._maps: Dict[str, BucketMap] = {}
+
+    def __getitem__(self, timeframe: str) -> BucketMap:
+        bmap = self._maps.get(timeframe)
+        if bmap is None:
+            bmap = BucketMap.build(self.time, TIMEFRAME_MINUTES[timeframe])
+            self._maps[timeframe] = bmap
+        return bmap
+
+
+_index_cache: List[Tuple[pd.Index, TimeframeIndex]] = []
+
+
+def timeframe_index(index: pd.DatetimeIndex) -> TimeframeIndex:
+    """``DatetimeIndex`` に対応する ``TimeframeIndex`` を返す。
+
+    同じインデックスオブジェクトに対しては作成済みのものを返すため、
+    RSIなど複数の指標が同じバケット対応を共有する。
+    """
+    for cached, tf_index in _index_cache:
+        if cached is index:
+            return tf_index
+    tf_index = TimeframeIndex(index.asi8 // NS_PER_MINUTE)
+    _index_cache.insert(0, (index, tf_index))
+    del _index_cache[_INDEX_CACHE_SIZE:]
+    return tf_index
@@ -0,0 +1,117 @@
+"""OHLC4 のティック経路に沿ってSLを追従させるトレーリングストップ。
+
+``gpu_kernels.resolve_hit_trailing`` と同じ規則で、CPUエンジンと
+バッチカーネルの結果が一致するようにしている。
+"""
+from __future__ import annotations
+
+from typing import Sequence, Tuple
+
+
+def trailing_activation(start_ratio: float, rr: float, stoploss_points: float, point: float) -> float:
+    """トレーリングを始めるまでに必要な有利方向の値幅。
+
+    設定上の TP 幅 (``rr * stoploss_points``) の ``start_ratio`` 倍で、バッチカーネルの
+    ``trail_start_ratio * tp_points * point`` と同じ。実際の TP 価格 (スプレッドの扱いや
+    EA の指定) には依らない。
+    """
+    return start_ratio * rr * stoploss_points * point
+
+
+def resolve_hit_segment(p0: float, p1: float, sl: float, tp: float) -> str:
+    """価格が ``p0`` から ``p1`` へ動く1区間での SL/TP 到達を判定する。
+
+    バッチカーネルと同じく、両方に届く区間は SL、値動きの無い区間は
+    両方に届く場合だけ SL とする。
+    """
+    hit_tp = p0 <= tp <= p1 or p1 <= tp <= p0
+    hit_sl = p0 <= sl <= p1 or p1 <= sl <= p0
+    if hit_tp and hit_sl:
+        return "SL"
+    if p1 == p0:
+        return ""
+    if hit_tp:
+        return "TP"
+    if hit_sl:
+        return "SL"
+    return ""
+
+
+def resolve_gap(side: str, price: float, sl: float, tp: float) -> str:
+    """バー始値 ``price`` が既に SL/TP を越えていれば結果を返す。
+
+    前のバーの終値から窓を開けて越えた場合で、``resolve_hit`` と同じく
+    その水準で約定したものとして扱う。
+    """
+    if side == "BUY":
+        if price <= sl:
+            return "SL"
+        if price >= tp:
+            return "TP"
+    else:
+        if price >= sl:
+            return "SL"
+        if price <= tp:
+            return "TP"
+    return ""
+
+
+def trail_stop(
+    side: str, sl: float, best: float, price: float, entry: float, activation: float, width: float
+) -> Tuple[float, float]:
+    """価格が ``price`` に達したあとの ``(SL, 最有利価格)`` を返す。
+
+    最有利価格が約定価格から ``activation`` 以上進んでいれば、SLを
+    最有利価格から ``width`` の位置まで引き上げる (SELL は引き下げる)。SLが戻ることはない。
+    """
+    if side == "BUY":
+        if price > best:
+            best = price
+        if best - entry >= activation and best - width > sl:
+            sl = best - width
+    else:
+        if price < best:
+            best = price
+        if entry - best >= activation and best + width < sl:
+            sl = best + width
+    return sl, best
+
+
+def resolve_hit_trailing(
+    side: str,
+    ticks: Sequence[float],
+    sl: float,
+    tp: float,
+    best: float,
+    entry: float,
+    activation: float,
+    width: float,
+) -> Tuple[str, float, float]:
+    """1本のバーをティック区間ごとに進め ``(結果, SL, 最有利価格)`` を返す。
+
+    ``ticks`` は BUY ならBid、SELL ならAskの4本。各区間はその時点のSLで
+    到達を判定し、届かなければ区間の終点でSLを追従させる。区間内の値動きは
+    単調なので、途中で追従したSLにその区間で届くことはない。
+    始値が既に SL/TP を越えていれば ``resolve_gap`` の結果で決済する。
+    """
+    result = resolve_gap(side, ticks[0], sl, tp)
+    if result:
+        return result, sl, best
+    sl, best = trail_stop(side, sl, best, ticks[0], entry, activation, width)
+    for k in range(1, len(ticks)):
+        result = resolve_hit_segment(ticks[k - 1], ticks[k], sl, tp)
+        if result:
+            return result, sl, best
+        sl, best = trail_stop(side, sl, best, ticks[k], entry, activation, width)
+    return "", sl, best
+
+
+def trailing_bounds(side: str, sl: float, tp: float, best: float, entry: float, activation: float) -> Tuple[float, float]:
+    """``PassageIndex.first_hit`` に渡す ``(SL, TP)`` を返す。
+
+    TP の代わりに「発動価格と最有利価格の先」を閾値にすることで、SLが動き得る
+    バーも検索に掛かる。それ以外のバーではSLも最有利価格の判定も変わらない。
+    """
+    if side == "BUY":
+        return sl, min(tp, max(entry + activation, best))
+    return sl, max(tp, min(entry - activation, best))
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List, Dict
+from dataclasses import asdict, dataclass
+from typing import List
 
+import numpy as np
+
+from ..engine.actions import NOP, Action, OpenAction
+from ..engine.batch import BUY, SELL, BatchInputs, BatchSignals
 from ..engine.context import ReadOnlyCtx
 from ..engine.execution import compute_lot_with_mode, apply_spread_policy
 
@@ -17,14 +21,26 @@ class EAInternalState:
 
 ea_state = EAInternalState()
 
+# 型付きアクションだけを返すため、エンジンでの再検証は不要。
+TRUSTED = True
+
+
+def get_state() -> dict:
+    """チェックポイントに保存する ``ea_state`` のコピー。"""
+    return asdict(ea_state)
+
+
+def set_state(state: dict | None) -> None:
+    """チェックポイントから ``ea_state`` を戻す。``None`` なら初期状態にする。"""
+    global ea_state
+    ea_state = EAInternalState(**(state or {}))
 
-def emit_actions(i_minute: int, ctx: ReadOnlyCtx) -> List[Dict]:
+
+def emit_actions(i_minute: int, ctx: ReadOnlyCtx) -> List[Action]:
     """H1 と M15 の RSI を用いたエントリー判定と損切/利確ロジック。"""
     # エンジン側の連敗数を同期
     ea_state.loss_streak = ctx.state.loss_streak
 
-    actions: List[Dict] = []
-
     # リセットフラグでロック解除
     if ctx.flags.get("reset"):
         ea_state.buy_locked = False
@@ -52,24 +68,68 @@ def emit_actions(i_minute: int, ctx: ReadOnlyCtx) -> List[Dict]:
         and rsi_h1 <= ctx.cfg.oversold
         and not ea_state.buy_locked
     ):
-        sl = price_buy - sl_points
-        action: Dict = {"type": "OPEN", "side": "BUY", "lot": lot, "sl": sl}
-        if not ctx.cfg.enable_trailing_stop:
-            action["tp"] = price_buy + tp_points
-        actions.append(action)
+        tp = None if ctx.cfg.enable_trailing_stop else price_buy + tp_points
         ea_state.buy_locked = True
+        return [OpenAction("BUY", lot, sl=price_buy - sl_points, tp=tp)]
     elif (
         rsi_m15 >= ctx.cfg.overbought
         and rsi_h1 >= ctx.cfg.overbought
         and not ea_state.sell_locked
     ):
-        sl = price_sell + sl_points
-        action = {"type": "OPEN", "side": "SELL", "lot": lot, "sl": sl}
-        if not ctx.cfg.enable_trailing_stop:
-            action["tp"] = price_sell - tp_points
-        actions.append(action)
+        tp = None if ctx.cfg.enable_trailing_stop else price_sell - tp_points
         ea_state.sell_locked = True
-    else:
-        actions.append({"type": "NOP"})
-
-    return actions
+        return [OpenAction("SELL", lot, sl=price_sell + sl_points, tp=tp)]
+    return [NOP]
+
+
+def _first_per_segment(cond: np.ndarray, segment: np.ndarray, locked: bool) -> np.ndarray:
+    """各区間で ``cond`` が最初に真になるバーだけを真にする。
+
+    区間0 (最初のリセットより前) は ``locked`` が真なら発火しない。
+    """
+    idx = np.flatnonzero(cond)
+    seg = segment[idx]
+    first = idx[np.r_[True, seg[1:] != seg[:-1]]] if idx.size else idx
+    if locked and first.size and segment[first[0]] == 0:
+        first = first[1:]
+    out = np.zeros(cond.shape[0], dtype=bool)
+    out[first] = True
+    return out
+
+
+def emit_actions_batch(x: BatchInputs) -> BatchSignals:
+    """``emit_actions`` と同じ判定を区間全体に対してまとめて行う。
+
+    ロックはリセットフラグで解除されるまで保持されるため、リセットで区切った
+    区間ごとに最初に条件を満たしたバーだけがエントリーになる。区間終了時の
+    ロック状態は ``ea_state`` に書き戻し、次の区間へ引き継ぐ。
+    """
+    cfg = x.cfg
+    n = x.close.shape[0]
+    reset = x.flags.column("reset") if "reset" in x.flags.index else np.zeros(n, dtype=bool)
+    segment = np.cumsum(reset)
+
+    cond_buy = (x.rsi_m15 <= cfg.oversold) & (x.rsi_h1 <= cfg.oversold)
+    cond_sell = (x.rsi_m15 >= cfg.overbought) & (x.rsi_h1 >= cfg.overbought)
+    buy = _first_per_segment(cond_buy, segment, ea_state.buy_locked)
+    sell = _first_per_segment(cond_sell & ~buy, segment, ea_state.sell_locked)
+
+    last = segment[-1] if n else 0
+    ea_state.buy_locked = bool(buy[segment == last].any()) or (last == 0 and ea_state.buy_locked)
+    ea_state.sell_locked = bool(sell[segment == last].any()) or (last == 0 and ea_state.sell_locked)
+
+    side = np.zeros(n, dtype=np.int8)
+    side[buy] = BUY
+    side[sell] = SELL
+
+    sl_points = cfg.stoploss_points * cfg.point
+    tp_points = cfg.stoploss_points * cfg.rr * cfg.point
+    entry = np.where(
+        side == BUY,
+        x.bid + apply_spread_policy(0.0, "BUY", cfg),
+        x.ask + apply_spread_policy(0.0, "SELL", cfg),
+    )
+    direction = np.where(side == BUY, 1.0, -1.0)
+    sl = np.where(side != 0, entry - direction * sl_points, np.nan)
+    tp = None if cfg.enable_trailing_stop else np.where(side != 0, entry + direction * tp_points, np.nan)
+    return BatchSignals(side=side, sl=sl, tp=tp)
@@ -51,3 +51,48 @@ def test_validate_action_modify_ng_tp_type():
     action = {"type": "MODIFY", "ticket": 1, "sl": 50.0, "tp": "100"}
     with pytest.raises(ActionSchemaError):
         validate_action(action)
+
+
+def test_typed_actions_validate_on_creation():
+    from project.engine.actions import ModifyAction, OpenAction
+
+    action = OpenAction("BUY", 0.1, sl=99.5)
+    validate_action(action)
+    assert action.to_dict() == {"type": "OPEN", "side": "BUY", "lot": 0.1, "sl": 99.5}
+    with pytest.raises(ActionSchemaError):
+        OpenAction("LONG", 0.1)
+    with pytest.raises(ActionSchemaError):
+        OpenAction("SELL", 0)
+    with pytest.raises(ActionSchemaError):
+        ModifyAction(1)
+    with pytest.raises(AttributeError):
+        action.lot = 1.0
+
+
+def test_action_from_dict_round_trip():
+    from project.engine.actions import NOP, OpenAction, PendingOpenAction, action_from_dict
+
+    assert action_from_dict({"type": "NOP"}) is NOP
+    action = action_from_dict({"type": "OPEN", "side": "SELL", "lot": 0.2, "tp": 99.0})
+    assert isinstance(action, OpenAction)
+    assert action == {"type": "OPEN", "side": "SELL", "lot": 0.2, "tp": 99.0}
+    pending = action_from_dict({"type": "PENDING_OPEN", "side": "BUY", "lot": 0.1, "price": 100})
+    assert isinstance(pending, PendingOpenAction) and pending.price == 100
+    with pytest.raises(ActionSchemaError):
+        action_from_dict({"type": "CLOSE"})
+
+
+def test_coerce_actions_passes_typed_lists_through():
+    from project.engine.actions import NOP, coerce_actions
+
+    typed = [NOP]
+    assert coerce_actions(typed) is typed
+    mixed = coerce_actions([NOP, {"type": "OPEN", "side": "BUY", "lot": 0.1}])
+    assert [a.type for a in mixed] == ["NOP", "OPEN"]
+    with pytest.raises(ActionSchemaError):
+        coerce_actions([{"type": "OPEN", "side": "BUY", "lot": -1}])
+    trusted = coerce_actions([{"type": "OPEN", "side": "BUY", "lot": -1}], trusted=True)
+    assert trusted[0].lot == -1
+    for bad in ({"type": "BOGUS"}, None, ["OPEN"]):
+        with pytest.raises(ActionSchemaError):
+            coerce_actions([NOP, bad], trusted=True)
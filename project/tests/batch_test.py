@@ -0,0 +1,98 @@
+from dataclasses import replace
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from project.engine.batch import BatchSignals, supports_batch, validate_signals
+from project.engine.cpu_tester import run_backtest, run_backtest_streaming
+from project.engine.data_cache import OHLCArrays
+from project.engine.enums import SpreadPolicy
+from project.engine.errors import ActionSchemaError
+from project.strategies import user_ea
+
+
+pytestmark = pytest.mark.usefixtures("fresh_ea_state")
+
+
+def _per_bar(record=None):
+    def emit_actions(i_minute, ctx):
+        actions = user_ea.emit_actions(i_minute, ctx)
+        if record is not None and actions[0].type == "OPEN":
+            record[i_minute] = actions[0]
+        return actions
+
+    return SimpleNamespace(emit_actions=emit_actions)
+
+
+def _batch(record=None):
+    def emit_actions_batch(x):
+        signals = user_ea.emit_actions_batch(x)
+        if record is not None:
+            for j in np.flatnonzero(signals.side).tolist():
+                tp = None if signals.tp is None else signals.tp[j]
+                record[x.offset + j] = (int(signals.side[j]), signals.sl[j], tp)
+        return signals
+
+    return SimpleNamespace(emit_actions=user_ea.emit_actions, emit_actions_batch=emit_actions_batch)
+
+
+@pytest.mark.parametrize("policy", [SpreadPolicy.NONE, SpreadPolicy.FULL])
+def test_batch_matches_per_bar(cfg, random_ohlc, policy):
+    cfg = replace(cfg, spread_policy=policy, fixed_spread_point=2)
+    df = random_ohlc(n=6000, seed=6, drop=range(500, 900))
+    per_bar_actions: dict = {}
+    expected = run_backtest(df, cfg, _per_bar(per_bar_actions))
+    user_ea.set_state(None)
+    signals: dict = {}
+    history = run_backtest(df, cfg, _batch(signals))
+    assert len(expected) > 0
+    assert history == expected
+    assert sorted(signals) == sorted(per_bar_actions)
+    for j, (side, sl, tp) in signals.items():
+        action = per_bar_actions[j]
+        assert side == (1 if action.side == "BUY" else -1)
+        assert sl == pytest.approx(action.sl)
+        assert tp == pytest.approx(action.tp)
+
+
+def test_batch_carries_locks_across_chunks(cfg, random_ohlc):
+    df = random_ohlc(n=6000, seed=6, drop=range(500, 900))
+    expected = run_backtest(df, cfg, _per_bar())
+    user_ea.set_state(None)
+    assert run_backtest_streaming(OHLCArrays.from_frame(df), cfg, _batch()) == expected
+
+
+def test_stateful_ea_falls_back_to_per_bar(cfg, random_ohlc):
+    df = random_ohlc(n=3000, seed=2)
+
+    def emit_actions_batch(x):
+        raise AssertionError("batch API must not be used")
+
+    ea = SimpleNamespace(emit_actions=user_ea.emit_actions, emit_actions_batch=emit_actions_batch, STATEFUL=True)
+    assert not supports_batch(ea)
+    history = run_backtest(df, cfg, ea)
+    user_ea.set_state(None)
+    assert history == run_backtest(df, cfg, _per_bar())
+
+
+def test_batch_returning_none_falls_back(cfg, random_ohlc):
+    df = random_ohlc(n=3000, seed=2)
+    expected = run_backtest(df, cfg, _per_bar())
+    user_ea.set_state(None)
+    ea = SimpleNamespace(emit_actions=user_ea.emit_actions, emit_actions_batch=lambda x: None)
+    assert run_backtest(df, cfg, ea) == expected
+
+
+def test_validate_signals_rejects_bad_arrays():
+    validate_signals(BatchSignals(side=np.array([0, 1, -1])), 3)
+    with pytest.raises(ActionSchemaError):
+        validate_signals(BatchSignals(side=np.array([0, 1])), 3)
+    with pytest.raises(ActionSchemaError):
+        validate_signals(BatchSignals(side=np.array([0, 2, 0])), 3)
+    with pytest.raises(ActionSchemaError):
+        validate_signals(BatchSignals(side=np.array([1, 0, 0]), lot=np.array([0.0, 1.0, 1.0])), 3)
+    with pytest.raises(ActionSchemaError):
+        validate_signals(BatchSignals(side=np.array([1, 0, 0]), sl=np.zeros(2)), 3)
+    with pytest.raises(ActionSchemaError):
+        validate_signals({"side": np.zeros(3)}, 3)
@@ -0,0 +1,57 @@
+import json
+
+import numpy as np
+
+from project.engine.catalog import DataCatalog, symbol_from_filename, to_epoch_minute
+
+
+def _write(path, start, periods):
+    import pandas as pd
+
+    idx = pd.date_range(start, periods=periods, freq="D")
+    rows = ["time,open,high,low,close"]
+    rows += [f"{ts.isoformat()},{i},{i + 1},{i - 1},{i}" for i, ts in enumerate(idx)]
+    path.write_text("\n".join(rows) + "\n", encoding="utf-8")
+
+
+def test_symbol_from_filename():
+    assert symbol_from_filename("data/usdjpy_2015.csv") == "USDJPY"
+    assert symbol_from_filename("EURUSD.csv") == "EURUSD"
+
+
+def test_to_epoch_minute_period_bounds():
+    assert to_epoch_minute("2019-11", end=True) == to_epoch_minute("2019-11-30 23:59")
+    assert to_epoch_minute("2015-03") == to_epoch_minute("2015-03-01 00:00")
+
+
+def test_query_reads_only_overlapping_files(tmp_path):
+    _write(tmp_path / "USDJPY_2015.csv", "2015-01-01", 365)
+    _write(tmp_path / "USDJPY_2016.csv", "2016-01-01", 366)
+    _write(tmp_path / "USDJPY_2017.csv", "2017-01-01", 365)
+    _write(tmp_path / "EURUSD_2016.csv", "2016-01-01", 10)
+
+    catalog = DataCatalog(tmp_path).scan()
+    index = json.loads(catalog.index_path.read_text(encoding="utf-8"))
+    assert len(index["files"]) == 4
+
+    picked = [e.file for e in catalog.files_for("USDJPY", to_epoch_minute("2015-12"), to_epoch_minute("2016-02", end=True))]
+    assert picked == ["USDJPY_2015.csv", "USDJPY_2016.csv"]
+
+    arrays = catalog.query("USDJPY", "2015-12", "2016-02")
+    assert len(arrays) == 31 + 31 + 29
+    assert np.all(np.diff(arrays.time) > 0)
+    assert len(catalog.query("USDJPY", "2018-01", "2018-02")) == 0
+
+
+def test_scan_reuses_persisted_index(tmp_path, monkeypatch):
+    _write(tmp_path / "USDJPY_2015.csv", "2015-01-01", 5)
+    DataCatalog(tmp_path).scan()
+
+    import project.engine.catalog as catalog_mod
+
+    def fail(*args, **kwargs):
+        raise AssertionError("unchanged files must not be re-read")
+
+    monkeypatch.setattr(catalog_mod, "load_ohlc", fail)
+    catalog = DataCatalog(tmp_path).scan()
+    assert catalog.entries["USDJPY"][0].rows == 5
@@ -0,0 +1,161 @@
+from dataclasses import replace
+from types import SimpleNamespace
+
+import pytest
+
+from project.engine.actions import NOP, CloseAction, OpenAction
+from project.engine.checkpoint import PROBE_BARS, Checkpointer, last_hour_start, load_checkpoint
+from project.engine.cpu_tester import run_backtest, run_backtest_incremental, run_backtest_streaming
+from project.engine.data_cache import OHLCArrays
+from project.engine.errors import ConfigError
+from project.strategies import user_ea
+
+
+pytestmark = pytest.mark.usefixtures("fresh_ea_state")
+
+
+class _Recorder(Checkpointer):
+    """保存のたびに書き込みを待ち、読み戻したチェックポイントを控える。"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.snapshots = []
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.flush()
+        self.snapshots.append(load_checkpoint(self.path))
+
+
+class _GridEA:
+    ORDER_BOOK = True
+
+    def __init__(self):
+        self.opened = []
+
+    def get_state(self):
+        return list(self.opened)
+
+    def set_state(self, state):
+        self.opened = list(state or [])
+
+    def emit_actions(self, i, ctx):
+        if i % 50 == 0:
+            self.opened.append(ctx.orders.next_ticket)
+            return [OpenAction("BUY" if i % 100 else "SELL", 0.1)]
+        if i % 50 == 25 and self.opened and self.opened[0] in ctx.orders.positions:
+            return [CloseAction(self.opened.pop(0))]
+        return [NOP]
+
+
+def _per_bar():
+    return SimpleNamespace(emit_actions=user_ea.emit_actions, get_state=user_ea.get_state, set_state=user_ea.set_state)
+
+
+def _batch():
+    return user_ea
+
+
+def _run(stream, df, cfg, ea, **kwargs):
+    if stream:
+        return run_backtest_streaming(OHLCArrays.from_frame(df), cfg, ea, **kwargs)
+    return run_backtest(df, cfg, ea, **kwargs)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+@pytest.mark.parametrize("make_ea", [_per_bar, _batch, _GridEA])
+def test_resume_from_every_checkpoint_matches_full_run(cfg, random_ohlc, tmp_path, stream, make_ea):
+    cfg = replace(cfg, enable_trailing_stop=make_ea is _per_bar)
+    df = random_ohlc(n=6000, seed=6, drop=range(500, 900))
+    ea = make_ea()
+    expected = _run(stream, df, cfg, ea)
+    assert len(expected) > 3
+    ea.set_state(None)
+    with _Recorder(tmp_path / "run.ckpt", ea, every_bars=400) as ckpt:
+        assert _run(stream, df, cfg, ea, checkpoint=ckpt) == expected
+    assert len(ckpt.snapshots) >= 3
+    for snap in ckpt.snapshots:
+        ea.set_state(None)
+        assert expected[: len(snap.history)] == snap.history
+        assert _run(stream, df, cfg, ea, resume=snap) == expected
+
+
+def test_resume_after_crash(cfg, random_ohlc, tmp_path):
+    df = random_ohlc(n=6000, seed=6)
+    expected = run_backtest(df, cfg, _per_bar())
+    user_ea.set_state(None)
+
+    def crashing(i_minute, ctx):
+        if i_minute == 4500:
+            raise RuntimeError("killed")
+        return user_ea.emit_actions(i_minute, ctx)
+
+    ea = SimpleNamespace(emit_actions=crashing, get_state=user_ea.get_state, set_state=user_ea.set_state)
+    path = tmp_path / "run.ckpt"
+    with pytest.raises(RuntimeError):
+        with Checkpointer(path, ea, every_bars=1000) as ckpt:
+            run_backtest(df, cfg, ea, checkpoint=ckpt)
+    resume = load_checkpoint(path)
+    assert resume.cursor == 4000
+    user_ea.set_state(None)
+    assert run_backtest(df, cfg, _per_bar(), resume=resume) == expected
+
+
+def test_time_interval_and_fingerprint(cfg, random_ohlc, tmp_path):
+    df = random_ohlc(n=10000, seed=1)
+    path = tmp_path / "run.ckpt"
+    with Checkpointer(path, _per_bar(), every_seconds=1e-9) as ckpt:
+        run_backtest(df, cfg, _per_bar(), checkpoint=ckpt)
+    assert ckpt.saved >= 1
+    resume = load_checkpoint(path)
+    assert resume.cursor > PROBE_BARS
+    with pytest.raises(ConfigError):
+        run_backtest(df, replace(cfg, rsi_period=10), _per_bar(), resume=resume)
+    with pytest.raises(ConfigError):
+        run_backtest_streaming(OHLCArrays.from_frame(df), cfg, _per_bar(), resume=resume)
+    with pytest.raises(ConfigError):
+        Checkpointer(path, _per_bar())
+
+
+@pytest.mark.parametrize("stream", [False, True])
+@pytest.mark.parametrize("make_ea", [_per_bar, _batch, _GridEA])
+def test_incremental_rerun_matches_full_rerun(cfg, random_ohlc, tmp_path, stream, make_ea):
+    arrays = OHLCArrays.from_frame(random_ohlc(n=6000, seed=6, drop=range(500, 900)))
+    tail_path = tmp_path / "run.tail"
+    ea = make_ea()
+    for stop in (2017, 3533, 3533, len(arrays)):
+        day = arrays.slice(0, stop)
+        ea.set_state(None)
+        expected = run_backtest(day.to_frame(), cfg, ea)
+        ea.set_state(None)
+        assert run_backtest_incremental(day, cfg, ea, tail_path, stream=stream) == expected
+        tail = load_checkpoint(tail_path)
+        assert (tail.bars, tail.cursor) == (stop, last_hour_start(day.time))
+        assert tail.history == [row for row in expected if row["time"] < day.to_frame().index[tail.cursor]]
+
+
+def test_incremental_simulates_only_new_bars(cfg, random_ohlc, tmp_path):
+    arrays = OHLCArrays.from_frame(random_ohlc(n=6000, seed=6))
+    tail_path = tmp_path / "run.tail"
+    seen = []
+
+    def emit_actions(i_minute, ctx):
+        seen.append(i_minute)
+        return user_ea.emit_actions(i_minute, ctx)
+
+    ea = SimpleNamespace(emit_actions=emit_actions, get_state=user_ea.get_state, set_state=user_ea.set_state)
+    run_backtest_incremental(arrays.slice(0, 4000), cfg, ea, tail_path)
+    first = load_checkpoint(tail_path).cursor
+    seen.clear()
+    run_backtest_incremental(arrays, cfg, ea, tail_path)
+    assert seen[0] == first and len(seen) == len(arrays) - first
+
+    # 途中のバーが書き換わっていれば先頭から計算し直す
+    edited = OHLCArrays(time=arrays.time, open=arrays.open, high=arrays.high, low=arrays.low, close=arrays.close.copy())
+    edited.close[100] += 0.5
+    seen.clear()
+    user_ea.set_state(None)
+    expected = run_backtest(edited.to_frame(), cfg, _per_bar())
+    user_ea.set_state(None)
+    assert run_backtest_incremental(edited, cfg, ea, tail_path) == expected
+    assert seen[0] == 0
@@ -1,4 +1,85 @@
 import sys
 from pathlib import Path
 
+import pytest
+
 sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from project.engine.config import Config  # noqa: E402
+from project.engine.enums import OHLCOrder, SpreadPolicy, MoneyMode  # noqa: E402
+from project.engine.gpu_runner import prefer_fork_safe_threading  # noqa: E402
+from project.strategies import user_ea  # noqa: E402
+
+# 同じプロセスで並列カーネルを実行したあとに共有メモリのテストがワーカーをフォークする
+prefer_fork_safe_threading()
+
+
+@pytest.fixture
+def cfg() -> Config:
+    return Config(
+        symbol="USDJPY",
+        timezone="UTC",
+        dst=False,
+        data_path="data",
+        spread_policy=SpreadPolicy.NONE,
+        fixed_spread_point=0,
+        commission_per_lot_round=0.0,
+        swap_long_per_lot_day=0.0,
+        swap_short_per_lot_day=0.0,
+        ohlc_order=OHLCOrder.O_H_L_C,
+        point=0.01,
+        tick_size=0.01,
+        tick_value=1.0,
+        min_lot=0.1,
+        lot_step=0.1,
+        max_lot=1.0,
+        enable_trailing_stop=False,
+        trailing_start_ratio=0.5,
+        trailing_width_points=10,
+        stoploss_points=10,
+        rr=2.0,
+        rsi_period=14,
+        reset_level=50,
+        overbought=70,
+        oversold=30,
+        loss_streak_max=3,
+        money_mode=MoneyMode.GEOMETRIC,
+        step_percent=0.01,
+        initial_risk_pct=0.01,
+        fixed_lot=0.1,
+        base_balance=1000.0,
+        ft6_mode=False,
+        save_chart_flags=False,
+        batch_size=1,
+        chunk_years=1,
+        gpu_debug_mode=False,
+        gpu_debug_runs=1,
+        gpu_debug_seed="seed",
+    )
+
+
+@pytest.fixture
+def fresh_ea_state():
+    """サンプルEAのモジュール状態をテストの前後で初期値に戻す。"""
+    user_ea.set_state(None)
+    yield
+    user_ea.set_state(None)
+
+
+@pytest.fixture
+def random_ohlc():
+    """年をまたぐ合成1分足データを生成する関数を返す。"""
+    import numpy as np
+    import pandas as pd
+
+    def make(n: int = 4000, start: str = "2023-12-31 12:00", seed: int = 0, drop=()) -> pd.DataFrame:
+        rng = np.random.default_rng(seed)
+        index = pd.date_range(start, periods=n, freq="min", name="time")
+        close = 150 + np.cumsum(rng.normal(0, 0.02, n))
+        open_ = np.r_[close[0], close[:-1]]
+        high = np.maximum(open_, close) + rng.uniform(0, 0.03, n)
+        low = np.minimum(open_, close) - rng.uniform(0, 0.03, n)
+        df = pd.DataFrame({"open": open_, "high": high, "low": low, "close": close}, index=index)
+        return df.drop(df.index[list(drop)]) if drop else df
+
+    return make
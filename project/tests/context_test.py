@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from project.engine.context import LiveCtx
+from project.engine.flags import FlagSet
+from project.engine.state import RunState
+
+
+def _ctx(cfg):
+    rsi = np.arange(10, dtype=float)
+    flags = FlagSet({"reset": rsi >= 5, "even": rsi % 2 == 0})
+    state = RunState(balance=1000.0)
+    return LiveCtx(state, cfg, rsi, rsi * 2, flags), state
+
+
+def test_cursor_exposes_history_up_to_current_bar(cfg):
+    ctx, _ = _ctx(cfg)
+    ctx._advance(3, 150.0, 150.02)
+    assert (ctx.bid, ctx.ask) == (150.0, 150.02)
+    assert len(ctx.rsi_m15) == 4
+    assert ctx.rsi_m15[-1] == 3.0
+    assert ctx.rsi_h1[-2] == 4.0
+    assert ctx.rsi_m15[1:].tolist() == [1.0, 2.0, 3.0]
+    assert np.asarray(ctx.rsi_h1).tolist() == [0.0, 2.0, 4.0, 6.0]
+    with pytest.raises(IndexError):
+        ctx.rsi_m15[4]
+    assert dict(ctx.flags) == {"reset": False, "even": False}
+    ctx._advance(6, 151.0, 151.02)
+    assert ctx.rsi_m15[-1] == 6.0
+    assert dict(ctx.flags) == {"reset": True, "even": True}
+
+
+def test_state_view_tracks_run_state_and_rejects_writes(cfg):
+    ctx, state = _ctx(cfg)
+    state.balance = 1234.5
+    state.position_side = "BUY"
+    assert ctx.state.balance == 1234.5
+    assert ctx.state.position_side == "BUY"
+    assert ctx.state.point() == cfg.point
+    with pytest.raises(AttributeError):
+        ctx.bid = 1.0
+    with pytest.raises(AttributeError):
+        ctx.state.balance = 0.0
+    with pytest.raises(AttributeError):
+        ctx.extra = 1
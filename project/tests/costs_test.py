@@ -0,0 +1,123 @@
+from dataclasses import replace
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from project.engine import cpu_tester
+from project.engine.costs import apply_costs, batch_costs, history_costs, rollover_days
+from project.engine.cpu_tester import _write_outputs, run_backtest
+from project.engine.execution import value_per_point
+from project.engine.gpu_runner import simulate_cpu_batch
+from project.engine.results_store import ResultsStore
+
+
+def _ns(*stamps):
+    return pd.DatetimeIndex(list(stamps)).asi8
+
+
+def test_rollover_days_counts_weekend_and_triple_day(cfg):
+    # 2024-01-02 は火曜
+    entry = _ns("2024-01-02 10:00", "2024-01-03 10:00", "2024-01-05 10:00", "2024-01-06 10:00", "2024-01-02 10:00")
+    exit_ = _ns("2024-01-03 10:00", "2024-01-04 10:00", "2024-01-08 10:00", "2024-01-07 10:00", "2024-01-02 23:59")
+    # 火→水は1日、水→木は3倍日、金→月は金曜分の1日、土→日は0、日中は0
+    assert rollover_days(entry, exit_, cfg).tolist() == [1, 3, 1, 0, 0]
+    # 決済時刻ちょうどのロールオーバーは含み、建玉時刻ちょうどは含まない
+    assert rollover_days(_ns("2024-01-02 00:00"), _ns("2024-01-03 00:00"), cfg).tolist() == [1]
+
+
+def test_rollover_days_follows_timezone_and_hour(cfg):
+    entry, exit_ = _ns("2024-01-02 14:00"), _ns("2024-01-02 16:00")
+    assert rollover_days(entry, exit_, cfg).tolist() == [0]
+    assert rollover_days(entry, exit_, replace(cfg, timezone="Asia/Tokyo")).tolist() == [1]
+    assert rollover_days(entry, exit_, cfg, rollover_hour=15).tolist() == [1]
+    # 夏時間中のニューヨーク 17時 (UTC 21時) は dst=False なら UTC 22時扱い
+    summer = _ns("2024-07-02 21:30"), _ns("2024-07-02 21:45")
+    ny = replace(cfg, timezone="America/New_York")
+    assert rollover_days(*summer, ny, rollover_hour=17).tolist() == [0]
+    assert rollover_days(*summer, replace(ny, dst=True), rollover_hour=17).tolist() == [0]
+    assert rollover_days(_ns("2024-07-02 20:30"), _ns("2024-07-02 21:30"), replace(ny, dst=True), rollover_hour=17).tolist() == [1]
+
+
+def test_apply_costs_per_run_balance(cfg):
+    cfg = replace(cfg, commission_per_lot_round=7.0, swap_long_per_lot_day=2.0, swap_short_per_lot_day=-3.0)
+    entry = _ns("2024-01-02 10:00", "2024-01-03 10:00", "2024-01-02 10:00")
+    exit_ = _ns("2024-01-03 10:00", "2024-01-04 10:00", "2024-01-03 10:00")
+    costs = apply_costs(
+        np.array([10.0, -5.0, 20.0]), entry, exit_, np.array([1, -1, 1]), np.array([1.0, 2.0, 0.5]), cfg, run=np.array([0, 0, 1])
+    )
+    assert costs.days.tolist() == [1, 3, 1]
+    assert costs.commission.tolist() == [7.0, 14.0, 3.5]
+    assert costs.swap.tolist() == [2.0, -18.0, 1.0]
+    assert costs.net_pnl.tolist() == [5.0, -37.0, 17.5]
+    assert costs.balance.tolist() == [1005.0, 968.0, 1017.5]
+
+
+def test_history_costs_from_engine(cfg, random_ohlc):
+    df = random_ohlc(n=6000, seed=2)
+
+    def emit_actions(i, ctx):
+        if i % 400 == 0:
+            return [{"type": "OPEN", "side": "SELL" if i % 800 else "BUY", "lot": 0.1}]
+        return [{"type": "NOP"}]
+
+    wide = replace(cfg, stoploss_points=60, commission_per_lot_round=1.0, swap_long_per_lot_day=0.5, swap_short_per_lot_day=-0.5)
+    history = run_backtest(df, wide, SimpleNamespace(emit_actions=emit_actions))
+    assert history
+    costs = history_costs(history, wide)
+    assert (costs.commission == 0.1).all()
+    assert costs.days.max() > 0
+    sides = np.array([row["side"] for row in history])
+    assert (costs.swap[sides == "BUY"] >= 0).all() and (costs.swap[sides == "SELL"] <= 0).all()
+    profit = np.array([row["profit"] for row in history])
+    assert costs.balance[-1] == pytest.approx(wide.base_balance + (profit - 0.1 + costs.swap).sum())
+
+
+def test_batch_costs_on_kernel_output(cfg):
+    cfg = replace(cfg, commission_per_lot_round=2.0, swap_long_per_lot_day=1.0, swap_short_per_lot_day=1.0)
+    n_minutes = 3000
+    close = (100 + np.sin(np.arange(n_minutes) / 300.0)).astype(np.float32)
+    n_runs = 3
+    entry_side = np.zeros(n_runs * n_minutes, dtype=np.int8)
+    entry_side[10] = 1
+    entry_side[n_minutes + 20] = -1
+    sl = np.full(n_runs, 150, dtype=np.int32)
+    tp = np.full(n_runs, 300, dtype=np.int32)
+    res = simulate_cpu_batch(
+        np.tile(close, n_runs), np.tile(close, n_runs), np.tile(close, n_runs), np.tile(close, n_runs),
+        entry_side, sl, tp, cfg.point, 0, 0, 0, n_minutes,
+    )
+    assert res["entry_index"].tolist() == [10, 20, -1]
+    time = pd.date_range("2024-01-02", periods=n_minutes, freq="min").asi8
+    costs = batch_costs(res, entry_side, time, n_minutes, 0.2, cfg)
+    assert costs.commission.tolist() == [pytest.approx(0.4), pytest.approx(0.4), 0.0]
+    assert costs.net_pnl[2] == 0.0 and costs.balance[2] == cfg.base_balance
+    pnl = res["pnl_points"][:2] * value_per_point(cfg) * 0.2
+    days = rollover_days(time[res["entry_index"][:2]], time[res["exit_index"][:2]], cfg)
+    assert costs.net_pnl[:2] == pytest.approx(pnl - 0.4 + 0.2 * days)
+
+
+def test_columnar_output_includes_costs(cfg, random_ohlc, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(cpu_tester, "COMPACT_MANIFESTS", 2)
+    df = random_ohlc(n=6000, seed=2)
+
+    def emit_actions(i, ctx):
+        if i % 400 == 0:
+            return [{"type": "OPEN", "side": "BUY", "lot": 0.1}]
+        return [{"type": "NOP"}]
+
+    wide = replace(cfg, stoploss_points=60, commission_per_lot_round=1.0, swap_long_per_lot_day=0.5)
+    history = run_backtest(df, wide, SimpleNamespace(emit_actions=emit_actions))
+    _write_outputs("C1", history, "columnar", wide)
+    _write_outputs("C2", [], "columnar", wide)
+    store = ResultsStore(tmp_path / "outputs/results")
+    trades = store.read("trades")
+    costs = history_costs(history, wide)
+    np.testing.assert_allclose(trades["commission"], costs.commission)
+    np.testing.assert_allclose(trades["swap"], costs.swap)
+    np.testing.assert_allclose(trades["balance"], costs.balance)
+    runs = store.read("runs")
+    assert runs["net_profit"].tolist() == pytest.approx([costs.net_pnl.sum(), 0.0])
+    assert len(list((tmp_path / "outputs/results/manifest").glob("*.json"))) == 1  # 2回分をまとめ直した
@@ -0,0 +1,20 @@
+import pytest
+
+from project.engine.cpu_tester import run_backtest, run_backtest_streaming
+from project.engine.data_cache import OHLCArrays
+from project.engine.loader import load_user_ea
+from project.strategies import user_ea
+
+
+@pytest.fixture
+def ea(fresh_ea_state):
+    return load_user_ea()
+
+
+def test_streaming_matches_in_memory(cfg, ea, random_ohlc):
+    df = random_ohlc(n=6000, seed=6, drop=range(500, 900))
+    expected = run_backtest(df, cfg, ea)
+    user_ea.set_state(None)
+    streamed = run_backtest_streaming(OHLCArrays.from_frame(df), cfg, ea)
+    assert len(expected) > 0
+    assert streamed == expected
@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+
+from project.engine.data_cache import (
+    OHLCArrays,
+    build_cache,
+    cache_dir_for,
+    invalidate_cache,
+    load_ohlc,
+    read_ohlc_csv,
+    verify_cache,
+)
+
+
+def _write_csv(path, rows):
+    lines = ["time,open,high,low,close"] + rows
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_load_ohlc_builds_and_memmaps(tmp_path):
+    csv = tmp_path / "ohlc.csv"
+    _write_csv(
+        csv,
+        [
+            "2024-01-01T00:01:00,2,3,1,2.5",
+            "2024-01-01T00:00:00,1,2,0,1.5",
+        ],
+    )
+    arrays = load_ohlc(csv)
+    assert isinstance(arrays.close, np.memmap)
+    assert arrays.time.tolist() == [28401120, 28401121]
+    assert arrays.open.tolist() == [1.0, 2.0]
+    df = arrays.to_frame()
+    assert str(df.index[0]) == "2024-01-01 00:00:00"
+    assert df["close"].tolist() == [1.5, 2.5]
+    assert OHLCArrays.from_frame(df).time.tolist() == arrays.time.tolist()
+
+
+def test_load_ohlc_rebuilds_when_source_changes(tmp_path):
+    csv = tmp_path / "ohlc.csv"
+    _write_csv(csv, ["2024-01-01T00:00:00,1,2,0,1.5"])
+    load_ohlc(csv)
+    _write_csv(csv, ["2024-01-01T00:00:00,1,2,0,1.5", "2024-01-01T00:01:00,2,3,1,2.5"])
+    st = csv.stat()
+    os.utime(csv, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert len(load_ohlc(csv)) == 2
+
+
+def test_verify_and_invalidate(tmp_path):
+    csv = tmp_path / "ohlc.csv"
+    _write_csv(csv, ["2024-01-01T00:00:00,1,2,0,1.5"])
+    assert not verify_cache(csv)
+    entry = build_cache(csv)
+    assert entry == cache_dir_for(csv)
+    assert verify_cache(csv)
+    np.save(entry / "close.npy", np.zeros(3))
+    assert not verify_cache(csv)
+    assert invalidate_cache(csv)
+    assert not entry.exists()
+    assert not invalidate_cache(csv)
+
+
+def test_read_ohlc_csv_without_cache(tmp_path):
+    csv = tmp_path / "ohlc.csv"
+    _write_csv(csv, ["2024-01-01T00:00:00,1,2,0,1.5"])
+    arrays = load_ohlc(csv, use_cache=False)
+    assert not (tmp_path / ".ohlc_cache").exists()
+    assert arrays.close.tolist() == read_ohlc_csv(csv).close.tolist()
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from project.engine.cpu_tester import run_backtest
+from project.engine.flags import FlagSet, register_flag, unregister_flag
+from project.engine.indicators import compute_rsi_and_flags
+
+
+def test_flag_rows_match_frame(cfg, random_ohlc):
+    _, _, frame = compute_rsi_and_flags(random_ohlc(n=2000), cfg)
+    flag_set = FlagSet.from_frame(frame)
+    for j in (0, 500, 1999):
+        row = flag_set.row(j)
+        assert dict(row) == {k: bool(frame.iloc[j][k]) for k in frame.columns}
+        assert row.get("missing") is None
+    for name in frame.columns:
+        assert np.array_equal(flag_set.column(name), frame[name].to_numpy())
+
+
+def test_flag_set_validates_columns():
+    with pytest.raises(ValueError):
+        FlagSet({"a": np.zeros(3, bool), "b": np.zeros(4, bool)})
+    with pytest.raises(ValueError):
+        FlagSet({f"f{i}": np.zeros(1, bool) for i in range(65)})
+
+
+class _RecordFlags:
+    def __init__(self):
+        self.seen = []
+
+    def emit_actions(self, i, ctx):
+        self.seen.append((ctx.flags["even_minute"], ctx.flags["reset"]))
+        return []
+
+
+def test_registered_flags_are_visible_to_ea(cfg, random_ohlc):
+    df = random_ohlc(n=300)
+    register_flag("even_minute", lambda x: (x.index.minute % 2 == 0))
+    try:
+        ea = _RecordFlags()
+        run_backtest(df, cfg, ea)
+    finally:
+        unregister_flag("even_minute")
+    _, _, frame = compute_rsi_and_flags(df, cfg)
+    assert [s[0] for s in ea.seen] == (df.index.minute % 2 == 0).tolist()
+    assert [s[1] for s in ea.seen] == frame["reset"].tolist()
+
+
+def test_registered_flag_shape_is_checked(cfg, random_ohlc):
+    register_flag("broken", lambda x: np.zeros(3, bool))
+    try:
+        with pytest.raises(ValueError):
+            run_backtest(random_ohlc(n=100), cfg, _RecordFlags())
+    finally:
+        unregister_flag("broken")
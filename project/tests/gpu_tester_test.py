@@ -0,0 +1,160 @@
+import json
+import sys
+from dataclasses import replace
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import yaml
+
+from project.engine import gpu_tester
+from project.engine.batch import BatchSignals
+from project.engine.costs import history_costs
+from project.engine.cpu_tester import run_backtest
+from project.engine.errors import EAValidationError
+from project.engine.execution import value_per_point
+from project.engine.gpu_runner import simulate_trade_chains
+from project.engine.gpu_tester import run_param_sets, trade_metrics
+from project.engine.results_store import ResultsStore
+from project.strategies import user_ea
+
+
+pytestmark = pytest.mark.usefixtures("fresh_ea_state")
+
+
+def _chains(df, cfg, signal_index, signal_side, **kwargs):
+    n_sets = len(signal_index)
+    return simulate_trade_chains(
+        *(df[c].to_numpy() for c in ("open", "high", "low", "close")),
+        signal_index,
+        signal_side,
+        np.arange(1, n_sets + 1, dtype=np.int32) * 15,
+        np.arange(1, n_sets + 1, dtype=np.int32) * 25,
+        cfg.point,
+        0,
+        0,
+        0,
+        backend="cpu",
+        **kwargs,
+    )
+
+
+def test_chains_independent_of_window_and_batch_size(cfg, random_ohlc):
+    df = random_ohlc(n=5000, seed=3)
+    rng = np.random.default_rng(0)
+    signal_index = [np.sort(rng.choice(len(df), size=k, replace=False)) for k in (300, 40, 0, 5)]
+    signal_side = [rng.choice(np.array([1, -1], dtype=np.int8), size=len(idx)) for idx in signal_index]
+    expected = _chains(df, cfg, signal_index, signal_side, window=len(df))
+    for window, batch_size in ((7, 1), (64, 3), (1440, 1024)):
+        result = _chains(df, cfg, signal_index, signal_side, window=window, batch_size=batch_size)
+        for got, want in zip(result, expected):
+            assert got.keys() == want.keys()
+            for key in want:
+                np.testing.assert_array_equal(got[key], want[key])
+    assert expected[2]["entry_index"].size == 0
+    for trades, idx in zip(expected, signal_index):
+        # 決済したバーより後の最初のシグナルで次の取引に入る
+        for prev_exit, entry in zip(trades["exit_index"][:-1], trades["entry_index"][1:]):
+            assert entry == idx[np.searchsorted(idx, prev_exit, side="right")]
+        assert set(trades["exit_reason"].tolist()) <= {1, -1}
+
+
+@pytest.mark.parametrize("trailing", [False, True])
+def test_chains_match_cpu_engine(cfg, random_ohlc, trailing):
+    df = random_ohlc(n=20000, seed=7)
+    rng = np.random.default_rng(1)
+    side = np.zeros(len(df), dtype=np.int8)
+    signal_index = np.sort(rng.choice(len(df), size=2000, replace=False))
+    side[signal_index] = rng.choice(np.array([1, -1], dtype=np.int8), size=signal_index.size)
+    ea = SimpleNamespace(emit_actions_batch=lambda x: BatchSignals(side=side[x.offset:x.offset + len(x.close)],
+                                                                  lot=np.ones(len(x.close))))
+    # _chains の1組目と同じ SL 15 / TP 25 ポイント
+    cfg = replace(cfg, stoploss_points=15, rr=25 / 15, enable_trailing_stop=trailing,
+                  trailing_start_ratio=0.3, trailing_width_points=4)
+    history = run_backtest(df, cfg, ea)
+    trades = _chains(df, cfg, [signal_index], [side[signal_index]],
+                     trail_start_ratio=np.array([0.3 if trailing else 0.0], dtype=np.float32),
+                     trail_width_points=np.array([4 if trailing else 0], dtype=np.int32))[0]
+    assert len(history) == trades["entry_index"].size > 100
+    np.testing.assert_array_equal([df.index.get_loc(r["entry_time"]) for r in history], trades["entry_index"])
+    np.testing.assert_array_equal([df.index.get_loc(r["time"]) for r in history], trades["exit_index"])
+    profit = np.array([r["profit"] for r in history]) / value_per_point(cfg)
+    np.testing.assert_allclose(profit, trades["pnl_points"], atol=0.01)
+
+
+def test_trade_metrics():
+    metrics = trade_metrics(np.array([20.0, -10.0, -10.0, 30.0]))
+    assert metrics == {
+        "total_trades": 4,
+        "win_rate": 0.5,
+        "avg_win": 25.0,
+        "avg_loss": -10.0,
+        "profit_factor": 2.5,
+        "max_dd_pts": 20.0,
+        "net_profit_pts": 30.0,
+    }
+    assert trade_metrics(np.array([]))["total_trades"] == 0
+    assert trade_metrics(np.array([5.0, 10.0]))["profit_factor"] is None  # JSONに Infinity を書かない
+
+
+def test_run_param_sets_per_combo(cfg, random_ohlc):
+    df = random_ohlc(n=6000, seed=4)
+    combos = [{"stoploss_points": 10, "rr": 2.0}, {"stoploss_points": 30, "rr": 1.0}]
+    results = run_param_sets(df, replace(cfg, batch_size=4), user_ea, combos, window=120, backend="cpu")
+    assert [r["params"] for r in results] == combos
+    for res, combo in zip(results, combos):
+        assert res["metrics"]["total_trades"] > 0
+        pnl = res["trades"]["pnl_points"]
+        tp = round(combo["rr"] * combo["stoploss_points"])
+        assert np.allclose(pnl[res["trades"]["exit_reason"] == 1], tp, atol=0.01)
+    with pytest.raises(EAValidationError):
+        run_param_sets(df, cfg, object(), combos, backend="cpu")
+
+
+def test_run_param_sets_net_profit_matches_cpu_tester(cfg, random_ohlc):
+    df = random_ohlc(n=20000, seed=4)
+    cfg = replace(cfg, commission_per_lot_round=7.0, swap_long_per_lot_day=-2.0, swap_short_per_lot_day=1.5)
+    result = run_param_sets(df, cfg, user_ea, [{}], backend="cpu")[0]
+    user_ea.set_state(None)
+    history = run_backtest(df, cfg, user_ea)
+    costs = history_costs(history, cfg)
+    assert len(history) >= 10
+    assert result["trades"]["lot"].tolist() == [r["lot"] for r in history]
+    np.testing.assert_allclose(result["trades"]["swap"], costs.swap)
+    # カーネルの価格は float32 なので取引ごとの損益に丸め誤差が残る
+    np.testing.assert_allclose(result["trades"]["net_profit"], costs.net_pnl, atol=0.01)
+    assert result["metrics"]["net_profit"] == round(float(result["trades"]["net_profit"].sum()), 4)
+
+
+@pytest.mark.parametrize("output_format", ["files", "columnar"])
+def test_main_writes_gpu_mock_artifacts(random_ohlc, tmp_path, monkeypatch, output_format):
+    base = Path(__file__).resolve().parents[1] / "config.yaml"
+    data = yaml.safe_load(base.read_text(encoding="utf-8"))
+    data["data_path"] = str(tmp_path)
+    (tmp_path / "config.yaml").write_text(yaml.safe_dump(data), encoding="utf-8")
+    (tmp_path / "grid.yaml").write_text(yaml.safe_dump({"stoploss_points": [10, 20], "rr": {"start": 1, "stop": 2, "step": 1}}, sort_keys=False))
+    random_ohlc(n=3000, seed=5).to_csv(tmp_path / "ohlc.csv")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["gpu_tester", "--config", "config.yaml", "--run-id", "T1", "--data", "ohlc.csv", "--params", "grid.yaml",
+         "--backend", "cpu", "--output-format", output_format],
+    )
+    gpu_tester.main()
+    if output_format == "columnar":
+        runs = ResultsStore(tmp_path / "outputs/GPU/results").read("runs")
+        assert runs["param_index"].tolist() == [0, 1, 2, 3]
+        assert runs["param_stoploss_points"].tolist() == [10, 10, 20, 20]
+        return
+    run_dirs = sorted((tmp_path / "outputs/GPU/Run_T1").iterdir())
+    assert [d.name for d in run_dirs] == ["0", "1", "2", "3"]
+    manifest = json.loads((run_dirs[3] / "Manifest.json").read_text(encoding="utf-8"))
+    assert manifest["params"] == {"index": 3, "stoploss_points": 20, "rr": 2}
+    assert set(manifest["metrics"]) == {
+        "total_trades", "win_rate", "avg_win", "avg_loss", "profit_factor", "max_dd_pts", "net_profit_pts", "net_profit"
+    }
+    summary = (run_dirs[3] / "Summary.csv").read_text(encoding="utf-8").splitlines()
+    assert summary[0] == "run_id,index,total_trades,win_rate,profit_factor,net_profit_pts"
+    assert summary[1].startswith(f"T1,3,{manifest['metrics']['total_trades']},")
@@ -0,0 +1,59 @@
+import dataclasses
+
+import numpy as np
+import pandas as pd
+
+from project.engine.indicator_cache import IndicatorCache
+from project.engine.indicators import compute_rsi_and_flags
+
+
+def test_lru_evicts_least_recently_used_by_bytes():
+    cache = IndicatorCache(max_bytes=3 * 800)
+    for period in range(3):
+        cache.put(("fp", "rsi", "m15", period), np.zeros(100))
+    assert cache.get(("fp", "rsi", "m15", 0)) is not None
+    cache.put(("fp", "rsi", "m15", 3), np.zeros(100))
+    assert cache.get(("fp", "rsi", "m15", 1)) is None
+    assert cache.get(("fp", "rsi", "m15", 0)) is not None
+    assert cache.stats["evictions"] == 1
+    assert cache.bytes == 3 * 800
+
+
+def test_put_same_key_replaces_entry():
+    cache = IndicatorCache(max_bytes=2 * 800)
+    cache.put(("fp", "rsi", "m15", 0), np.zeros(100))
+    cache.put(("fp", "rsi", "m15", 1), np.zeros(100))
+    cache.put(("fp", "rsi", "m15", 0), np.ones(100))
+    assert cache.bytes == 2 * 800
+    assert cache.stats["evictions"] == 0
+    cache.put(("fp", "rsi", "m15", 2), np.zeros(100))  # 再登録した 0 より 1 が古い
+    assert cache.get(("fp", "rsi", "m15", 1)) is None
+    assert cache.get(("fp", "rsi", "m15", 0))[0] == 1.0
+
+
+def test_disk_layer_is_shared_between_instances(tmp_path):
+    key = ("fp", "rsi", "h1", 14)
+    first = IndicatorCache(disk_dir=tmp_path)
+    first.get_or_compute(key, lambda: np.arange(5.0))
+    second = IndicatorCache(disk_dir=tmp_path)
+    value = second.get_or_compute(key, lambda: np.zeros(5))
+    assert value.tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert not value.flags.writeable
+    assert first.stats["misses"] == 1
+    assert second.stats == {"memory_hits": 0, "disk_hits": 1, "misses": 0, "evictions": 0}
+
+
+def test_threshold_sweep_reuses_rsi(cfg, random_ohlc):
+    df = random_ohlc(n=3000)
+    cache = IndicatorCache()
+    expected = compute_rsi_and_flags(df, cfg)
+    for overbought in (60, 70, 80):
+        swept = dataclasses.replace(cfg, overbought=overbought)
+        rsi_m15, rsi_h1, flags = compute_rsi_and_flags(df, swept, cache)
+        assert np.array_equal(rsi_m15, expected[0], equal_nan=True)
+        assert np.array_equal(rsi_h1, expected[1], equal_nan=True)
+        pd.testing.assert_series_equal(flags["overbought"], pd.Series(rsi_m15 >= overbought, index=df.index, name="overbought"))
+    assert cache.stats["misses"] == 2
+    assert cache.stats["memory_hits"] == 4
+    compute_rsi_and_flags(df, dataclasses.replace(cfg, rsi_period=10), cache)
+    assert cache.stats["misses"] == 4
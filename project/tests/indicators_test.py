@@ -1,6 +1,7 @@
 import pandas as pd
 
 from project.engine.config import Config
+from project.engine.data_cache import NS_PER_MINUTE
 from project.engine.enums import OHLCOrder, SpreadPolicy, MoneyMode
 from project.engine.indicators import compute_rsi_and_flags
 
@@ -55,3 +56,90 @@ def test_compute_rsi_and_flags():
     assert len(rsi_m15) == 6
     assert len(rsi_h1) == 6
     assert flags.shape[0] == 6
+
+
+def test_compute_rsi_and_flags_chunk_matches_batch(random_ohlc):
+    import numpy as np
+
+    from project.engine.indicators import compute_rsi_and_flags_chunk
+
+    cfg = _cfg()
+    df = random_ohlc(n=6000, drop=range(1000, 1500))
+    rsi_m15, rsi_h1, flags = compute_rsi_and_flags(df, cfg)
+    cuts = [0, *np.searchsorted(df.index, pd.to_datetime(["2024-01-01 00:00", "2024-01-02 03:00"])), len(df)]
+    state = None
+    parts = []
+    for start, stop in zip(cuts[:-1], cuts[1:]):
+        m15, h1, chunk_flags, state = compute_rsi_and_flags_chunk(df.iloc[start:stop], cfg, state)
+        parts.append((m15, h1, chunk_flags))
+    assert np.array_equal(np.concatenate([p[0] for p in parts]), rsi_m15, equal_nan=True)
+    assert np.array_equal(np.concatenate([p[1] for p in parts]), rsi_h1, equal_nan=True)
+    assert pd.concat([p[2] for p in parts]).equals(flags)
+
+
+def test_rsi_matrix_matches_per_period_rsi(random_ohlc):
+    import numpy as np
+
+    from project.engine.indicators import resampled_rsi, rsi_sweep_arrays
+    from project.engine.optimizer import select_period
+
+    df = random_ohlc(n=6000, drop=range(1000, 1500))
+    periods = [5, 9, 14, 21]
+    arrays = rsi_sweep_arrays(df, periods)
+    assert arrays["rsi_m15"].shape == (4, len(df))
+    assert arrays["rsi_m15"].dtype == np.float32
+    for period in periods:
+        for tf in ("m15", "h1"):
+            expected = resampled_rsi(df["close"], tf, period)
+            row = select_period(arrays, f"rsi_{tf}", period)
+            assert np.array_equal(np.isnan(row), np.isnan(expected))
+            assert np.allclose(row, expected, rtol=0, atol=1e-4, equal_nan=True)
+
+
+def _bucket_last(minutes_since_epoch, minutes):
+    import numpy as np
+
+    bucket = minutes_since_epoch // minutes
+    return np.r_[bucket[1:] != bucket[:-1], True]
+
+
+def test_indicator_state_update_matches_batch_at_bucket_close(random_ohlc):
+    import numpy as np
+
+    from project.engine.indicators import IndicatorState, bar_flags
+
+    cfg = _cfg()
+    df = random_ohlc(n=6000, drop=[*range(1000, 1500), 2003, 2004])
+    rsi_m15, rsi_h1, flags = compute_rsi_and_flags(df, cfg)
+    minutes = df.index.asi8 // NS_PER_MINUTE
+    state = IndicatorState()
+    m15, h1 = np.array([state.update(m, c, cfg) for m, c in zip(minutes.tolist(), df["close"].tolist())]).T
+    for tf_minutes, expected, actual in ((15, rsi_m15, m15), (60, rsi_h1, h1)):
+        last = _bucket_last(minutes, tf_minutes)
+        assert np.isfinite(actual[last]).sum() > 10
+        assert np.array_equal(actual[last], expected[last], equal_nan=True)
+    for i in np.flatnonzero(_bucket_last(minutes, 15))[-50:]:
+        assert bar_flags(m15[i], cfg) == {k: bool(flags.iloc[i][k]) for k in flags.columns}
+
+
+def test_indicator_state_mixes_chunks_and_bars(random_ohlc):
+    import copy
+    import pickle
+
+    import numpy as np
+
+    from project.engine.indicators import IndicatorState, compute_rsi_and_flags_chunk
+
+    cfg = _cfg()
+    df = random_ohlc(n=6000, seed=3)
+    rsi_m15, rsi_h1, _ = compute_rsi_and_flags(df, cfg)
+    minutes = df.index.asi8 // NS_PER_MINUTE
+    first, second = np.searchsorted(df.index, pd.to_datetime(["2024-01-01 00:00", "2024-01-02 03:00"]))
+    _, _, _, state = compute_rsi_and_flags_chunk(df.iloc[:first], cfg)
+    bars = [state.update(m, c, cfg) for m, c in zip(minutes[first:second].tolist(), df["close"].iloc[first:second])]
+    last = _bucket_last(minutes[first:second], 60)
+    assert np.array_equal(np.array(bars)[last, 1], rsi_h1[first:second][last], equal_nan=True)
+    resumed = pickle.loads(pickle.dumps(copy.deepcopy(state)))
+    m15, h1, _, _ = compute_rsi_and_flags_chunk(df.iloc[second:], cfg, resumed)
+    assert np.array_equal(m15, rsi_m15[second:], equal_nan=True)
+    assert np.array_equal(h1, rsi_h1[second:], equal_nan=True)
@@ -0,0 +1,217 @@
+from dataclasses import replace
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from project.engine.actions import NOP, CloseAction, ModifyAction, OpenAction, PendingOpenAction
+from project.engine.cpu_tester import run_backtest, run_backtest_streaming
+from project.engine.data_cache import OHLCArrays
+from project.engine.execution import value_per_point
+from project.engine.hit_rules import resolve_hit
+from project.engine.orders import OrderBook
+from project.engine.trailing import resolve_hit_trailing, trailing_activation
+
+
+def _bar(o, h, l, c, spread=0.0):
+    bid = [o, h, l, c]
+    return bid, [p + spread for p in bid]
+
+
+def test_concurrent_positions_resolve_independently(cfg):
+    book = OrderBook(cfg)  # SL 0.10 / TP 0.20
+    first = book.open("BUY", 0.1, 100.0, 100.0)
+    second = book.open("SELL", 0.2, 100.0, 100.0)
+    assert (first, second) == (1, 2)
+    assert book.step(*_bar(100.0, 100.3, 99.95, 100.25)) == []  # 約定バーは判定しない
+    closed = book.step(*_bar(100.0, 100.15, 99.95, 100.1))
+    assert closed == [(2, "SL", pytest.approx(-10 * 0.2 * value_per_point(cfg)), None, "SELL", 0.2)]
+    closed = book.step(*_bar(100.1, 100.25, 100.05, 100.2))
+    assert closed == [(1, "TP", pytest.approx(20 * 0.1 * value_per_point(cfg)), None, "BUY", 0.1)]
+    assert not book.positions
+
+
+def test_modify_and_close(cfg):
+    book = OrderBook(cfg)
+    ticket = book.open("BUY", 0.1, 100.0, 100.0)
+    book.step(*_bar(100.0, 100.0, 100.0, 100.0))
+    assert book.modify(ticket, sl=99.5)
+    assert book.step(*_bar(100.0, 100.0, 99.85, 99.9)) == []  # 旧SLのヒープ要素は読み捨てる
+    assert book.close(ticket, 99.8, 99.8) == ("CLOSE", pytest.approx(-20 * 0.1 * value_per_point(cfg)))
+    assert book.close(ticket, 99.8, 99.8) is None
+    assert not book.modify(ticket, sl=1.0)
+
+
+def test_set_trailing_follows_best_price(cfg):
+    book = OrderBook(replace(cfg, trailing_width_points=5))
+    trailed = book.open("BUY", 0.1, 100.0, 100.0)
+    fixed = book.open("BUY", 0.1, 100.0, 100.0)
+    assert book.set_trailing(trailed, 0.5)  # TPまで0.20の半分進んだら幅0.05で追従
+    assert not book.set_trailing(99, None)
+    assert book.step(*_bar(100.0, 100.3, 99.95, 100.0)) == []  # 約定バーは判定しない
+    assert book.positions[trailed].sl == 99.9
+    closed = book.step(*_bar(100.0, 100.15, 100.05, 100.1))
+    assert closed == [(trailed, "SL", pytest.approx(10 * 0.1 * value_per_point(cfg)), None, "BUY", 0.1)]
+    assert set(book.positions) == {fixed}
+
+
+def test_trailing_config_applies_to_every_position(cfg):
+    book = OrderBook(replace(cfg, enable_trailing_stop=True, trailing_start_ratio=0.0, trailing_width_points=5))
+    ticket = book.open("SELL", 0.1, 100.0, 100.0)
+    book.step(*_bar(100.0, 100.0, 100.0, 100.0))
+    assert book.modify(ticket, tp=99.0)
+    assert book.step(*_bar(100.0, 100.0, 99.8, 99.8)) == []
+    assert book.positions[ticket].sl == pytest.approx(99.85)
+    closed = book.step(*_bar(99.8, 99.9, 99.8, 99.8))
+    assert closed == [(ticket, "SL", pytest.approx(15 * 0.1 * value_per_point(cfg)), None, "SELL", 0.1)]
+
+
+def test_trailing_position_gapping_through_stop_closes(cfg):
+    book = OrderBook(replace(cfg, enable_trailing_stop=True, trailing_start_ratio=0.5, trailing_width_points=5))
+    ticket = book.open("BUY", 0.1, 100.0, 100.0)  # SL 99.9
+    book.step(*_bar(100.0, 100.0, 100.0, 100.0))
+    closed = book.step(*_bar(99.5, 99.6, 99.4, 99.5))
+    assert closed == [(ticket, "SL", pytest.approx(-10 * 0.1 * value_per_point(cfg)), None, "BUY", 0.1)]
+    assert not book.positions
+
+
+def test_pending_orders_fill_when_range_reaches_price(cfg):
+    book = OrderBook(cfg)
+    limit = book.place_pending("BUY", 0.1, 99.5, 100.0, 100.0)
+    stop = book.place_pending("SELL", 0.1, 99.0, 100.0, 100.0, tp=98.0)
+    cancelled = book.place_pending("SELL", 0.1, 101.0, 100.0, 100.0)
+    assert book.cancel_pending(cancelled)
+    book.step(*_bar(100.0, 100.2, 99.6, 99.8))
+    assert set(book.pending) == {limit, stop}
+    book.step(*_bar(99.7, 99.8, 99.4, 99.5))
+    assert book.positions[limit].open_price == 99.5
+    assert set(book.pending) == {stop}
+    book.step(*_bar(98.9, 99.0, 98.8, 98.9))  # 始値で既に越えていれば始値で約定
+    assert book.positions[stop].open_price == 98.9
+    assert book.positions[stop].tp == 98.0
+
+
+def _brute_force(cfg, orders, bars):
+    """全注文を毎バー走査する参照実装。"""
+    pending = {t: o for t, o in orders.items()}
+    positions = {}
+    events = []
+    for bid, ask in bars:
+        hits = []
+        for t, p in sorted(positions.items()):
+            ticks = bid if p["side"] == "BUY" else ask
+            result = resolve_hit(p["side"], max(ticks), min(ticks), p["sl"], p["tp"], ticks[0] < ticks[-1])
+            if result:
+                hits.append(t)
+                events.append((t, result))
+        for t in hits:
+            del positions[t]
+        for t, o in sorted(pending.items()):
+            quote = ask if o["side"] == "BUY" else bid
+            if o["limit"] == (o["side"] == "BUY"):
+                filled = min(quote) <= o["price"]
+            else:
+                filled = max(quote) >= o["price"]
+            if filled:
+                positions[t] = {"side": o["side"], "sl": o["sl"], "tp": o["tp"]}
+                del pending[t]
+    return events
+
+
+def test_matches_brute_force_with_many_resting_orders(cfg):
+    rng = np.random.default_rng(1)
+    close = 100 + np.cumsum(rng.normal(0, 0.05, 3000))
+    spread = 0.02
+    bars = []
+    for c in close:
+        o = c + rng.normal(0, 0.01)
+        bars.append(_bar(o, max(o, c) + rng.uniform(0, 0.05), min(o, c) - rng.uniform(0, 0.05), c, spread))
+    book = OrderBook(cfg)
+    orders = {}
+    for _ in range(2000):
+        side = "BUY" if rng.random() < 0.5 else "SELL"
+        price = float(100 + rng.normal(0, 1.5))
+        width = float(rng.uniform(0.05, 1.0))
+        sl, tp = (price - width, price + width) if side == "BUY" else (price + width, price - width)
+        ticket = book.place_pending(side, 0.1, price, 100.0, 100.0 + spread, sl=sl, tp=tp)
+        order = book.pending[ticket]
+        orders[ticket] = {"side": side, "price": price, "sl": sl, "tp": tp, "limit": order.limit}
+    events = []
+    for bid, ask in bars:
+        events += [(t, r) for t, r, *_ in book.step(bid, ask)]
+    expected = _brute_force(cfg, orders, bars)
+    assert len(expected) > 100
+    assert events == expected
+
+
+def test_trailing_matches_per_bar_scan(cfg):
+    cfg = replace(cfg, enable_trailing_stop=True, trailing_start_ratio=0.5, trailing_width_points=5)
+    rng = np.random.default_rng(2)
+    close = 100 + np.cumsum(rng.normal(0, 0.03, 2000))
+    bars = []
+    for c in close:
+        o = c + rng.normal(0, 0.01)
+        bars.append(_bar(o, max(o, c) + rng.uniform(0, 0.03), min(o, c) - rng.uniform(0, 0.03), c, 0.02))
+    book = OrderBook(cfg)
+    positions = {}
+    events, expected = [], []
+    activation = trailing_activation(0.5, cfg.rr, cfg.stoploss_points, cfg.point)
+    for i, (bid, ask) in enumerate(bars):
+        for t, p in sorted(positions.items()):
+            if p.pop("fresh", False):  # 約定バーは判定しない
+                continue
+            ticks = bid if p["side"] == "BUY" else ask
+            result, p["sl"], p["best"] = resolve_hit_trailing(
+                p["side"], ticks, p["sl"], p["tp"], p["best"], p["entry"], activation, book._trail_width
+            )
+            if result:
+                expected.append((t, result))
+                del positions[t]
+        events += [(t, r) for t, r, *_ in book.step(bid, ask)]
+        if i % 3 == 0:
+            side = "BUY" if rng.random() < 0.5 else "SELL"
+            ticket = book.open(side, 0.1, bid[-1], ask[-1])
+            pos = book.positions[ticket]
+            positions[ticket] = {"side": side, "sl": pos.sl, "tp": pos.tp, "best": pos.open_price, "entry": pos.open_price, "fresh": True}
+    assert len(expected) > 100
+    assert events == expected
+
+
+class _GridEA:
+    ORDER_BOOK = True
+    TRUSTED = True
+
+    def __init__(self):
+        self.opened = []
+
+    def emit_actions(self, i, ctx):
+        if i % 50 == 0:
+            self.opened.append(ctx.orders.next_ticket)
+            return [OpenAction("BUY" if i % 100 else "SELL", 0.1)]
+        if i % 50 == 25 and self.opened and self.opened[0] in ctx.orders.positions:
+            return [CloseAction(self.opened.pop(0)), ModifyAction(999, sl=1.0)]
+        return [NOP]
+
+
+def test_order_book_engine_runs_concurrent_positions(cfg, random_ohlc):
+    df = random_ohlc(n=4000, seed=4)
+    history = run_backtest(df, cfg, _GridEA())
+    tickets = [row["ticket"] for row in history]
+    assert len(tickets) == len(set(tickets)) > 10
+    assert {row["result"] for row in history} <= {"SL", "TP", "CLOSE"}
+    assert run_backtest_streaming(OHLCArrays.from_frame(df), cfg, _GridEA()) == history
+
+
+def test_pending_actions_through_engine(cfg, random_ohlc):
+    df = random_ohlc(n=500, seed=5)
+
+    def emit_actions(i, ctx):
+        if i == 0:
+            return [PendingOpenAction("BUY", 0.1, ctx.ask - 0.05), {"type": "PENDING_OPEN", "side": "SELL", "lot": 0.1, "price": 1.0}]
+        if i == 1:
+            return [{"type": "CANCEL_PENDING", "ticket": 2}]
+        return [NOP]
+
+    ea = SimpleNamespace(ORDER_BOOK=True, emit_actions=emit_actions)
+    history = run_backtest(df, cfg, ea)
+    assert [row["ticket"] for row in history] == [1]
@@ -0,0 +1,99 @@
+from dataclasses import replace
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from project.engine.bar_sim import simulate_bar
+from project.engine.context import LiveCtx
+from project.engine.cpu_tester import run_backtest
+from project.engine.flags import build_flag_set
+from project.engine.indicators import compute_rsi_and_flags
+from project.engine.passage import PassageIndex
+from project.engine.state import init_states
+from project.engine.ticks import build_ask_matrix, frame_tick_matrix
+from project.strategies import user_ea
+
+
+pytestmark = pytest.mark.usefixtures("fresh_ea_state")
+
+
+def _scan(bid, ask, side, start, sl, tp):
+    rows = bid if side == "BUY" else ask
+    for k in range(start, rows.shape[0]):
+        high, low = rows[k].max(), rows[k].min()
+        if side == "BUY" and (high >= tp or low <= sl):
+            return k
+        if side == "SELL" and (low <= tp or high >= sl):
+            return k
+    return rows.shape[0]
+
+
+@pytest.mark.parametrize("n", [1, 2, 7, 64, 1000, 1537])
+def test_first_hit_matches_linear_scan(n):
+    rng = np.random.default_rng(n)
+    close = 100 + np.cumsum(rng.normal(0, 0.05, n))
+    bid = np.column_stack((close, close + 0.03, close - 0.03, close))
+    ask = bid + 0.02
+    index = PassageIndex(bid, ask)
+    for _ in range(200):
+        start = int(rng.integers(0, n + 1))
+        side = "BUY" if rng.random() < 0.5 else "SELL"
+        ref = close[min(start, n - 1)]
+        width = rng.uniform(0.01, 2.0)
+        sl, tp = (ref - width, ref + 2 * width) if side == "BUY" else (ref + width, ref - 2 * width)
+        assert index.first_hit(side, start, sl, tp) == _scan(bid, ask, side, start, sl, tp)
+
+
+def _naive_backtest(df, cfg):
+    """全バーで ``simulate_bar`` を呼ぶ素朴な実装。"""
+    rsi_m15, rsi_h1, flags = compute_rsi_and_flags(df, cfg)
+    flag_set = build_flag_set(df, rsi_m15, rsi_h1, flags, cfg)
+    bid = frame_tick_matrix(df, cfg.ohlc_order)
+    ask = build_ask_matrix(bid, cfg)
+    state = init_states(cfg)
+    ctx = LiveCtx(state, cfg, rsi_m15, rsi_h1, flag_set)
+    history = []
+    for j in range(len(df)):
+        ctx._advance(j, bid[j, 0], ask[j, 0])
+        actions = user_ea.emit_actions(j, ctx)
+        if state.position_side is not None:
+            held = {"entry_time": opened_at, "side": state.position_side, "lot": state.lot}
+            state, closed, result, profit = simulate_bar(
+                state,
+                state.position_side,
+                bid[j],
+                ask[j],
+                cfg,
+                cfg.rr,
+                cfg.enable_trailing_stop,
+                cfg.trailing_start_ratio,
+                cfg.trailing_width_points,
+                cfg.stoploss_points,
+                state.lot,
+            )
+            if closed:
+                state.update_after_trade(profit, cfg)
+                history.append({"time": df.index[j], "result": result, **held, "profit": profit})
+            continue
+        opens = [a for a in actions if a.type == "OPEN"]
+        if opens:
+            opened_at = df.index[j]
+            simulate_bar(state, opens[0].side, bid[j], ask[j], cfg, cfg.rr, False, 0.0, 0, cfg.stoploss_points, opens[0].lot)
+    return history
+
+
+@pytest.mark.parametrize("trailing", [False, True])
+def test_engine_matches_naive_walk(cfg, random_ohlc, trailing):
+    cfg = replace(cfg, enable_trailing_stop=trailing, trailing_start_ratio=0.3, trailing_width_points=6)
+    df = random_ohlc(n=8000, seed=3)
+    expected = _naive_backtest(df, cfg)
+    user_ea.set_state(None)
+    per_bar = run_backtest(df, cfg, SimpleNamespace(emit_actions=user_ea.emit_actions))
+    user_ea.set_state(None)
+    batch = run_backtest(df, cfg, user_ea)
+    assert len(expected) > 3
+    assert all(isinstance(row["time"], pd.Timestamp) for row in per_bar)
+    assert per_bar == expected
+    assert batch == expected
@@ -0,0 +1,90 @@
+from dataclasses import replace
+
+import numpy as np
+
+from project.engine.data_cache import OHLCArrays, cache_dir_for
+from project.engine.quality import load_or_scan_quality, mask_flags, scan_quality, select_good_bars
+
+
+def _arrays(time, close, spread=0.1):
+    close = np.asarray(close, dtype=np.float64)
+    return OHLCArrays(
+        time=np.asarray(time, dtype=np.int64),
+        open=close.copy(),
+        high=close + spread,
+        low=close - spread,
+        close=close,
+    )
+
+
+# 2024-01-01 (月) 00:00 のエポック分
+MONDAY = 28401120
+
+
+def test_scan_quality_detects_issues():
+    time = [MONDAY, MONDAY + 1, MONDAY + 1, MONDAY + 5, MONDAY + 6, MONDAY + 5 * 1440]
+    arrays = _arrays(time, [1.0, 1.01, 1.02, 1.03, 9.0, 1.04])
+    report, masks = scan_quality(arrays, out_of_order=2)
+    assert report.duplicates == 1
+    assert report.gaps == 2
+    assert report.missing_minutes == 3 + (5 * 1440 - 6 - 1)
+    assert report.out_of_order == 2
+    assert report.weekend_bars == 1
+    assert masks["gap_after"].tolist() == [False, False, True, False, True, False]
+    assert masks["bad"][2] and masks["bad"][4]
+    assert not masks["session"][-1]
+
+
+def test_session_uses_configured_timezone(cfg):
+    # 日曜 22:00 UTC は東京の月曜 07:00、金曜 23:00 UTC は東京の土曜 08:00
+    time = [MONDAY - 120, MONDAY + 4 * 1440 + 23 * 60]
+    arrays = _arrays(time, [1.0, 1.01])
+    _, utc = scan_quality(arrays, cfg=cfg)
+    assert utc["session"].tolist() == [False, True]
+    report, tokyo = scan_quality(arrays, cfg=replace(cfg, timezone="Asia/Tokyo"))
+    assert tokyo["session"].tolist() == [True, False]
+    assert report.weekend_bars == 1
+
+
+def test_zero_range_counted_but_not_bad():
+    arrays = _arrays([MONDAY, MONDAY + 1], [1.0, 1.0], spread=0.0)
+    report, masks = scan_quality(arrays)
+    assert report.zero_range == 2
+    assert not masks["bad"].any()
+
+
+def test_select_and_flag():
+    arrays = _arrays([MONDAY, MONDAY + 1, MONDAY + 1], [1.0, 1.01, 1.02])
+    _, masks = scan_quality(arrays)
+    assert len(select_good_bars(arrays, masks)) == 2
+    flags = mask_flags(masks)
+    assert flags["bad_bar"].tolist() == [False, False, True]
+    assert not flags["off_session"].any()
+
+
+def test_masks_cached_next_to_data(cfg, tmp_path, monkeypatch):
+    csv = tmp_path / "ohlc.csv"
+    csv.write_text(
+        "time,open,high,low,close\n"
+        "2024-01-01T00:01:00,1,2,0,1\n"
+        "2024-01-01T00:00:00,1,2,0,1\n"
+        "2024-01-01T00:03:00,1,2,0,1\n",
+        encoding="utf-8",
+    )
+    report, masks = load_or_scan_quality(csv)
+    assert report.out_of_order == 1 and report.gaps == 1
+    assert (cache_dir_for(csv) / "gap_after.npy").exists()
+
+    import project.engine.quality as quality_mod
+
+    def fail(*args, **kwargs):
+        raise AssertionError("cached masks must be reused")
+
+    monkeypatch.setattr(quality_mod, "scan_quality", fail)
+    report2, masks2 = load_or_scan_quality(csv)
+    assert report2 == report
+    assert masks2["gap_after"].tolist() == masks["gap_after"].tolist()
+    monkeypatch.undo()
+    # タイムゾーンが変われば作り直す (月曜 00:00 UTC はニューヨークの日曜)
+    _, new_york = load_or_scan_quality(csv, cfg=replace(cfg, timezone="America/New_York"))
+    assert not new_york["session"].any()
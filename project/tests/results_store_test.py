@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from project.engine.results_store import COMPACT_LOCK, ResultsStore, ResultsWriter, compact
+
+
+def test_runs_are_written_in_batches_and_read_by_column(tmp_path):
+    with ResultsWriter(tmp_path, batch_rows=4) as writer:
+        for i in range(10):
+            writer.append_run(f"R{i}", {"net_profit_pts": i * 10, "win_rate": i / 10}, {"rsi_period": 10 + i})
+    store = ResultsStore(tmp_path)
+    assert store.rows("runs") == 10
+    assert len(store.schema["tables"]["runs"]["parts"]) == 3
+    assert list(store.columns("runs")) == ["run_id", "param_rsi_period", "net_profit_pts", "win_rate"]
+    cols = store.read("runs", ["param_rsi_period", "net_profit_pts"])
+    assert cols["param_rsi_period"].tolist() == list(range(10, 20))
+    assert cols["net_profit_pts"].tolist() == [i * 10 for i in range(10)]
+
+
+def test_trades_round_trip_and_append_to_existing_store(tmp_path):
+    history = [
+        {"time": pd.Timestamp("2024-01-02 03:04"), "result": "TP", "entry_time": pd.Timestamp("2024-01-02 01:00"),
+         "side": "BUY", "lot": 0.1, "profit": 20.0},
+        {"time": pd.Timestamp("2024-01-03 05:06"), "result": "SL", "entry_time": pd.Timestamp("2024-01-03 04:00"),
+         "side": "SELL", "lot": 0.2, "profit": -10.0},
+    ]
+    with ResultsWriter(tmp_path) as writer:
+        writer.append_trades("A", history)
+    with ResultsWriter(tmp_path) as writer:
+        writer.append_trades("B", [{**history[0], "ticket": 7}])
+    frame = ResultsStore(tmp_path).to_frame("trades")
+    assert frame["run_id"].tolist() == ["A", "A", "B"]
+    assert frame.drop(columns=["run_id", "ticket"]).to_dict("records") == history + history[:1]
+    assert frame["ticket"].tolist() == [-1, -1, 7]
+
+
+def test_changed_columns_are_rejected(tmp_path):
+    writer = ResultsWriter(tmp_path)
+    writer.append("runs", {"a": np.arange(3)})
+    with pytest.raises(ValueError):
+        writer.append("runs", {"b": np.arange(3)})
+    with pytest.raises(ValueError):
+        writer.append("other", {"a": np.arange(3), "b": np.arange(2)})
+
+
+def test_concurrent_writers_do_not_overwrite_each_other(tmp_path):
+    first = ResultsWriter(tmp_path)
+    second = ResultsWriter(tmp_path)
+    first.append_run("A", {"net_profit_pts": 1})
+    second.append_run("B", {"net_profit_pts": 2})
+    second.close()
+    first.close()
+    store = ResultsStore(tmp_path)
+    assert sorted(store.read("runs")["run_id"].tolist()) == ["A", "B"]
+    files = [part["file"] for part in store.schema["tables"]["runs"]["parts"]]
+    assert len(set(files)) == 2
+    assert len(list((tmp_path / "manifest").glob("*.json"))) == 2
+
+
+def test_compact_merges_closed_writers(tmp_path):
+    for i in range(5):
+        with ResultsWriter(tmp_path) as writer:
+            writer.append_run(f"R{i}", {"net_profit_pts": i})
+    open_writer = ResultsWriter(tmp_path)
+    open_writer.append_run("open", {"net_profit_pts": 9})
+    open_writer.flush()
+    assert compact(tmp_path, min_manifests=10) == 0
+    (tmp_path / COMPACT_LOCK).touch()
+    assert compact(tmp_path) == 0  # 別のプロセスがまとめ直し中
+    (tmp_path / COMPACT_LOCK).unlink()
+    assert compact(tmp_path) == 5
+    store = ResultsStore(tmp_path)
+    assert store.read("runs")["run_id"].tolist() == ["open", "R0", "R1", "R2", "R3", "R4"]
+    assert len(store.schema["tables"]["runs"]["parts"]) == 2
+    assert len(list((tmp_path / "runs").glob("*.npz"))) == 2
+    assert not (tmp_path / COMPACT_LOCK).exists()
+
+
+def test_old_store_version_is_rejected(tmp_path):
+    (tmp_path / "schema.json").write_text('{"version": 1, "tables": {}}', encoding="utf-8")
+    with pytest.raises(ValueError):
+        ResultsStore(tmp_path)
@@ -0,0 +1,81 @@
+import multiprocessing as mp
+import os
+
+import numpy as np
+import pytest
+
+from project.engine.data_cache import OHLCArrays
+from project.engine.optimizer import grid_search_parallel
+from project.engine.shared_arrays import SharedArrays, ohlc_payload
+
+
+def _worker_sum(manifest, queue):
+    shared = SharedArrays.attach(manifest)
+    queue.put((float(shared["close"].sum()), shared.refcount, shared["close"].flags.writeable))
+    shared.close()
+
+
+def _worker_dies(manifest):
+    SharedArrays.attach(manifest)
+    os._exit(0)  # close も終了処理も行わずに終了する
+
+
+def _score(params, arrays):
+    return float(arrays["close"][params["i"]]) * params["k"]
+
+
+def test_publish_attach_and_cleanup():
+    close = np.arange(10, dtype=np.float64)
+    shared = SharedArrays.publish({"close": close, "rsi": close.astype(np.float32)})
+    assert shared["rsi"].dtype == np.float32
+    assert not shared["close"].flags.writeable
+
+    queue = mp.Queue()
+    proc = mp.Process(target=_worker_sum, args=(shared.manifest, queue))
+    proc.start()
+    total, refs, writeable = queue.get(timeout=30)
+    proc.join(timeout=30)
+    assert total == 45.0 and refs == 2 and not writeable
+    assert shared.refcount == 1
+
+    segment = shared.manifest["arrays"]["close"]["segment"]
+    shared.close()
+    with pytest.raises(FileNotFoundError):
+        SharedArrays.attach(shared.manifest)
+    with pytest.raises(FileNotFoundError):
+        from multiprocessing import shared_memory
+
+        shared_memory.SharedMemory(name=segment)
+
+
+def test_owner_unlinks_after_worker_died_without_close():
+    shared = SharedArrays.publish({"close": np.arange(4, dtype=np.float64)})
+    proc = mp.Process(target=_worker_dies, args=(shared.manifest,))
+    proc.start()
+    proc.join(timeout=30)
+    assert proc.exitcode == 0
+    assert shared.refcount == 2  # 終了したワーカーの分は残る
+    shared.close()
+    with pytest.raises(FileNotFoundError):
+        SharedArrays.attach(shared.manifest)
+
+
+def test_ohlc_payload_round_trip():
+    arrays = OHLCArrays(
+        time=np.array([1, 2], dtype=np.int64),
+        open=np.array([1.0, 2.0]),
+        high=np.array([1.5, 2.5]),
+        low=np.array([0.5, 1.5]),
+        close=np.array([1.2, 2.2]),
+    )
+    with SharedArrays.publish(ohlc_payload(arrays, rsi_m15=np.array([50.0, 60.0]))) as shared:
+        view = shared.ohlc()
+        assert view.close.tolist() == [1.2, 2.2]
+        assert shared["rsi_m15"].tolist() == [50.0, 60.0]
+
+
+def test_grid_search_parallel():
+    arrays = {"close": np.array([1.0, 5.0, 3.0])}
+    best, score = grid_search_parallel({"i": [0, 1, 2], "k": [1, 2]}, _score, arrays, processes=2)
+    assert best == {"i": 1, "k": 2}
+    assert score == 10.0
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from project.engine.cpu_tester import run_backtest_ticks
+from project.engine.execution import value_per_point
+from project.engine.tick_store import TickStore, TickStoreWriter, ingest_csv, resolve_on_ticks
+
+
+def _random_ticks(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2024-01-02").value
+    time = start + np.cumsum(rng.integers(1, 3_000_000_000, n))
+    bid = np.round(150 + np.cumsum(rng.integers(-3, 4, n)) * 0.001, 3)
+    ask = np.round(bid + rng.integers(2, 5, n) * 0.001, 3)
+    return time, bid, ask
+
+
+def test_round_trip_across_chunks(tmp_path):
+    time, bid, ask = _random_ticks()
+    with TickStoreWriter(tmp_path / "store", point=0.001, chunk_ticks=700) as writer:
+        writer.append(time[:1234], bid[:1234], ask[:1234])
+        writer.append(time[1234:], bid[1234:], ask[1234:])
+    store = TickStore(tmp_path / "store")
+    chunks = list(store.iter_chunks())
+    assert len(store) == len(time)
+    assert len(chunks) == 8
+    assert np.array_equal(np.concatenate([c.time for c in chunks]), time)
+    assert np.array_equal(np.concatenate([c.bid for c in chunks]), bid)
+    assert np.array_equal(np.concatenate([c.ask for c in chunks]), ask)
+
+
+def test_m1_bars_match_pandas_resample(tmp_path):
+    time, bid, ask = _random_ticks(seed=1)
+    csv = tmp_path / "ticks.csv"
+    pd.DataFrame({"time": pd.to_datetime(time), "bid": bid, "ask": ask}).to_csv(csv, index=False)
+    store = ingest_csv(csv, tmp_path / "store", point=0.001, chunk_ticks=333, read_rows=500)
+    expected = pd.Series(bid, index=pd.to_datetime(time)).resample("1min").ohlc().dropna()
+    bars = store.m1_bars().to_frame()
+    assert np.array_equal(bars.index.asi8, expected.index.asi8)
+    for col in ("open", "high", "low", "close"):
+        assert np.array_equal(bars[col].to_numpy(), expected[col].to_numpy())
+
+
+def test_resolve_on_ticks_uses_side_price():
+    bid = np.array([100.0, 100.05, 100.21, 99.8])
+    ask = bid + 0.02
+    assert resolve_on_ticks("BUY", 99.9, 100.2, bid, ask) == ("TP", 2)
+    assert resolve_on_ticks("SELL", 100.1, 99.9, bid, ask) == ("SL", 2)
+    assert resolve_on_ticks("BUY", 99.0, 101.0, bid, ask) == ("", -1)
+
+
+class _OpenOnce:
+    def emit_actions(self, i, ctx):
+        if i == 0:
+            return [{"type": "OPEN", "side": "BUY", "lot": 0.1}]
+        return []
+
+
+def test_tick_backtest_resolves_at_first_hit(cfg, tmp_path):
+    base = pd.Timestamp("2024-01-02 00:00").value
+    sec = 1_000_000_000
+    time = base + np.array([0, 10, 70, 80, 130, 140]) * sec
+    bid = np.array([100.00, 100.05, 100.10, 100.23, 100.30, 99.00])
+    with TickStoreWriter(tmp_path / "store", point=0.001) as writer:
+        writer.append(time, bid, bid + 0.02)
+    history = run_backtest_ticks(TickStore(tmp_path / "store"), cfg, _OpenOnce())
+    assert history == [
+        {
+            "time": pd.Timestamp(int(time[3])),
+            "result": "TP",
+            "entry_time": pd.Timestamp(int(time[0])),
+            "side": "BUY",
+            "lot": 0.1,
+            "profit": pytest.approx(20 * 0.1 * value_per_point(cfg)),
+        }
+    ]
@@ -20,3 +20,43 @@ def test_iter_minute_segments():
     assert len(segs) == 1
     ts, t0, t1, t2, t3 = segs[0]
     assert t0 == 1 and t1 == 2 and t2 == 0 and t3 == 1.5
+
+
+def test_build_tick_matrix_orders():
+    import numpy as np
+
+    from project.engine.ticks import build_tick_matrix
+
+    o, h, l, c = (np.array([v, v + 10]) for v in (1.0, 2.0, 0.0, 1.5))
+    m = build_tick_matrix(o, h, l, c, OHLCOrder.O_H_L_C)
+    assert m.dtype == np.float64 and m.shape == (2, 4)
+    assert m[0].tolist() == [1.0, 2.0, 0.0, 1.5]
+    m2 = build_tick_matrix(o, h, l, c, OHLCOrder.O_L_H_C)
+    assert m2[1].tolist() == [11.0, 10.0, 12.0, 11.5]
+
+
+def test_iter_tick_rows_plain_values(cfg):
+    import numpy as np
+
+    from project.engine.ticks import build_ask_matrix, build_tick_matrix, iter_tick_rows
+
+    bid = build_tick_matrix(*(np.array([v]) for v in (1.0, 2.0, 0.0, 1.5)), OHLCOrder.O_H_L_C)
+    assert build_ask_matrix(bid, cfg) is bid
+    cfg.fixed_spread_point = 2
+    ask = build_ask_matrix(bid, cfg)
+    ts, bid_row, ask_row = next(iter(iter_tick_rows(np.array([5], dtype=np.int64), bid, ask)))
+    assert type(ts) is int and type(bid_row[0]) is float
+    assert ask_row == [t + 0.02 for t in bid_row]
+
+
+def test_iter_tick_rows_blocks_match_whole_matrix():
+    import numpy as np
+
+    from project.engine.ticks import iter_tick_rows
+
+    times = np.arange(10, dtype=np.int64)
+    bid = np.arange(40, dtype=np.float64).reshape(10, 4)
+    expected = list(zip(times[3:].tolist(), bid[3:].tolist(), bid[3:].tolist()))
+    for block in (1, 3, 7, 100):
+        assert list(iter_tick_rows(times, bid, bid, start=3, block=block)) == expected
+    assert list(iter_tick_rows(times, bid, bid, start=10)) == []
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from project.engine.data_cache import NS_PER_MINUTE, OHLCArrays
+from project.engine.timeframes import timeframe_index
+
+RULES = {"m15": "15min", "h1": "1h", "h4": "4h", "d1": "1D"}
+
+
+@pytest.mark.parametrize("timeframe", list(RULES))
+def test_bucket_map_matches_pandas_resample(random_ohlc, timeframe):
+    df = random_ohlc(n=8000, drop=range(2000, 4000))
+    bmap = timeframe_index(df.index)[timeframe]
+    expected_last = df["close"].resample(RULES[timeframe]).last()
+    assert np.array_equal(bmap.labels * NS_PER_MINUTE, expected_last.index.asi8)
+    assert np.array_equal(bmap.dense_last(df["close"].to_numpy()), expected_last.to_numpy(), equal_nan=True)
+    filled = expected_last.reindex(df.index, method="ffill").to_numpy()
+    assert np.array_equal(bmap.to_m1(expected_last.to_numpy()), filled, equal_nan=True)
+
+    arrays = OHLCArrays.from_frame(df)
+    ohlc = bmap.ohlc(arrays)
+    expected = df.resample(RULES[timeframe]).agg({"open": "first", "high": "max", "low": "min", "close": "last"}).dropna()
+    assert np.array_equal(ohlc.time * NS_PER_MINUTE, expected.index.asi8)
+    for col in ("open", "high", "low", "close"):
+        assert np.array_equal(getattr(ohlc, col), expected[col].to_numpy())
+
+
+def test_index_is_shared_between_indicators(random_ohlc):
+    df = random_ohlc(n=500)
+    first = timeframe_index(df.index)
+    assert timeframe_index(df.index) is first
+    assert first["m15"] is first["m15"]
+    assert timeframe_index(df.index.copy()) is not first
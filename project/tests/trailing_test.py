@@ -0,0 +1,52 @@
+import pytest
+
+from project.engine.bar_sim import simulate_bar
+from project.engine.execution import value_per_point
+from project.engine.state import RunState
+from project.engine.trailing import resolve_hit_segment, resolve_hit_trailing, trail_stop, trailing_bounds
+
+
+def test_trail_stop_waits_for_activation():
+    assert trail_stop("BUY", 99.0, 100.0, 100.4, 100.0, 0.5, 0.3) == (99.0, 100.4)
+    assert trail_stop("BUY", 99.0, 100.4, 100.6, 100.0, 0.5, 0.3) == (pytest.approx(100.3), 100.6)
+    # 価格が戻っても SL は下がらない
+    assert trail_stop("BUY", 100.3, 100.6, 100.1, 100.0, 0.5, 0.3) == (100.3, 100.6)
+    assert trail_stop("SELL", 101.0, 100.0, 99.4, 100.0, 0.5, 0.3) == (pytest.approx(99.7), 99.4)
+
+
+def test_resolve_hit_segment_matches_kernel_rules():
+    assert resolve_hit_segment(100.0, 102.0, 99.0, 101.0) == "TP"
+    assert resolve_hit_segment(100.0, 98.0, 99.0, 101.0) == "SL"
+    assert resolve_hit_segment(98.0, 102.0, 99.0, 101.0) == "SL"
+    assert resolve_hit_segment(101.0, 101.0, 99.0, 101.0) == ""
+
+
+def test_resolve_hit_trailing_exits_at_trailed_stop():
+    # O=100 H=101 L=100.5 C=100.8: 高値で SL が 100.7 に上がり、安値への下落で掛かる
+    result, sl, best = resolve_hit_trailing("BUY", [100.0, 101.0, 100.5, 100.8], 99.0, 102.0, 100.0, 100.0, 0.5, 0.3)
+    assert (result, sl, best) == ("SL", pytest.approx(100.7), 101.0)
+    # 同じバーでも SELL は SL が動かない (有利方向に進んでいない)
+    result, sl, best = resolve_hit_trailing("SELL", [100.0, 101.0, 100.5, 100.8], 101.5, 98.0, 100.0, 100.0, 0.5, 0.3)
+    assert (result, sl, best) == ("", 101.5, 100.0)
+
+
+def test_gap_through_stop_closes_at_the_level(cfg):
+    # 始値が既に SL/TP の先にある場合、バー内の区間に水準が無くても決済する
+    assert resolve_hit_trailing("BUY", [90.0, 91.0, 89.0, 90.0], 95.0, 110.0, 100.0, 100.0, 5.0, 3.0) == ("SL", 95.0, 100.0)
+    assert resolve_hit_trailing("SELL", [90.0, 91.0, 89.0, 90.0], 105.0, 92.0, 100.0, 100.0, 5.0, 3.0)[0] == "TP"
+    state = RunState()
+    params = (cfg, 2.0, True, 0.5, 100, 500, 1.0)
+    simulate_bar(state, "BUY", [100.0] * 4, [100.0] * 4, *params)
+    assert state.sl == 95.0
+    state, closed, result, profit = simulate_bar(state, "BUY", [90.0, 91.0, 89.0, 90.0], [90.0, 91.0, 89.0, 90.0], *params)
+    assert (closed, result) == (True, "SL")
+    assert profit == pytest.approx(-500 * value_per_point(cfg))
+    assert state.position_side is None
+
+
+def test_trailing_bounds():
+    # 発動前は発動価格、発動後は最有利価格を TP 側の閾値にする
+    assert trailing_bounds("BUY", 99.0, 102.0, 100.2, 100.0, 0.5) == (99.0, 100.5)
+    assert trailing_bounds("BUY", 100.4, 102.0, 100.7, 100.0, 0.5) == (100.4, 100.7)
+    assert trailing_bounds("BUY", 101.8, 102.0, 102.5, 100.0, 0.5) == (101.8, 102.0)
+    assert trailing_bounds("SELL", 101.0, 98.0, 99.8, 100.0, 0.5) == (101.0, 99.5)
@@ -0,0 +1,194 @@
+import numpy as np
+import pytest
+
+from project.engine.gpu_runner import simulate_batch, simulate_cpu_batch, simulate_cpu_shared_batch, simulate_shared_batch
+from reference_sim import shared_corpus, simulate_cpu, trailing_corpus
+
+
+def _random_batch(n_runs: int, n_minutes: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.05, n_runs * n_minutes))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) + rng.uniform(0, 0.05, close.shape[0])
+    low = np.minimum(open_, close) - rng.uniform(0, 0.05, close.shape[0])
+    entry_side = np.zeros(close.shape[0], dtype=np.int8)
+    starts = np.arange(n_runs) * n_minutes + rng.integers(0, n_minutes // 2, n_runs)
+    entry_side[starts] = rng.choice(np.array([-1, 1], dtype=np.int8), n_runs)
+    return (
+        open_.astype(np.float32),
+        high.astype(np.float32),
+        low.astype(np.float32),
+        close.astype(np.float32),
+        entry_side,
+        rng.integers(5, 40, n_runs).astype(np.int32),
+        rng.integers(5, 80, n_runs).astype(np.int32),
+    )
+
+
+@pytest.mark.parametrize("parallel", [True, False])
+@pytest.mark.parametrize("ohlc_order,spread_policy", [(0, 0), (1, 1), (0, 2)])
+def test_cpu_backend_matches_reference(parallel, ohlc_order, spread_policy):
+    n_minutes = 50
+    arrays = _random_batch(64, n_minutes, seed=ohlc_order + spread_policy)
+    args = arrays + (0.01, ohlc_order, 3, spread_policy, n_minutes)
+    expected = simulate_cpu(*args)
+    result = simulate_cpu_batch(*args, parallel=parallel)
+    assert set(np.unique(expected["exit_reason"])) >= {-1, 1}
+    for key in expected:
+        assert result[key].dtype == expected[key].dtype
+        np.testing.assert_allclose(result[key], expected[key], rtol=1e-6)
+
+
+def test_sl_priority_same_tick():
+    arrays = (
+        np.array([100, 100], dtype=np.float32),
+        np.array([100, 110], dtype=np.float32),
+        np.array([100, 90], dtype=np.float32),
+        np.array([100, 100], dtype=np.float32),
+        np.array([1, 0], dtype=np.int8),
+        np.array([0], dtype=np.int32),
+        np.array([0], dtype=np.int32),
+    )
+    result = simulate_batch(*arrays, 1.0, 0, 0, 0, 2, backend="cpu")
+    assert result["exit_reason"][0] == -1
+
+
+def test_auto_backend_runs_without_cuda():
+    n_minutes = 20
+    args = _random_batch(8, n_minutes) + (0.01, 0, 0, 0, n_minutes)
+    result = simulate_batch(*args)
+    for key, values in simulate_cpu(*args).items():
+        np.testing.assert_allclose(result[key], values, rtol=1e-6)
+
+
+def test_input_checks():
+    arrays = list(_random_batch(2, 10))
+    with pytest.raises(ValueError):
+        simulate_cpu_batch(*[a.astype(np.float64) if i == 0 else a for i, a in enumerate(arrays)],
+                           0.01, 0, 0, 0, 10)
+    with pytest.raises(ValueError):
+        simulate_cpu_batch(*arrays, 0.01, 0, 0, 0, 9)
+    with pytest.raises(ValueError):
+        simulate_batch(*arrays, 0.01, 0, 0, 0, 10, backend="opencl")
+
+
+@pytest.mark.parametrize("parallel", [True, False])
+def test_trailing_matches_reference(parallel):
+    args = trailing_corpus()
+    expected = simulate_cpu(*args)
+    result = simulate_cpu_batch(*args, parallel=parallel)
+    trailed = args[-1] > 0
+    # 含み益のまま追従したSLで決済された run があること
+    assert ((expected["exit_reason"] == -1) & (expected["pnl_points"] > 0) & trailed).any()
+    for key in expected:
+        np.testing.assert_allclose(result[key], expected[key], rtol=1e-6)
+
+
+def test_trailing_width_sweep_runs_as_one_batch():
+    n_minutes = 200
+    rng = np.random.default_rng(7)
+    close = 100 + np.cumsum(rng.normal(0.01, 0.03, n_minutes))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) + 0.02
+    low = np.minimum(open_, close) - 0.02
+    widths = np.arange(0, 40, 2, dtype=np.int32)
+    n_runs = widths.shape[0]
+    tile = lambda a, dt: np.tile(a, n_runs).astype(dt)
+    entry_side = np.zeros(n_minutes, dtype=np.int8)
+    entry_side[0] = 1
+    sweep = simulate_batch(
+        tile(open_, np.float32), tile(high, np.float32), tile(low, np.float32), tile(close, np.float32),
+        tile(entry_side, np.int8), np.full(n_runs, 30, np.int32), np.full(n_runs, 500, np.int32),
+        0.01, 0, 0, 0, n_minutes,
+        np.zeros(n_runs, np.float32), widths, backend="cpu",
+    )
+    for k, width in enumerate(widths.tolist()):
+        single = simulate_batch(
+            open_.astype(np.float32), high.astype(np.float32), low.astype(np.float32), close.astype(np.float32),
+            entry_side, np.array([30], np.int32), np.array([500], np.int32),
+            0.01, 0, 0, 0, n_minutes,
+            np.array([0.0], np.float32), np.array([width], np.int32), backend="cpu",
+        )
+        for key in single:
+            assert sweep[key][k] == single[key][0]
+    assert len(np.unique(sweep["exit_price"])) > n_runs // 2
+
+
+def test_trailing_stop_locks_in_profit():
+    # 100 で買い、110 まで上げてから 100 まで下げる。幅3で 107 のSLに掛かる。
+    arrays = (
+        np.array([100, 100, 108, 110], dtype=np.float32),
+        np.array([100, 105, 110, 110], dtype=np.float32),
+        np.array([100, 100, 107.5, 100], dtype=np.float32),
+        np.array([100, 104, 110, 100], dtype=np.float32),
+        np.array([1, 0, 0, 0], dtype=np.int8),
+        np.array([5], dtype=np.int32),
+        np.array([50], dtype=np.int32),
+    )
+    fixed = simulate_batch(*arrays, 1.0, 0, 0, 0, 4, backend="cpu")
+    assert fixed["exit_reason"][0] == 0 and fixed["exit_price"][0] == 100
+    trailed = simulate_batch(*arrays, 1.0, 0, 0, 0, 4,
+                             np.array([0.1], np.float32), np.array([3], np.int32), backend="cpu")
+    assert trailed["exit_reason"][0] == -1
+    assert trailed["exit_price"][0] == 107
+    assert trailed["pnl_points"][0] == 7
+
+
+def test_trailing_gap_through_stop():
+    # 100 で買い、次のバーは SL 95 より下で寄り付いたまま推移する
+    arrays = (
+        np.array([100, 90], dtype=np.float32),
+        np.array([100, 91], dtype=np.float32),
+        np.array([100, 89], dtype=np.float32),
+        np.array([100, 90], dtype=np.float32),
+        np.array([1, 0], dtype=np.int8),
+        np.array([5], dtype=np.int32),
+        np.array([10], dtype=np.int32),
+    )
+    result = simulate_batch(*arrays, 1.0, 0, 0, 0, 2,
+                            np.array([0.5], np.float32), np.array([3], np.int32), backend="cpu")
+    assert result["exit_reason"][0] == -1
+    assert result["exit_index"][0] == 1
+    assert result["exit_price"][0] == 95
+    np.testing.assert_array_equal(result["exit_reason"], simulate_cpu(*arrays, 1.0, 0, 0, 0, 2,
+                                  np.array([0.5], np.float32), np.array([3], np.int32))["exit_reason"])
+
+
+@pytest.mark.parametrize("parallel", [True, False])
+@pytest.mark.parametrize("ohlc_order,spread_policy", [(0, 0), (1, 2)])
+def test_shared_series_matches_replicated_batch(parallel, ohlc_order, spread_policy):
+    arrays, trailing = shared_corpus(seed=ohlc_order)
+    open_, high, low, close, starts, lengths, signal_index, signal_side, begin, end, sl, tp = arrays
+    shared = simulate_cpu_shared_batch(*arrays, 0.01, ohlc_order, 3, spread_policy, *trailing, parallel=parallel)
+    assert set(np.unique(shared["exit_reason"])) >= {-1, 0, 1}
+    assert (shared["entry_index"] == -1).any()
+    for k in range(starts.shape[0]):
+        window = slice(starts[k], starts[k] + lengths[k])
+        entry_side = np.zeros(lengths[k], dtype=np.int8)
+        picked = signal_index[begin[k]:end[k]]
+        inside = (picked >= window.start) & (picked < window.stop)
+        entry_side[picked[inside] - window.start] = signal_side[begin[k]:end[k]][inside]
+        single = simulate_cpu_batch(
+            open_[window], high[window], low[window], close[window], entry_side,
+            sl[k:k + 1], tp[k:k + 1], 0.01, ohlc_order, 3, spread_policy, int(lengths[k]),
+            trailing[0][k:k + 1], trailing[1][k:k + 1], parallel=parallel,
+        )
+        for key in single:
+            assert shared[key][k] == single[key][0], (key, k)
+
+
+def test_shared_series_input_checks():
+    arrays, _ = shared_corpus(n_runs=4)
+    simulate_shared_batch(*arrays, 0.01, 0, 0, 0, backend="cpu")
+    bad_length = list(arrays)
+    bad_length[5] = np.full(4, 3001, dtype=np.int32)
+    with pytest.raises(ValueError):
+        simulate_cpu_shared_batch(*bad_length, 0.01, 0, 0, 0)
+    bad_range = list(arrays)
+    bad_range[9] = np.full(4, 401, dtype=np.int64)
+    with pytest.raises(ValueError):
+        simulate_cpu_shared_batch(*bad_range, 0.01, 0, 0, 0)
+    bad_dtype = list(arrays)
+    bad_dtype[4] = arrays[4].astype(np.int32)
+    with pytest.raises(ValueError):
+        simulate_cpu_shared_batch(*bad_dtype, 0.01, 0, 0, 0)
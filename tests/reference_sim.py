@@ -0,0 +1,221 @@
+"""Pure-Python reference for the OHLC4 batch kernels, shared by backend tests."""
+import numpy as np
+
+
+def seg_hit_order_cpu(side: int, p0: float, p1: float):
+    if p1 > p0:
+        return (1, -1) if side > 0 else (-1, 1)
+    if p1 < p0:
+        return (-1, 1) if side > 0 else (1, -1)
+    return (0, 0)
+
+
+def resolve_segment_cpu(side: int, sl: float, tp: float, p0: float, p1: float) -> int:
+    hit_tp = (p0 <= tp <= p1) or (p1 <= tp <= p0)
+    hit_sl = (p0 <= sl <= p1) or (p1 <= sl <= p0)
+    if hit_tp and hit_sl:
+        return -1
+    first, second = seg_hit_order_cpu(side, p0, p1)
+    if first == 1 and hit_tp:
+        return 1
+    if first == -1 and hit_sl:
+        return -1
+    if second == 1 and hit_tp:
+        return 1
+    if second == -1 and hit_sl:
+        return -1
+    return 0
+
+
+def resolve_hit_cpu(side: int, sl: float, tp: float, bid_ticks, ask_ticks) -> int:
+    ticks = bid_ticks if side > 0 else ask_ticks
+    for p0, p1 in zip(ticks[:-1], ticks[1:]):
+        res = resolve_segment_cpu(side, sl, tp, p0, p1)
+        if res != 0:
+            return res
+    return 0
+
+
+def resolve_trailing_cpu(side: int, sl: float, tp: float, best: float,
+                         entry: float, activation: float, width: float, bid_ticks, ask_ticks):
+    """Walk the 4 ticks, trailing the stop at the end of every segment."""
+    ticks = bid_ticks if side > 0 else ask_ticks
+
+    def trail(sl, best, price):
+        best = max(best, price) if side > 0 else min(best, price)
+        if (best - entry) * side >= activation:
+            sl = max(sl, best - width) if side > 0 else min(sl, best + width)
+        return sl, best
+
+    # the bar opens beyond a level after a gap: filled at the level
+    if (ticks[0] - sl) * side <= 0:
+        return -1, sl, best
+    if (ticks[0] - tp) * side >= 0:
+        return 1, sl, best
+    sl, best = trail(sl, best, ticks[0])
+    for p0, p1 in zip(ticks[:-1], ticks[1:]):
+        res = resolve_segment_cpu(side, sl, tp, p0, p1)
+        if res != 0:
+            return res, sl, best
+        sl, best = trail(sl, best, p1)
+    return 0, sl, best
+
+
+def simulate_cpu(open_m1, high_m1, low_m1, close_m1,
+                 entry_side, sl_points, tp_points,
+                 point, ohlc_order, spread_points,
+                 spread_policy, n_minutes,
+                 trail_start_ratio=None, trail_width_points=None):
+    n_runs = sl_points.shape[0]
+    if trail_start_ratio is None:
+        trail_start_ratio = np.zeros(n_runs, np.float32)
+    if trail_width_points is None:
+        trail_width_points = np.zeros(n_runs, np.int32)
+    exit_reason = np.zeros(n_runs, np.int8)
+    entry_price = np.zeros(n_runs, np.float32)
+    exit_price = np.zeros(n_runs, np.float32)
+    pnl_points = np.zeros(n_runs, np.float32)
+    entry_index = np.full(n_runs, -1, np.int32)
+    exit_index = np.full(n_runs, -1, np.int32)
+    spread = spread_points * point
+    for idx in range(n_runs):
+        base = idx * n_minutes
+        side = 0
+        sl = tp = entry = best = 0.0
+        reason = 0
+        sl_p = sl_points[idx] * point
+        tp_p = tp_points[idx] * point
+        trail_w = trail_width_points[idx] * point
+        trail_act = trail_start_ratio[idx] * tp_p
+        for t in range(n_minutes):
+            i = base + t
+            if side == 0:
+                es = entry_side[i]
+                if es != 0:
+                    side = int(es)
+                    op = open_m1[i]
+                    if side > 0:
+                        entry = op + spread
+                        sl = entry - sl_p
+                        tp = entry + tp_p
+                        if spread_policy >= 1:
+                            sl -= spread
+                        if spread_policy == 2:
+                            tp -= spread
+                    else:
+                        entry = op
+                        sl = entry + sl_p
+                        tp = entry - tp_p
+                        if spread_policy >= 1:
+                            sl += spread
+                        if spread_policy == 2:
+                            tp += spread
+                    entry_price[idx] = entry
+                    entry_index[idx] = t
+                    best = entry
+                    continue  # SL/TP are checked from the next bar
+            if side != 0 and reason == 0:
+                if ohlc_order == 0:
+                    b0 = open_m1[i]; b1 = high_m1[i]; b2 = low_m1[i]; b3 = close_m1[i]
+                else:
+                    b0 = open_m1[i]; b1 = low_m1[i]; b2 = high_m1[i]; b3 = close_m1[i]
+                a0 = b0 + spread; a1 = b1 + spread; a2 = b2 + spread; a3 = b3 + spread
+                if trail_w > 0:
+                    res, sl, best = resolve_trailing_cpu(side, sl, tp, best, entry, trail_act, trail_w,
+                                                         [b0, b1, b2, b3], [a0, a1, a2, a3])
+                else:
+                    res = resolve_hit_cpu(side, sl, tp, [b0, b1, b2, b3], [a0, a1, a2, a3])
+                if res != 0:
+                    reason = res
+                    exit_reason[idx] = reason
+                    exit_index[idx] = t
+                    exit_price[idx] = sl if reason == -1 else tp
+                    pnl_points[idx] = (exit_price[idx] - entry) / point * side
+                    break
+        if side != 0 and reason == 0:
+            last = close_m1[base + n_minutes - 1]
+            exit_index[idx] = n_minutes - 1
+            if side > 0:
+                exit_price[idx] = last
+            else:
+                exit_price[idx] = last + spread
+            pnl_points[idx] = (exit_price[idx] - entry) / point * side
+    return {
+        "exit_reason": exit_reason,
+        "entry_price": entry_price,
+        "exit_price": exit_price,
+        "pnl_points": pnl_points,
+        "entry_index": entry_index,
+        "exit_index": exit_index,
+    }
+
+
+def trailing_corpus(n_runs: int = 96, n_minutes: int = 80, seed: int = 0):
+    """Batch inputs shared by the trailing-stop tests of every backend.
+
+    Widths and start ratios vary per run and every fourth run keeps a fixed
+    stop.
+
+    Returns the positional arguments of ``simulate_cpu`` up to ``n_minutes``
+    followed by ``(trail_start_ratio, trail_width_points)``.
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.05, n_runs * n_minutes))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) + rng.uniform(0, 0.05, close.shape[0])
+    low = np.minimum(open_, close) - rng.uniform(0, 0.05, close.shape[0])
+    entry_side = np.zeros(close.shape[0], dtype=np.int8)
+    starts = np.arange(n_runs) * n_minutes + rng.integers(0, n_minutes // 4, n_runs)
+    entry_side[starts] = rng.choice(np.array([-1, 1], dtype=np.int8), n_runs)
+    sl_points = rng.integers(10, 30, n_runs).astype(np.int32)
+    tp_points = (sl_points * 2).astype(np.int32)
+    trail_width = rng.integers(5, 40, n_runs).astype(np.int32)
+    trail_width[::4] = 0
+    trail_start = rng.choice(np.array([0.0, 0.1, 0.25, 0.5], dtype=np.float32), n_runs)
+    return (
+        open_.astype(np.float32),
+        high.astype(np.float32),
+        low.astype(np.float32),
+        close.astype(np.float32),
+        entry_side,
+        sl_points,
+        tp_points,
+        0.01, 0, 0, 0, n_minutes,
+        trail_start,
+        trail_width,
+    )
+
+
+def shared_corpus(n_bars: int = 3000, n_runs: int = 48, seed: int = 0):
+    """Inputs for the shared-series kernels over one random price series.
+
+    Windows have random starts and lengths. The first half of the runs share
+    the whole signal array, the others point at random slices of it; signals
+    include zero sides, and about half of the runs trail their stop.
+
+    Returns the positional arguments of ``simulate_cpu_shared_batch`` up to
+    ``tp_points`` and, separately, ``(trail_start_ratio, trail_width_points)``.
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.05, n_bars))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) + rng.uniform(0, 0.05, n_bars)
+    low = np.minimum(open_, close) - rng.uniform(0, 0.05, n_bars)
+    lengths = rng.integers(1, 200, n_runs).astype(np.int32)
+    starts = rng.integers(0, n_bars - lengths).astype(np.int64)
+    signal_index = np.sort(rng.choice(n_bars, size=400, replace=False)).astype(np.int64)
+    signal_side = rng.choice(np.array([-1, 0, 1], dtype=np.int8), signal_index.shape[0])
+    shared = np.arange(n_runs) < n_runs // 2
+    begin = np.where(shared, 0, rng.integers(0, 200, n_runs)).astype(np.int64)
+    end = np.where(shared, signal_index.shape[0], begin + rng.integers(0, 200, n_runs)).astype(np.int64)
+    widths = np.where(rng.random(n_runs) < 0.5, rng.integers(1, 20, n_runs), 0).astype(np.int32)
+    arrays = (
+        open_.astype(np.float32),
+        high.astype(np.float32),
+        low.astype(np.float32),
+        close.astype(np.float32),
+        starts, lengths, signal_index, signal_side, begin, end,
+        rng.integers(5, 40, n_runs).astype(np.int32),
+        rng.integers(5, 80, n_runs).astype(np.int32),
+    )
+    return arrays, (rng.uniform(0, 0.8, n_runs).astype(np.float32), widths)